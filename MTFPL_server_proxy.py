@@ -4,20 +4,41 @@ import os
 import shutil
 import time
 import socket
-import cv2
+import pickle
+import itertools
 import base64
+from concurrent.futures import ThreadPoolExecutor
+
+from texture_catalog import TextureCatalog
+from cad_store import CadStore, UploadError, check_filename
+from frame_protocol import frame_session
+from depth_codecs import available_codecs
+from shm_ring import ShmSender
+from result_protocol import unpack_result
+from worker_pool import WorkerPool, parse_workers, HEARTBEAT_INTERVAL, STARTUP_POLL_INTERVAL
 
 # Externe Ports 
 EXT_PORT_CMD = 5555
 EXT_PORT_VID_IN = 5556
 EXT_PORT_VID_OUT = 5557
+# Binäre Ergebnisse (result_protocol.py) über XPUB mit Topic pro Session
+EXT_PORT_RESULTS = 5558
+# Auf EXT_PORT_VID_OUT weiterhin gepickelte Dicts per PUSH für alte Clients
+LEGACY_RESULTS = os.environ.get("MTFPL_LEGACY_RESULTS", "1") == "1"
+# Frames an lokale Worker über deren Shared-Memory-Ring statt TCP (Runner mit MTFPL_SHM=1)
+SHM_TRANSPORT = os.environ.get("MTFPL_SHM", "0") == "1"
+SHM_RECHECK = 2.0
+
+# Interne Ports: pro Runner-Worker Befehle/Video/Ergebnisse, siehe worker_pool.py (MTFPL_WORKERS)
 
-# Interne Ports
-INT_PORT_CMD = 6666
-INT_PORT_VID_IN = 6667 
-INT_PORT_VID_OUT = 6668 
+# Befehle, die der Proxy selbst (im Worker-Pool) beantwortet bzw. an Docker weiterleitet
+CMD_WORKERS = 4
+DOCKER_TIMEOUT = 60.0
+# So lange wartet ein INIT höchstens darauf, dass alle startenden Worker bereit sind
+STARTUP_HOLD = float(os.environ.get("MTFPL_STARTUP_HOLD", "30"))
+DOCKER_COMMANDS = ("SET_MASK", "STOP", "SET_TEXTURE", "STATS", "SET_PREDICTION", "PREDICT")
 
-SHARED_DIR = "/workspace/shared_data"
+SHARED_DIR = os.environ.get("MTFPL_SHARED_DIR", "/workspace/shared_data")
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 TEXTURE_DIR = os.path.join(SCRIPT_DIR, "textures")
 
@@ -27,37 +48,44 @@ class ProxyServer:
     def __init__(self):
         self.context = zmq.Context()
         self.current_filename = None
+        self.store = CadStore(SHARED_DIR)
         
-        self.docker_cmd = self.context.socket(zmq.REQ)
-        self.docker_cmd.connect(f"tcp://127.0.0.1:{INT_PORT_CMD}")
-        self.docker_cmd.setsockopt(zmq.RCVTIMEO, 60000)
+        # Runner-Worker (ein Prozess pro GPU/Host), Sessions werden sticky zugeordnet
+        self.pool = WorkerPool(parse_workers())
+        self.request_ids = itertools.count(1)
 
     def save_cad_locally(self, filename, data):
-        filepath = os.path.join(SHARED_DIR, filename)
-        with open(filepath, "wb") as f:
-            f.write(data)
-        print(f"[HOST] Gespeichert: {filepath}")
+        filepath = self.store.put_bytes(filename, data)
+        self.store.enforce_quota(self.protected_files())
         return filepath
 
-    def send_init_to_docker(self, rect, K):
-        if not self.current_filename: return False
-        try:
-            payload = { 
-                "cmd": "INIT", 
-                "filename": self.current_filename, 
-                "mask_rect": rect,
-                "K": K
-            }
-            print("[HOST] Sende INIT an Docker...")
-            self.docker_cmd.send_pyobj(payload)
-            resp = self.docker_cmd.recv_string()
-            print(f"[HOST] Docker antwortet: {resp}")
-            return resp == "OK"
-        except Exception as e:
-            print(f"[ERROR] Docker Init Timeout/Error: {e}")
-            return False
+    def protected_files(self):
+        # Das aktuell geladene Modell samt Material darf nicht der Quota zum Opfer fallen
+        if not self.current_filename:
+            return set()
+        base = os.path.splitext(self.current_filename)[0]
+        return {self.current_filename, base + ".mtl", base + ".png"}
+
+    def init_payload(self, rect, K, filename=None):
+        filename = filename or self.current_filename
+        if not filename: return None
+        return {
+            "cmd": "INIT",
+            "filename": filename,
+            "mask_rect": rect,
+            "K": K
+        }
 
 proxy = ProxyServer()
+catalog = TextureCatalog(TEXTURE_DIR)
+
+def worker_socket(context, kind, endpoint):
+    sock = context.socket(kind)
+    # Nur an bestehende Verbindungen senden: ein toter Worker soll nicht den Puffer füllen
+    sock.setsockopt(zmq.IMMEDIATE, 1)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.connect(endpoint)
+    return sock
 
 def video_forwarder():
     try:
@@ -66,172 +94,436 @@ def video_forwarder():
         frontend = ctx.socket(zmq.PULL)
         frontend.bind(f"tcp://0.0.0.0:{EXT_PORT_VID_IN}")
         
-        backend = ctx.socket(zmq.PUSH)
-        backend.connect(f"tcp://127.0.0.1:{INT_PORT_VID_IN}")
+        backends = {w.worker_id: worker_socket(ctx, zmq.PUSH, w.endpoint(w.port_vid_in)) for w in proxy.pool.workers}
+        # worker_id -> ShmSender (None = noch nicht verbunden), nur für Worker auf diesem Host
+        rings = {w.worker_id: None for w in proxy.pool.workers
+                 if SHM_TRANSPORT and w.host in ("127.0.0.1", "localhost")}
+        last_check = 0.0
         
-        print(f"[PROXY] Video Forwarder läuft: :{EXT_PORT_VID_IN} -> :{INT_PORT_VID_IN}")
+        print(f"[PROXY] Video Forwarder läuft: :{EXT_PORT_VID_IN} -> {len(backends)} Worker"
+              + (f" ({len(rings)} per Shared Memory)" if rings else ""))
         
-        zmq.proxy(frontend, backend)
+        while True:
+            parts = frontend.recv_multipart(copy=False)
+            try:
+                worker = proxy.pool.owner(frame_session(parts))
+            except Exception as e:
+                print(f"[PROXY] Ungültiger Frame: {e}")
+                continue
+            if worker is None:
+                # Session ohne INIT oder ohne lebenden Worker
+                continue
+
+            if rings:
+                now = time.time()
+                if now - last_check > SHM_RECHECK:
+                    last_check = now
+                    attach_rings(ctx, rings, backends)
+                sender = rings.get(worker.worker_id)
+                if sender is not None:
+                    # Zu große Frames gehen automatisch über TCP
+                    sender.send(parts)
+                    continue
+            try:
+                backends[worker.worker_id].send_multipart(parts, copy=False, flags=zmq.NOBLOCK)
+            except zmq.Again:
+                # Worker kommt nicht hinterher, Latest-wins
+                pass
     except Exception as e:
         print(f"[ERROR] Video Forwarder Crash: {e}")
 
+def attach_rings(ctx, rings, backends):
+    """Verbindet (erneut) mit den Shared-Memory-Ringen der lokalen Worker, z.B. nach einem Neustart des Runners."""
+    workers = {w.worker_id: w for w in proxy.pool.workers}
+    for worker_id, sender in rings.items():
+        try:
+            if sender is None:
+                rings[worker_id] = ShmSender(ctx, workers[worker_id].port_vid_in, fallback=backends[worker_id])
+                print(f"[PROXY] Shared-Memory-Ring verbunden: {workers[worker_id]}")
+            else:
+                sender.reattach_if_stale()
+        except FileNotFoundError:
+            # Runner läuft noch nicht oder ohne MTFPL_SHM -> TCP
+            rings[worker_id] = None
+
 def result_forwarder():
     try:
         ctx = zmq.Context()
         
-        frontend = ctx.socket(zmq.PULL)
-        frontend.connect(f"tcp://127.0.0.1:{INT_PORT_VID_OUT}")
+        # XSUB an allen Workern führt die Ergebnis-Streams zusammen, Abos der Clients laufen über XPUB zurück
+        frontend = ctx.socket(zmq.XSUB)
+        for w in proxy.pool.workers:
+            frontend.connect(w.endpoint(w.port_vid_out))
         
-        backend = ctx.socket(zmq.PUSH)
-        backend.bind(f"tcp://0.0.0.0:{EXT_PORT_VID_OUT}")
+        backend = ctx.socket(zmq.XPUB)
+        backend.bind(f"tcp://0.0.0.0:{EXT_PORT_RESULTS}")
+
+        legacy = None
+        if LEGACY_RESULTS:
+            legacy = ctx.socket(zmq.PUSH)
+            legacy.setsockopt(zmq.SNDHWM, 10)
+            legacy.bind(f"tcp://0.0.0.0:{EXT_PORT_VID_OUT}")
+            # Für den Legacy-Ausgang alle Sessions abonnieren
+            frontend.send(b"\x01")
         
-        print(f"[PROXY] Result Forwarder läuft: :{INT_PORT_VID_OUT} -> :{EXT_PORT_VID_OUT}")
+        print(f"[PROXY] Result Forwarder läuft: {len(proxy.pool.workers)} Worker -> :{EXT_PORT_RESULTS} (PUB)"
+              + (f", :{EXT_PORT_VID_OUT} (Legacy)" if legacy else ""))
         
-        zmq.proxy(frontend, backend)
+        poller = zmq.Poller()
+        poller.register(frontend, zmq.POLLIN)
+        poller.register(backend, zmq.POLLIN)
+        while True:
+            socks = dict(poller.poll())
+            if backend in socks:
+                sub = backend.recv_multipart()
+                # Kündigt der letzte Client mit Abo auf "" ab, würde das auch das Abo des Legacy-Ausgangs beenden
+                if legacy is not None and sub == [b"\x00"]:
+                    continue
+                frontend.send_multipart(sub)
+            if frontend in socks:
+                parts = frontend.recv_multipart(copy=False)
+                backend.send_multipart(parts, copy=False)
+                if legacy is not None:
+                    try:
+                        result = unpack_result(parts)
+                    except Exception as e:
+                        # Ein kaputtes Ergebnis darf den Forwarder nicht beenden (sonst stehen 5558 und 5557)
+                        print(f"[ERROR] Ergebnis nicht lesbar, Legacy-Ausgang übersprungen: {e}")
+                        continue
+                    try:
+                        legacy.send_pyobj({k: result[k] for k in ("session", "box_points", "pose", "confidence", "timestamp")},
+                                          flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        pass
     except Exception as e:
         print(f"[ERROR] Result Forwarder Crash: {e}")
 
+def docker_payload(msg):
+    """Übersetzt einen Client-Befehl in den Befehl für Docker (None = sofort ERROR)."""
+    payload = docker_command(msg)
+    if payload is not None and "session" in msg:
+        # Mehrere Objekte/Kameras: jede Session hat im Runner eigenen Zustand
+        payload["session"] = msg["session"]
+    return payload
+
+def docker_command(msg):
+    cmd = msg.get("cmd")
+    if cmd == "SET_MASK":
+        pts = msg['points']
+        x = min(pts[0][0], pts[1][0])
+        y = min(pts[0][1], pts[1][1])
+        w = abs(pts[0][0] - pts[1][0])
+        h = abs(pts[0][1] - pts[1][1])
+        
+        K = msg.get("K", [[615.3, 0, 320], [0, 615.3, 240], [0, 0, 1]])
+        print("[HOST] Sende INIT an Docker...")
+        return proxy.init_payload([x, y, w, h], K, msg.get("filename"))
+
+    if cmd == "STOP":
+        print("[HOST] Leite STOP an Docker weiter...")
+        return {"cmd": "STOP"}
+
+    if cmd == "SET_TEXTURE":
+        tex_name = msg.get("name")
+        print(f"[PROXY] Leite Textur-Wahl an Docker weiter: {tex_name}")
+        return {"cmd": "SET_TEXTURE", "name": tex_name}
+
+    return dict(msg)
+
+def docker_reply(cmd, payload):
+    """Übersetzt die Docker-Antwort in die Antwort, die der Client für `cmd` erwartet."""
+    if cmd == "STATS":
+        if payload is None:
+            return pickle.dumps({"status": "ERROR", "workers": proxy.pool.stats()})
+        return pickle.dumps({"status": "OK", "stats": pickle.loads(payload), "workers": proxy.pool.stats()})
+    if cmd == "PREDICT":
+        return payload if payload is not None else pickle.dumps({"status": "ERROR"})
+    if payload is None:
+        return b"ERROR"
+    if cmd == "SET_MASK":
+        print(f"[HOST] Docker antwortet: {payload.decode()}")
+        return b"OK" if payload == b"OK" else b"ERROR"
+    return payload
+
+def handle_local_command(msg):
+    """Befehle, die der Proxy selbst beantwortet. Läuft im Worker-Pool, gibt die Antwort als Bytes zurück."""
+    cmd = msg.get("cmd")
+    
+    if cmd == "UPLOAD_CAD":
+        try:
+            proxy.save_cad_locally(check_filename(msg["filename"]), msg["data"])
+        except UploadError as e:
+            print(f"[HOST] Upload-Fehler ({cmd}): {e}")
+            return b"ERROR"
+        proxy.current_filename = msg["filename"]
+        return b"OK"
+    
+    elif cmd == "UPLOAD_CAD_BUNDLE":
+        filename = msg["filename"]
+        base_name = os.path.splitext(filename)[0]
+        
+        try:
+            check_filename(filename)
+            proxy.save_cad_locally(filename, msg["obj_data"])
+            proxy.save_cad_locally(base_name + ".mtl", msg["mtl_data"])
+            proxy.save_cad_locally(base_name + ".png", msg["png_data"])
+        except UploadError as e:
+            print(f"[HOST] Upload-Fehler ({cmd}): {e}")
+            return b"ERROR"
+        
+        proxy.current_filename = filename
+        return b"OK"
+
+    elif cmd == "UPLOAD_HAS":
+        return pickle.dumps({"status": "OK", "exists": proxy.store.has(msg["sha256"])})
+
+    elif cmd in ("UPLOAD_BEGIN", "UPLOAD_CHUNK", "UPLOAD_COMMIT", "UPLOAD_ABORT"):
+        try:
+            return pickle.dumps(handle_upload(cmd, msg))
+        except (UploadError, OSError) as e:
+            print(f"[HOST] Upload-Fehler ({cmd}): {e}")
+            return pickle.dumps({"status": "ERROR", "error": str(e)})
+        
+    elif cmd in ("HEALTH", "READY"):
+        # READY, sobald neue Sessions sofort platziert werden (kein Worker startet mehr); Details pro Worker
+        ready = proxy.pool.accepting()
+        return pickle.dumps({
+            "status": "READY" if ready else "STARTING",
+            "ready": ready,
+            "workers": proxy.pool.stats(),
+            "startup": {w.worker_id: w.startup for w in proxy.pool.workers},
+        })
+
+    elif cmd == "GET_CODECS":
+        # Client wählt daraus den Depth-Codec für den Frame-Header
+        return pickle.dumps({"status": "OK", "depth_codecs": available_codecs()})
+
+    elif cmd == "GET_TEXTURES":
+        print("[CONTROL] Client fragt nach Texturen...")
+        textures, total = catalog.query(
+            offset=msg.get("offset", 0),
+            limit=msg.get("limit"),
+            category=msg.get("category"),
+            search=msg.get("search"),
+        )
+        return pickle.dumps({
+            "status": "OK",
+            "textures": textures,
+            "total": total,
+            "categories": catalog.category_names(),
+        })
+        
+    elif cmd == "GET_TEXTURE_FULL":
+        tex_name = msg.get("name")
+        level = msg.get("level", "full")
+        print(f"[PROXY] Client will Textur: {tex_name} ({level})")
+        variant = catalog.variant(tex_name, level)
+
+        if not variant:
+            return pickle.dumps({"status": "ERROR"})
+        if msg.get("if_none_match") == variant["etag"]:
+            # Client hat die aktuelle Version bereits
+            return pickle.dumps({"status": "NOT_MODIFIED", "etag": variant["etag"]})
+        if msg.get("if_match") not in (None, variant["etag"]):
+            # Textur hat sich während eines Chunk-Downloads geändert
+            return pickle.dumps({"status": "CHANGED", "etag": variant["etag"]})
+        offset = msg.get("offset", 0)
+        data = load_full_texture_data(variant, offset, msg.get("length"))
+        return pickle.dumps({
+            "status": "OK",
+            "data": data,
+            "etag": variant["etag"],
+            "level": level,
+            "offset": offset,
+            "total_size": variant["size"],
+        })
+
+    return b"UNKNOWN"
+
+reply_sockets = threading.local()
+
+def run_local_command(envelope, msg):
+    try:
+        reply = handle_local_command(msg)
+    except Exception as e:
+        print(f"CMD Error: {e}")
+        reply = b"ERROR"
+    # Jeder Worker-Thread hat seinen eigenen inproc-Socket zurück zum Broker
+    sock = getattr(reply_sockets, "sock", None)
+    if sock is None:
+        sock = reply_sockets.sock = proxy.context.socket(zmq.PUSH)
+        sock.connect("inproc://cmd_replies")
+    sock.send_multipart(envelope + [reply])
+
+def route_docker_command(msg, payload):
+    """Wählt den Worker für einen Docker-Befehl (INIT platziert die Session, sonst deren Besitzer)."""
+    session = msg.get("session", 0)
+    if payload["cmd"] == "INIT":
+        worker = proxy.pool.assign(session)
+    else:
+        worker = proxy.pool.owner(session) or proxy.pool.default()
+    if worker is not None and payload["cmd"] in ("INIT", "SET_TEXTURE", "SET_PREDICTION"):
+        proxy.pool.remember(session, payload)
+    if payload["cmd"] == "STOP":
+        proxy.pool.release(session)
+    return worker
+
 def ext_command_loop():
-    socket = proxy.context.socket(zmq.REP)
-    socket.bind(f"tcp://0.0.0.0:{EXT_PORT_CMD}")
+    """Asynchroner Command-Broker.
+
+    ROUTER nach außen (kompatibel zu REQ-Clients), pro Worker ein DEALER mit Request-IDs.
+    Billige Befehle beantwortet ein Worker-Pool sofort, lange Docker-Befehle (INIT, SET_TEXTURE)
+    werden über ihre Request-ID später beantwortet, ohne andere Clients zu blockieren.
+    Nebenbei schickt der Broker Heartbeats (STATS) an alle Worker und verteilt die Sessions
+    eines ausgefallenen Workers neu. Solange Worker noch starten, werden INIT-Befehle neuer Sessions
+    zurückgehalten, bis alle bereit oder ausgefallen sind (höchstens MTFPL_STARTUP_HOLD Sekunden),
+    damit sie über alle Worker verteilt werden statt auf dem ersten bereiten zu landen.
+    """
+    frontend = proxy.context.socket(zmq.ROUTER)
+    frontend.bind(f"tcp://0.0.0.0:{EXT_PORT_CMD}")
+    replies = proxy.context.socket(zmq.PULL)
+    replies.bind("inproc://cmd_replies")
+    workers = ThreadPoolExecutor(max_workers=CMD_WORKERS, thread_name_prefix="cmd")
     print(f"[EXTERN] CMD Listening on {EXT_PORT_CMD}")
+
+    poller = zmq.Poller()
+    poller.register(frontend, zmq.POLLIN)
+    poller.register(replies, zmq.POLLIN)
+
+    # DEALER mit Request-IDs: mehrere Befehle gleichzeitig unterwegs, Timeouts lassen
+    # den Socket nicht in einem kaputten Zustand zurück (anders als REQ)
+    backends = {}
+    for w in proxy.pool.workers:
+        sock = worker_socket(proxy.context, zmq.DEALER, w.endpoint(w.port_cmd))
+        backends[sock] = w
+        poller.register(sock, zmq.POLLIN)
+    sockets = {w.worker_id: sock for sock, w in backends.items()}
+
+    # request_id -> (Client-Envelope oder None, Befehl, Deadline, Worker)
+    pending = {}
+    # Zurückgehaltene Befehle während des Starts: (Envelope, Client-Befehl, Payload, Deadline)
+    waiting = []
+
+    def send_to_worker(worker, envelope, cmd, payload, timeout=DOCKER_TIMEOUT):
+        req_id = str(next(proxy.request_ids)).encode()
+        try:
+            sockets[worker.worker_id].send_multipart([req_id, b"", pickle.dumps(payload)], flags=zmq.NOBLOCK)
+        except zmq.Again:
+            # Keine Verbindung zum Worker
+            return False
+        pending[req_id] = (envelope, cmd, time.time() + timeout, worker)
+        return True
     
+    def dispatch(envelope, msg, payload, hold=True):
+        # Neue Sessions erst platzieren, wenn alle startenden Worker bereit (oder ausgefallen) sind
+        if hold and payload["cmd"] == "INIT" and proxy.pool.hold_placement(msg.get("session", 0)):
+            waiting.append((envelope, msg, payload, time.time() + STARTUP_HOLD))
+            print(f"[POOL] {msg.get('cmd')} wartet, bis alle Worker gestartet sind")
+            return
+        worker = route_docker_command(msg, payload)
+        if worker is None or not send_to_worker(worker, envelope, msg.get("cmd"), payload):
+            frontend.send_multipart(envelope + [docker_reply(msg.get("cmd"), None)])
+
     while True:
         try:
-            msg = socket.recv_pyobj()
-            cmd = msg.get("cmd")
-            
-            if cmd == "UPLOAD_CAD":
-                proxy.save_cad_locally(msg["filename"], msg["data"])
-                proxy.current_filename = msg["filename"]
-                socket.send_string("OK")
-            
-            elif cmd == "UPLOAD_CAD_BUNDLE":
-                filename = msg["filename"]
-                base_name = os.path.splitext(filename)[0]
-                
-                proxy.save_cad_locally(filename, msg["obj_data"])
-                proxy.save_cad_locally(base_name + ".mtl", msg["mtl_data"])
-                proxy.save_cad_locally(base_name + ".png", msg["png_data"])
-                
-                proxy.current_filename = filename
-                socket.send_string("OK")
-                
-            elif cmd == "SET_MASK":
-                pts = msg['points']
-                x = min(pts[0][0], pts[1][0])
-                y = min(pts[0][1], pts[1][1])
-                w = abs(pts[0][0] - pts[1][0])
-                h = abs(pts[0][1] - pts[1][1])
-                
-                K = msg.get("K", [[615.3, 0, 320], [0, 615.3, 240], [0, 0, 1]])
-                
-                if proxy.send_init_to_docker([x, y, w, h], K):
-                    socket.send_string("OK")
-                else:
-                    socket.send_string("ERROR")
-                    
-            elif cmd == "STOP":
-                print("[HOST] Leite STOP an Docker weiter...")
-                try:
-                    proxy.docker_cmd.send_pyobj({"cmd": "STOP"})
-                    resp = proxy.docker_cmd.recv_string() 
-                    socket.send_string(resp) 
-                except Exception as e:
-                    print(f"[HOST] Fehler beim Stoppen: {e}")
-                    socket.send_string("ERROR")
-                    
-            elif cmd == "GET_TEXTURES":
-                print("[CONTROL] Client fragt nach Texturen...")
-                textures = get_available_textures()
-                socket.send_pyobj({"status": "OK", "textures": textures})
-                
-            elif cmd == "GET_TEXTURE_FULL":
-                tex_name = msg.get("name")
-                print(f"[PROXY] Client will High-Res Textur: {tex_name}")
-                full_data = load_full_texture_data(tex_name)
-                
-                if full_data:
-                    socket.send_pyobj({"status": "OK", "data": full_data})
+            starting = proxy.pool.starting()
+            interval = STARTUP_POLL_INTERVAL if starting else HEARTBEAT_INTERVAL
+            socks = dict(poller.poll(int(interval * 500)))
+
+            if replies in socks:
+                frontend.send_multipart(replies.recv_multipart())
+
+            for sock, worker in backends.items():
+                if sock not in socks:
+                    continue
+                req_id, _, payload = sock.recv_multipart()
+                entry = pending.pop(req_id, None)
+                if entry is None:
+                    continue
+                envelope, cmd = entry[0], entry[1]
+                if cmd == "HEARTBEAT":
+                    proxy.pool.update(worker, pickle.loads(payload))
+                elif envelope is not None:
+                    frontend.send_multipart(envelope + [docker_reply(cmd, payload)])
+
+            if frontend in socks:
+                frames = frontend.recv_multipart()
+                envelope = frames[:-1]
+                msg = pickle.loads(frames[-1])
+                cmd = msg.get("cmd")
+
+                if cmd in DOCKER_COMMANDS:
+                    payload = docker_payload(msg)
+                    if payload is None:
+                        frontend.send_multipart(envelope + [docker_reply(cmd, None)])
+                    else:
+                        dispatch(envelope, msg, payload)
                 else:
-                    socket.send_pyobj({"status": "ERROR"})
-
-            elif cmd == "SET_TEXTURE":
-                tex_name = msg.get("name")
-                print(f"[PROXY] Leite Textur-Wahl an Docker weiter: {tex_name}")
-                
-                try:
-                    proxy.docker_cmd.send_pyobj({
-                        "cmd": "SET_TEXTURE", 
-                        "name": tex_name
-                    })
-                    resp = proxy.docker_cmd.recv_string()
-                    socket.send_string(resp)
-                except Exception as e:
-                    print(f"[PROXY] Fehler beim Weiterleiten von SET_TEXTURE: {e}")
-                    socket.send_string("ERROR")
-                    
-            else:
-                socket.send_string("UNKNOWN")
+                    workers.submit(run_local_command, envelope, msg)
+
+            now = time.time()
+            if waiting and not proxy.pool.starting():
+                held, waiting[:] = list(waiting), []
+                for envelope, msg, payload, _ in held:
+                    dispatch(envelope, msg, payload, hold=False)
+            for item in [w for w in waiting if w[3] < now]:
+                # Ein Worker startet zu lange: auf die bereiten verteilen statt den Client scheitern zu lassen
+                waiting.remove(item)
+                print(f"[POOL] Worker starten noch, {item[1].get('cmd')} geht an einen bereiten Worker")
+                dispatch(*item[:3], hold=False)
+
+            for worker in proxy.pool.workers:
+                if now - worker.last_ping > interval:
+                    worker.last_ping = now
+                    send_to_worker(worker, None, "HEARTBEAT", {"cmd": "STATS"}, timeout=HEARTBEAT_INTERVAL * 3)
+
+            for session, worker, commands in proxy.pool.check(now):
+                print(f"[POOL] Stelle Session {session} auf {worker} wieder her")
+                for payload in commands:
+                    send_to_worker(worker, None, payload["cmd"], payload)
+
+            for req_id in [r for r, e in pending.items() if e[2] < now]:
+                envelope, cmd, _, worker = pending.pop(req_id)
+                if envelope is not None:
+                    print(f"[ERROR] Docker Timeout bei {cmd} ({worker})")
+                    frontend.send_multipart(envelope + [docker_reply(cmd, None)])
         except Exception as e:
             print(f"CMD Error: {e}")
             
-def get_available_textures(texture_path="textures"):
-    texture_list = []
-    
-    if not os.path.exists(TEXTURE_DIR):
-        return []
-
-    for item in os.listdir(texture_path):
-        sub_dir = os.path.join(texture_path, item)
-        if os.path.isdir(sub_dir):
-            image_file = None
-            for f in os.listdir(TEXTURE_DIR):
-                if "Color" in f and f.endswith(('.jpg', '.png')):
-                    image_file = os.path.join(sub_dir, f)
-                    break
-            
-            if not image_file:
-                for f in os.listdir(sub_dir):
-                    if f.endswith(('.jpg', '.png')):
-                        image_file = os.path.join(sub_dir, f)
-                        break
-            
-            if image_file:
-                img = cv2.imread(image_file)
-                thumb = cv2.resize(img, (64, 64))
-                _, buffer = cv2.imencode('.jpg', thumb, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                thumb_bytes = buffer.tobytes()
-                
-                texture_list.append({
-                    "name": item,       
-                    "thumbnail": thumb_bytes
-                })
-    
-    return texture_list
+def handle_upload(cmd, msg):
+    """Chunked Upload: BEGIN -> CHUNK* -> COMMIT (oder ABORT). Fortsetzbar über den Offset aus BEGIN."""
+    store = proxy.store
+    if cmd == "UPLOAD_BEGIN":
+        resp = store.begin(msg["filename"], msg["sha256"], msg["size"])
+        if resp["status"] == "EXISTS" and is_main_model(msg["filename"]):
+            proxy.current_filename = msg["filename"]
+        return resp
 
-def load_full_texture_data(texture_name, base_path="textures"):
-    """Sucht die Original-Datei für eine Textur und gibt die Bytes zurück"""
-    target_dir = os.path.join(TEXTURE_DIR, texture_name)
-    if not os.path.exists(target_dir):
-        return None
-    
-    image_path = None
-    for f in os.listdir(target_dir):
-        if "Color" in f and f.endswith(('.jpg', '.png')):
-            image_path = os.path.join(target_dir, f)
-            break
-    
-    if not image_path:
-        for f in os.listdir(target_dir):
-            if f.endswith(('.jpg', '.png')):
-                image_path = os.path.join(target_dir, f)
-                break
-                
-    if image_path:
-        with open(image_path, "rb") as f:
-            return f.read() 
-    return None
+    if cmd == "UPLOAD_CHUNK":
+        offset = store.write_chunk(msg["upload_id"], msg["offset"], msg["data"])
+        return {"status": "OK", "offset": offset}
+
+    if cmd == "UPLOAD_COMMIT":
+        path = store.commit(msg["upload_id"], protect=proxy.protected_files())
+        if is_main_model(path):
+            proxy.current_filename = os.path.basename(path)
+        return {"status": "OK"}
+
+    store.abort(msg["upload_id"])
+    return {"status": "OK"}
+
+def is_main_model(filename):
+    return not filename.lower().endswith(('.mtl', '.png', '.jpg', '.jpeg'))
+
+def load_full_texture_data(variant, offset=0, length=None):
+    """Liest eine Textur-Variante oder (mit length) nur einen Ausschnitt davon.
+
+    Große Texturen holt der Client in mehreren Anfragen (offset/length),
+    damit der Command-Socket zwischendurch für andere Befehle frei ist.
+    """
+    with open(variant["path"], "rb") as f:
+        f.seek(offset)
+        return f.read() if length is None else f.read(length)
 
 if __name__ == "__main__":
     if not os.path.exists(SHARED_DIR):
@@ -245,6 +537,8 @@ if __name__ == "__main__":
         print(f"[WARN] chmod Fehler: {e}")
 
     try:
+        catalog.watch()
+
         t1 = threading.Thread(target=ext_command_loop, daemon=True)
         t2 = threading.Thread(target=video_forwarder, daemon=True)
         t3 = threading.Thread(target=result_forwarder, daemon=True)
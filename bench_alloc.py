@@ -0,0 +1,70 @@
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import cv2
+
+from frame_protocol import pack_frame, unpack_frame, decode_packet, CODEC_RAW, CODEC_JPEG, CODEC_PNG
+from buffer_pool import BufferPool
+
+# Vergleicht den Speicherumsatz pro Frame mit und ohne BufferPool.
+# Gemessen wird der transiente Peak (tracemalloc, inkl. numpy-Buffern) und die Anzahl
+# neu allozierter Pool-Buffer pro Frame im eingeschwungenen Zustand.
+
+
+def make_packet(width, height, codec):
+    yy, xx = np.mgrid[0:height, 0:width]
+    bgr = np.dstack([(xx * 255 // width), (yy * 255 // height), np.full_like(xx, 128)]).astype(np.uint8)
+    depth = (800 + 200 * np.sin(xx / 50.0)).astype(np.uint16)
+    if codec == "raw":
+        parts = pack_frame(bgr, depth, rgb_codec=CODEC_RAW, depth_codec=CODEC_RAW)
+    else:
+        _, rgb_jpg = cv2.imencode(".jpg", bgr)
+        _, depth_png = cv2.imencode(".png", depth)
+        parts = pack_frame(rgb_jpg.tobytes(), depth_png.tobytes(),
+                           rgb_codec=CODEC_JPEG, depth_codec=CODEC_PNG,
+                           rgb_shape=bgr.shape, depth_shape=depth.shape)
+    return unpack_frame(parts)
+
+
+def run(packet, frames, buffers):
+    # Warmup füllt den Pool
+    for _ in range(5):
+        frame = decode_packet(packet, buffers)
+        if buffers is not None:
+            buffers.release(*frame)
+    del frame
+    allocs_before = buffers.allocations if buffers is not None else 0
+
+    tracemalloc.start()
+    peaks = []
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        rgb, depth = decode_packet(packet, buffers)
+        if buffers is not None:
+            buffers.release(rgb, depth)
+        del rgb, depth
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    dt = time.perf_counter() - t0
+    tracemalloc.stop()
+
+    allocs = (buffers.allocations - allocs_before) / frames if buffers is not None else None
+    return np.mean(peaks) / 1e6, allocs, frames / dt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"=== Allokations-Benchmark {args.width}x{args.height} ===")
+    for codec in ["raw", "jpg+png"]:
+        packet = make_packet(args.width, args.height, codec)
+        for name, buffers in [("ohne Pool", None), ("mit Pool ", BufferPool())]:
+            mb, allocs, fps = run(packet, args.frames, buffers)
+            alloc_str = f"{allocs:.2f}" if allocs is not None else "-"
+            print(f"{codec:8s} {name} | {mb:7.2f} MB neu/Frame | Pool-Allokationen/Frame: {alloc_str:>5s} | {fps:7.1f} Frames/s")
@@ -0,0 +1,65 @@
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import cv2
+
+from frame_protocol import pack_frame, unpack_frame, decode_packet, CODEC_JPEG, CODEC_PNG
+
+# Misst den Decode-Durchsatz (Frames/s) in Abhängigkeit der Worker-Anzahl.
+# Beispiel: python bench_decode.py --width 1280 --height 720 --workers 1 2 4 8
+
+
+def make_packet(width, height):
+    rng = np.random.default_rng(0)
+    # Glatter Verlauf + Rauschen, damit JPEG/PNG realistisch komprimieren
+    yy, xx = np.mgrid[0:height, 0:width]
+    rgb = np.dstack([(xx * 255 // width), (yy * 255 // height), np.full_like(xx, 128)]).astype(np.uint8)
+    rgb = cv2.add(rgb, rng.integers(0, 20, rgb.shape, dtype=np.uint8))
+    depth = (800 + 200 * np.sin(xx / 50.0) + 100 * np.cos(yy / 40.0)).astype(np.uint16)
+
+    _, rgb_jpg = cv2.imencode(".jpg", rgb, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
+    _, depth_png = cv2.imencode(".png", depth)
+
+    parts = pack_frame(rgb_jpg.tobytes(), depth_png.tobytes(),
+                       rgb_codec=CODEC_JPEG, depth_codec=CODEC_PNG,
+                       rgb_shape=rgb.shape, depth_shape=depth.shape)
+    return unpack_frame(parts)
+
+
+def run(packet, workers, mode, frames):
+    if workers == 1:
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            decode_packet(packet)
+        return frames / (time.perf_counter() - t0)
+
+    if mode == "process":
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    with pool:
+        list(pool.map(decode_packet, [packet] * workers))  # Warmup
+        t0 = time.perf_counter()
+        list(pool.map(decode_packet, [packet] * frames))
+        return frames / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    args = parser.parse_args()
+
+    packet = make_packet(args.width, args.height)
+    print(f"=== Decode-Benchmark {args.width}x{args.height}, JPEG + PNG, Modus: {args.mode} ===")
+
+    base = None
+    for n in args.workers:
+        fps = run(packet, n, args.mode, args.frames)
+        base = base or fps
+        print(f"Worker: {n:2d} | {fps:8.1f} Frames/s | Speedup: {fps / base:4.2f}x")
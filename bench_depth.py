@@ -0,0 +1,62 @@
+import time
+import argparse
+import numpy as np
+import cv2
+
+from depth_codecs import CODECS, encode_depth, decode_depth
+from frame_protocol import depth_to_metres
+from frame_sources import synthetic_depth
+
+# Vergleicht die Depth-Codecs: Kompressionsrate, Encode- und Decode-Zeit (bis uint16 bzw. bis float32-Meter).
+# Beispiel: python bench_depth.py --files depth_0001.png depth_0002.png --quant 0 2 --rle
+
+
+def bench(depth, codec, quant, rle, repeat):
+    data = encode_depth(depth, codec, quant_shift=quant, rle=rle)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        encode_depth(depth, codec, quant_shift=quant, rle=rle)
+    t_enc = (time.perf_counter() - t0) / repeat
+
+    out = np.empty(depth.shape, np.uint16)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        decoded = decode_depth(codec, data, depth.shape, out=out)
+    t_dec = (time.perf_counter() - t0) / repeat
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        depth_to_metres(decode_depth(codec, data, depth.shape, out=out))
+    t_metres = (time.perf_counter() - t0) / repeat
+
+    expected = depth if not quant else (depth >> quant) << quant
+    lossless = np.array_equal(decoded, expected)
+    return len(data), t_enc, t_dec, t_metres, lossless
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", nargs="*", default=[], help="16-Bit-PNG-Tiefenbilder (mm)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--quant", type=int, nargs="+", default=[0], help="Quantisierungs-Shift (nur Delta-Codecs)")
+    parser.add_argument("--rle", action="store_true", help="Ungültige Pixel als Lauflängen (nur Delta-Codecs)")
+    args = parser.parse_args()
+
+    if args.files:
+        samples = [(f, cv2.imread(f, cv2.IMREAD_UNCHANGED)) for f in args.files]
+    else:
+        samples = [("synthetisch", synthetic_depth(args.width, args.height))]
+
+    for name, depth in samples:
+        print(f"=== {name}: {depth.shape[1]}x{depth.shape[0]}, {depth.nbytes / 1e6:.2f} MB roh ===")
+        print(f"{'Codec':<12} {'Quant':>5} {'RLE':>4} {'Ratio':>7} {'Encode':>10} {'Decode':>10} {'+Meter':>10}  Verlustfrei")
+        for codec_id, codec in CODECS.items():
+            variants = [(0, False)]
+            if codec_id >= 4:
+                variants = [(q, r) for q in args.quant for r in ({False, args.rle})]
+            for quant, rle in variants:
+                size, t_enc, t_dec, t_metres, lossless = bench(depth, codec_id, quant, rle, args.repeat)
+                print(f"{codec.name:<12} {quant:>5} {'ja' if rle else '-':>4} {depth.nbytes / size:>6.2f}x "
+                      f"{t_enc * 1000:>8.2f}ms {t_dec * 1000:>8.2f}ms {t_metres * 1000:>8.2f}ms  {'ja' if lossless else 'nein'}")
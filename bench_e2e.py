@@ -0,0 +1,491 @@
+import os
+import sys
+import json
+import time
+import glob
+import pickle
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import numpy as np
+import cv2
+import zmq
+import trimesh
+
+from frame_protocol import pack_frame, CODEC_RAW, CODEC_JPEG
+from depth_codecs import CODEC_IDS, encode_depth
+from result_protocol import unpack_result, topic
+from roi_stream import RoiStreamer
+from frame_sources import scale_k, synthetic_depth, synthetic_rgb
+
+# Ende-zu-Ende-Lastgenerator: startet Proxy und Runner (mt_fp_live.py mit CPU-Stub-Estimator,
+# stub_estimator.py), schickt von N Clients gleichzeitig RGB-D-Frames mit fester Rate über die
+# externen Ports und misst Latenz (Capture -> Ergebnis beim Client), Durchsatz, Verluste und
+# CPU pro Stage/Prozess. Ergebnis als JSON (--output), Vergleich mit einem früheren Lauf über --compare.
+#
+# Beispiele:
+#   python bench_e2e.py --clients 4 --fps 30 --width 1280 --height 720 --depth-codec delta_zlib --output run.json
+#   python bench_e2e.py --frames aufnahme/ --iter-ms 8 --compare run.json
+#   python bench_e2e.py --attach --host 10.0.0.5      (laufenden Server messen, ohne Prozesse zu starten)
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+EXT_PORT_CMD = 5555
+EXT_PORT_VID_IN = 5556
+EXT_PORT_RESULTS = 5558
+MESH_NAME = "bench_box.obj"
+SYNTHETIC_FRAMES = 16
+READY_TIMEOUT = 120.0
+# Zähler in den Runner-STATS (frames), die über den Lauf als Differenz berichtet werden
+FRAME_COUNTERS = ("received", "decoded", "tracked", "dropped")
+# Wichtigste Kennzahlen für --compare (Pfad im JSON, kleiner ist besser?)
+COMPARE_KEYS = [
+    (("total", "latency_ms", "p50"), True),
+    (("total", "latency_ms", "p95"), True),
+    (("total", "latency_ms", "p99"), True),
+    (("total", "throughput_fps"), False),
+    (("total", "drop_rate"), True),
+]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values) * 1000.0
+    return {
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+def load_frames(args):
+    """Liste von (bgr, depth_mm): aus --frames (rgb_*.jpg/png + depth_*.png) oder synthetisch."""
+    if not args.frames:
+        frames = []
+        for i in range(SYNTHETIC_FRAMES):
+            depth = synthetic_depth(args.width, args.height, seed=i)
+            frames.append((synthetic_rgb(depth, seed=i), depth))
+        return frames
+    rgb_files = sorted(glob.glob(os.path.join(args.frames, "rgb_*")))
+    depth_files = sorted(glob.glob(os.path.join(args.frames, "depth_*.png")))
+    if not rgb_files or len(rgb_files) != len(depth_files):
+        raise SystemExit(f"Erwarte gleich viele rgb_* und depth_*.png in {args.frames}")
+    return [(cv2.imread(r, cv2.IMREAD_COLOR), cv2.imread(d, cv2.IMREAD_UNCHANGED))
+            for r, d in zip(rgb_files, depth_files)]
+
+
+def encode_frame(bgr, depth, args):
+    """Gibt (rgb-Part, depth-Part, kwargs für pack_frame) zurück."""
+    kwargs = {"rgb_shape": bgr.shape, "depth_shape": depth.shape}
+    if args.rgb_codec == "jpg":
+        rgb = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality])[1].tobytes()
+        kwargs["rgb_codec"] = CODEC_JPEG
+    else:
+        rgb = bgr
+    codec = CODEC_IDS[args.depth_codec]
+    if codec == CODEC_RAW:
+        return rgb, depth, kwargs
+    kwargs["depth_codec"] = codec
+    return rgb, encode_depth(depth, codec, quant_shift=args.quant), kwargs
+
+
+class Client(threading.Thread):
+    def __init__(self, context, session, frames, encoded, args, t_start, t_measure, t_end):
+        super().__init__(daemon=True)
+        self.context = context
+        self.session = session
+        self.frames = frames
+        self.encoded = encoded
+        self.args = args
+        self.t_start, self.t_measure, self.t_end = t_start, t_measure, t_end
+        self.sent = 0
+        self.send_blocked = 0
+        self.late = 0
+        self.sent_bytes = 0
+        # frame_id -> capture_ts der Frames im Messfenster
+        self.window = {}
+        self.results = []
+        self.error = None
+
+    def command(self, msg, timeout=READY_TIMEOUT):
+        sock = self.context.socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+        sock.connect(f"tcp://{self.args.host}:{EXT_PORT_CMD}")
+        try:
+            sock.send(pickle.dumps(msg))
+            return sock.recv()
+        finally:
+            sock.close()
+
+    def run(self):
+        try:
+            self.track()
+        except Exception as e:
+            self.error = str(e)
+            print(f"[BENCH] Client {self.session}: {e}")
+
+    def track(self):
+        args = self.args
+        h, w = self.frames[0][1].shape[:2]
+        # Objekt in der Bildmitte (dort liegt auch der Vordergrund der synthetischen Tiefenbilder)
+        rect = [[w * 3 // 8, h // 3], [w * 5 // 8, h * 2 // 3]]
+        reply = self.command({"cmd": "SET_MASK", "points": rect, "K": scale_k(w, h),
+                              "filename": MESH_NAME, "session": self.session})
+        if reply != b"OK":
+            raise RuntimeError(f"SET_MASK abgelehnt: {reply!r}")
+
+        sub = self.context.socket(zmq.SUB)
+        sub.connect(f"tcp://{args.host}:{EXT_PORT_RESULTS}")
+        sub.setsockopt(zmq.SUBSCRIBE, topic(self.session))
+        push = self.context.socket(zmq.PUSH)
+        push.setsockopt(zmq.SNDHWM, 4)
+        push.setsockopt(zmq.LINGER, 0)
+        push.connect(f"tcp://{args.host}:{EXT_PORT_VID_IN}")
+        streamer = RoiStreamer() if args.roi else None
+        time.sleep(0.2)
+
+        period = 1.0 / args.fps
+        next_send = max(time.time(), self.t_start)
+        frame_id = 0
+        while True:
+            now = time.time()
+            if now >= self.t_end + args.drain:
+                break
+            if now >= next_send and now < self.t_end:
+                self.send(push, streamer, frame_id, now)
+                frame_id += 1
+                next_send += period
+                if time.time() - next_send > period:
+                    # Sender kommt nicht hinterher -> Takt neu aufsetzen statt Burst
+                    self.late += 1
+                    next_send = time.time()
+            timeout = max(0.0, min(next_send, self.t_end + args.drain) - time.time())
+            if sub.poll(int(timeout * 1000) + 1):
+                parts = sub.recv_multipart()
+                t_recv = time.time()
+                result = unpack_result(parts)
+                if streamer is not None:
+                    streamer.update(result)
+                if result["frame_id"] in self.window:
+                    self.results.append((result["capture_ts"], result["server_recv"], result["server_send"], t_recv))
+        sub.close()
+        push.close()
+        self.command({"cmd": "STOP", "session": self.session}, timeout=10.0)
+
+    def send(self, push, streamer, frame_id, now):
+        bgr, depth = self.frames[frame_id % len(self.frames)]
+        if streamer is not None:
+            bgr, depth, roi_args = streamer.select(bgr, depth)
+            rgb_part, depth_part, kwargs = encode_frame(bgr, depth, self.args)
+            kwargs.update(roi_args)
+        else:
+            rgb_part, depth_part, kwargs = self.encoded[frame_id % len(self.encoded)]
+        parts = pack_frame(rgb_part, depth_part, frame_id=frame_id, timestamp=now, session=self.session, **kwargs)
+        try:
+            push.send_multipart(parts, copy=False, flags=zmq.NOBLOCK)
+        except zmq.Again:
+            self.send_blocked += 1
+            return
+        if now >= self.t_measure:
+            self.window[frame_id] = now
+            self.sent += 1
+            self.sent_bytes += sum(len(p) if isinstance(p, bytes) else p.nbytes for p in parts)
+
+    def summary(self, duration):
+        latency = [t_recv - capture for capture, _, _, t_recv in self.results]
+        return {
+            "session": self.session,
+            "sent": self.sent,
+            "results": len(self.results),
+            "drop_rate": 1.0 - len(self.results) / self.sent if self.sent else None,
+            "send_blocked": self.send_blocked,
+            "late": self.late,
+            "throughput_fps": len(self.results) / duration,
+            "uplink_mbit_s": 8e-6 * self.sent_bytes / duration,
+            "latency_ms": percentiles(latency),
+            # Zerlegung nur aussagekräftig, wenn Client und Server dieselbe Uhr haben (lokal)
+            "uplink_ms": percentiles([recv - capture for capture, recv, _, _ in self.results]),
+            "server_ms": percentiles([send - recv for _, recv, send, _ in self.results]),
+            "downlink_ms": percentiles([t_recv - send for _, _, send, t_recv in self.results]),
+            "error": self.error,
+        }
+
+
+def process_cpu(pid):
+    """CPU-Sekunden (user + system) eines Prozesses aus /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def request(context, endpoint, msg, timeout=5.0):
+    sock = context.socket(zmq.REQ)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+    sock.connect(endpoint)
+    try:
+        sock.send(pickle.dumps(msg))
+        return sock.recv()
+    except zmq.Again:
+        return None
+    finally:
+        sock.close()
+
+
+def runner_stats(context, args, ports):
+    """STATS direkt von den gestarteten Runnern, beim --attach über den Proxy."""
+    if not ports:
+        reply = request(context, f"tcp://{args.host}:{EXT_PORT_CMD}", {"cmd": "STATS"})
+        reply = pickle.loads(reply) if reply else {}
+        return [reply.get("stats")] if reply.get("status") == "OK" else []
+    stats = []
+    for port in ports:
+        reply = request(context, f"tcp://127.0.0.1:{port}", {"cmd": "STATS"})
+        stats.append(pickle.loads(reply) if reply else None)
+    return stats
+
+
+def server_summary(before, after, cpu_before, cpu_after, duration):
+    workers = []
+    for b, a in zip(before, after):
+        if not a:
+            workers.append(None)
+            continue
+        b = b or {}
+        tracked = a["frames"]["tracked"] - b.get("frames", {}).get("tracked", 0)
+        cpu = {stage: s - b.get("cpu_s", {}).get(stage, 0.0) for stage, s in a.get("cpu_s", {}).items()}
+        workers.append({
+            # Zähler als Differenz über den Lauf, Momentanwerte (sessions, uptime) wie im letzten Stand
+            "frames": {k: v - b.get("frames", {}).get(k, 0) if k in FRAME_COUNTERS else v
+                       for k, v in a["frames"].items() if isinstance(v, (int, float))},
+            "stages": a["stages"],
+            "counters": {k: v - b.get("counters", {}).get(k, 0) for k, v in a["counters"].items()},
+            # CPU pro getracktem Frame und Stage (time.thread_time im Runner)
+            "cpu_ms_per_frame": {stage: 1000.0 * s / tracked for stage, s in cpu.items()} if tracked else None,
+        })
+    processes = {}
+    for name, t0 in cpu_before.items():
+        t1 = cpu_after.get(name)
+        if t0 is not None and t1 is not None:
+            processes[name] = {"cpu_s": t1 - t0, "cpu_percent": 100.0 * (t1 - t0) / duration}
+    return {"workers": workers, "processes": processes}
+
+
+def start_server(args, tmp):
+    env = dict(os.environ, MTFPL_SHARED_DIR=os.path.join(tmp, "shared"), MTFPL_MESH_CACHE=os.path.join(tmp, "mesh_cache"),
+               MTFPL_STUB_ESTIMATOR="1", MTFPL_STUB_ITER_MS=str(args.iter_ms),
+               MTFPL_STUB_REGISTER_MS=str(args.register_ms), MTFPL_STUB_MODE=args.stub_mode,
+               MTFPL_BOOT_TS=str(time.time()))
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    ports = [args.port_base + 1000 * i for i in range(args.workers)]
+    procs = {}
+    for i, port in enumerate(ports):
+        log = open(os.path.join(tmp, f"runner_{i}.log"), "w")
+        procs[f"runner_{i}"] = subprocess.Popen([sys.executable, "-u", "mt_fp_live.py"], cwd=SCRIPT_DIR,
+                                                env=dict(env, MTFPL_PORT_BASE=str(port)), stdout=log, stderr=subprocess.STDOUT)
+    log = open(os.path.join(tmp, "proxy.log"), "w")
+    procs["proxy"] = subprocess.Popen([sys.executable, "-u", "MTFPL_server_proxy.py"], cwd=SCRIPT_DIR,
+                                      env=dict(env, MTFPL_WORKERS=",".join(f"127.0.0.1:{p}" for p in ports)),
+                                      stdout=log, stderr=subprocess.STDOUT)
+    return procs, ports
+
+
+def stop_server(procs):
+    # SIGINT, damit der Proxy aufräumt (SHARED_DIR)
+    for proc in procs.values():
+        if proc.poll() is None:
+            proc.send_signal(signal.SIGINT)
+    for proc in procs.values():
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def wait_ready(context, args, ports, procs):
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        for name, proc in procs.items():
+            if proc.poll() is not None:
+                raise SystemExit(f"{name} beendet (Code {proc.returncode}), siehe Log")
+        # Proxy-HEALTH: bereit, wenn kein Worker mehr startet (sonst hält er die SET_MASK noch zurück)
+        reply = request(context, f"tcp://{args.host}:{EXT_PORT_CMD}", {"cmd": "HEALTH"}, timeout=2.0)
+        health = pickle.loads(reply) if reply and reply[:1] == b"\x80" else {}
+        # Ältere Proxys (--attach) kennen HEALTH nicht und verteilen ohne Start-Phase
+        if health.get("ready") or reply == b"UNKNOWN":
+            stats = runner_stats(context, args, ports)
+            # Runner binden sofort, bereit erst mit geladenen Netzen (startup.py)
+            if stats and all(s and s.get("startup", {}).get("ready", True) for s in stats):
+                return stats
+        time.sleep(0.2)
+    raise SystemExit("Server nicht bereit")
+
+
+def upload_mesh(context, args):
+    mesh = trimesh.creation.box(extents=[100.0, 80.0, 60.0])  # mm, der Runner skaliert mit 0.001
+    data = mesh.export(file_type="obj").encode()
+    reply = request(context, f"tcp://{args.host}:{EXT_PORT_CMD}",
+                    {"cmd": "UPLOAD_CAD", "filename": MESH_NAME, "data": data}, timeout=30.0)
+    if reply != b"OK":
+        raise SystemExit(f"Mesh-Upload fehlgeschlagen: {reply!r}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or data.get(key) is None:
+            return None
+        data = data[key]
+    return data
+
+
+def print_report(report, baseline=None):
+    total = report["total"]
+    lat = total["latency_ms"] or {}
+    print(f"\n=== {report['config']['clients']} Clients, {report['config']['fps']} fps, "
+          f"{report['config']['width']}x{report['config']['height']}, "
+          f"{report['config']['rgb_codec']}+{report['config']['depth_codec']} ===")
+    print(f"{'Session':>7} {'Gesendet':>8} {'Ergebn.':>8} {'Verlust':>8} {'fps':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for c in report["clients"]:
+        cl = c["latency_ms"] or {}
+        print(f"{c['session']:>7} {c['sent']:>8} {c['results']:>8} {(c['drop_rate'] or 0) * 100:>7.1f}% "
+              f"{c['throughput_fps']:>7.1f} {cl.get('p50', 0):>6.1f}ms {cl.get('p95', 0):>6.1f}ms {cl.get('p99', 0):>6.1f}ms")
+    print(f"{'Gesamt':>7} {total['sent']:>8} {total['results']:>8} {(total['drop_rate'] or 0) * 100:>7.1f}% "
+          f"{total['throughput_fps']:>7.1f} {lat.get('p50', 0):>6.1f}ms {lat.get('p95', 0):>6.1f}ms {lat.get('p99', 0):>6.1f}ms")
+
+    for i, worker in enumerate(report["server"]["workers"]):
+        if not worker:
+            continue
+        print(f"\nRunner {i}: " + ", ".join(f"{k}={v}" for k, v in worker["frames"].items()))
+        cpu = worker["cpu_ms_per_frame"] or {}
+        print(f"{'Stage':<14} {'p50':>8} {'p95':>8} {'p99':>8} {'CPU/Frame':>10}")
+        for stage, entry in sorted(worker["stages"].items()):
+            cpu_ms = f"{cpu[stage]:>8.2f}ms" if stage in cpu else f"{'-':>10}"
+            print(f"{stage:<14} {entry['p50_ms']:>6.2f}ms {entry['p95_ms']:>6.2f}ms {entry['p99_ms']:>6.2f}ms {cpu_ms}")
+    for name, proc in report["server"]["processes"].items():
+        print(f"CPU {name}: {proc['cpu_percent']:.1f}%")
+
+    if baseline is not None:
+        print(f"\nVergleich mit {baseline.get('revision') or '?'} ({baseline.get('label') or '-'}):")
+        for path, lower_is_better in COMPARE_KEYS:
+            old, new = lookup(baseline, path), lookup(report, path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100.0 if old else 0.0
+            worse = change > 0 if lower_is_better else change < 0
+            mark = " <- schlechter" if worse and abs(change) > 5.0 else ""
+            print(f"  {'.'.join(path):<26} {old:>9.2f} -> {new:>9.2f} ({change:+.1f}%){mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1, help="Gleichzeitige Clients (je eine Session)")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--frames", help="Ordner mit aufgenommenen Frames (rgb_*.jpg/png, depth_*.png in mm)")
+    parser.add_argument("--rgb-codec", choices=["jpg", "raw"], default="jpg")
+    parser.add_argument("--jpeg-quality", type=int, default=90)
+    parser.add_argument("--depth-codec", choices=sorted(CODEC_IDS), default="png")
+    parser.add_argument("--quant", type=int, default=0, help="Quantisierungs-Shift für Delta-Codecs")
+    parser.add_argument("--roi", action="store_true", help="Nur den ROI-Ausschnitt senden (roi_stream.py)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Messdauer (s)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Einschwingzeit vor der Messung (s)")
+    parser.add_argument("--drain", type=float, default=1.0, help="Wartezeit auf ausstehende Ergebnisse (s)")
+    parser.add_argument("--iter-ms", type=float, default=5.0, help="Stub-Kosten pro Tracking-Iteration")
+    parser.add_argument("--register-ms", type=float, default=200.0, help="Stub-Kosten der Registrierung")
+    parser.add_argument("--stub-mode", choices=["sleep", "spin"], default="sleep")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl Runner-Prozesse")
+    parser.add_argument("--port-base", type=int, default=6666)
+    parser.add_argument("--env", action="append", default=[], help="Zusätzliche Umgebung für die Server, KEY=VALUE")
+    parser.add_argument("--attach", action="store_true", help="Laufenden Server messen, nichts starten")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--label", help="Freitext für den Bericht")
+    parser.add_argument("--output", help="JSON-Datei für die Ergebnisse")
+    parser.add_argument("--compare", help="Früheres JSON-Ergebnis zum Vergleich")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    encoded = [encode_frame(bgr, depth, args) for bgr, depth in frames]
+    context = zmq.Context()
+    tmp = tempfile.mkdtemp(prefix="mtfpl_bench_")
+    procs, ports = {}, []
+    try:
+        if not args.attach:
+            procs, ports = start_server(args, tmp)
+            print(f"[BENCH] Server gestartet, Logs in {tmp}")
+        t_boot = time.time()
+        ready_stats = wait_ready(context, args, ports, procs)
+        startup = {"ready_s": time.time() - t_boot, "workers": [s.get("startup") for s in ready_stats]}
+        print(f"[BENCH] Server bereit nach {startup['ready_s']:.1f} s")
+        upload_mesh(context, args)
+
+        t_start = time.time() + 0.5
+        t_measure = t_start + args.warmup
+        t_end = t_measure + args.duration
+        clients = [Client(context, i, frames, encoded, args, t_start, t_measure, t_end) for i in range(args.clients)]
+        for c in clients:
+            c.start()
+
+        time.sleep(max(0.0, t_measure - time.time()))
+        stats_before = runner_stats(context, args, ports)
+        cpu_before = {name: process_cpu(p.pid) for name, p in procs.items()}
+        time.sleep(max(0.0, t_end - time.time()))
+        stats_after = runner_stats(context, args, ports)
+        cpu_after = {name: process_cpu(p.pid) for name, p in procs.items()}
+        for c in clients:
+            c.join()
+    finally:
+        stop_server(procs)
+
+    summaries = [c.summary(args.duration) for c in clients]
+    sent = sum(s["sent"] for s in summaries)
+    results = sum(s["results"] for s in summaries)
+    report = {
+        "revision": git_revision(),
+        "label": args.label,
+        "timestamp": time.time(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "label")},
+        "clients": summaries,
+        "total": {
+            "sent": sent,
+            "results": results,
+            "drop_rate": 1.0 - results / sent if sent else None,
+            "throughput_fps": results / args.duration,
+            "uplink_mbit_s": sum(s["uplink_mbit_s"] for s in summaries),
+            "latency_ms": percentiles([t_recv - capture for c in clients for capture, _, _, t_recv in c.results]),
+        },
+        "server": server_summary(stats_before, stats_after, cpu_before, cpu_after, args.duration),
+        "startup": startup,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[BENCH] Ergebnisse in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
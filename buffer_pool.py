@@ -0,0 +1,45 @@
+import threading
+from collections import defaultdict, deque
+import numpy as np
+
+
+class BufferPool:
+    """Recycelt Arrays fester Shape/Dtype, damit im Frame-Loop nicht ständig neu alloziert wird.
+
+    Pro (shape, dtype) werden höchstens `depth` freie Buffer vorgehalten.
+    """
+
+    def __init__(self, depth=4):
+        self.depth = depth
+        self.free = defaultdict(deque)
+        self.lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape, dtype):
+        key = (tuple(shape), np.dtype(dtype))
+        with self.lock:
+            ring = self.free[key]
+            if ring:
+                self.reuses += 1
+                return ring.popleft()
+            self.allocations += 1
+        return np.empty(key[0], dtype=key[1])
+
+    def release(self, *arrays):
+        with self.lock:
+            for arr in arrays:
+                # Views (z.B. np.frombuffer auf zmq-Frames) nicht übernehmen
+                if arr is None or arr.base is not None or not arr.flags.c_contiguous:
+                    continue
+                ring = self.free[(arr.shape, arr.dtype)]
+                if len(ring) < self.depth and not any(b is arr for b in ring):
+                    ring.append(arr)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "allocations": self.allocations,
+                "reuses": self.reuses,
+                "free": sum(len(r) for r in self.free.values()),
+            }
@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+
+# Inhaltsadressierter Speicher für hochgeladene CAD-Dateien im SHARED_DIR.
+#   SHARED_DIR/.cas/<sha256>        eigentliche Datei
+#   SHARED_DIR/.cas/<sha256>.part   laufender (fortsetzbarer) Upload
+#   SHARED_DIR/<filename>           Symlink auf .cas/<sha256>, so wie der Runner sie lädt
+# Uploads laufen in Chunks (BEGIN/CHUNK/COMMIT/ABORT), identische Inhalte werden nur einmal gespeichert.
+
+CAS_DIR = ".cas"
+QUOTA_BYTES = int(os.environ.get("MTFPL_SHARED_QUOTA_MB", "10240")) * 1024 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+def check_filename(filename):
+    """Nur reine Dateinamen (keine Pfade, kein "..", keine versteckten Dateien), sonst UploadError."""
+    if not filename or filename.startswith(".") or "/" in filename or "\\" in filename:
+        raise UploadError(f"Ungültiger Dateiname: {filename}")
+    return filename
+
+
+class CadStore:
+    def __init__(self, shared_dir, quota_bytes=QUOTA_BYTES):
+        self.shared_dir = shared_dir
+        self.cas_dir = os.path.join(shared_dir, CAS_DIR)
+        self.quota_bytes = quota_bytes
+        self.uploads = {}
+        self.lock = threading.Lock()
+
+    def ensure_dirs(self):
+        os.makedirs(self.cas_dir, exist_ok=True)
+
+    def blob_path(self, sha):
+        if len(sha) != 64 or not all(c in "0123456789abcdef" for c in sha):
+            raise UploadError(f"Ungültiger Hash: {sha}")
+        return os.path.join(self.cas_dir, sha)
+
+    def has(self, sha):
+        return os.path.exists(self.blob_path(sha))
+
+    def link(self, filename, sha):
+        target = os.path.join(self.shared_dir, check_filename(filename))
+        tmp = f"{target}.{uuid.uuid4().hex}.lnk"
+        os.symlink(os.path.join(CAS_DIR, sha), tmp)
+        os.replace(tmp, target)
+        # mtime dient als LRU-Zeitstempel
+        os.utime(self.blob_path(sha))
+        print(f"[HOST] Gespeichert: {target} -> {sha[:12]}")
+        return target
+
+    def put_bytes(self, filename, data):
+        """Speichert eine komplett übertragene Datei (alte UPLOAD_CAD-Befehle)."""
+        check_filename(filename)
+        self.ensure_dirs()
+        sha = hashlib.sha256(data).hexdigest()
+        if not self.has(sha):
+            tmp = self.blob_path(sha) + f".{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.blob_path(sha))
+        return self.link(filename, sha)
+
+    def begin(self, filename, sha, size):
+        """Startet oder setzt einen Upload fort. Ist der Inhalt schon vorhanden, wird nur verlinkt."""
+        check_filename(filename)
+        self.ensure_dirs()
+        if self.has(sha):
+            self.link(filename, sha)
+            return {"status": "EXISTS"}
+
+        upload_id = sha
+        part = self.blob_path(sha) + ".part"
+        with self.lock:
+            state = self.uploads.get(upload_id)
+            if state is None:
+                # Fortsetzen nach Neustart/Verbindungsabbruch: vorhandenen Teil nachhashen
+                hasher = hashlib.sha256()
+                offset = 0
+                if os.path.exists(part):
+                    with open(part, "rb") as f:
+                        for chunk in iter(lambda: f.read(1 << 20), b""):
+                            hasher.update(chunk)
+                            offset += len(chunk)
+                state = {"filename": filename, "size": size, "offset": offset, "hasher": hasher, "part": part}
+                self.uploads[upload_id] = state
+            state["filename"] = filename
+            state["touched"] = time.time()
+        return {"status": "OK", "upload_id": upload_id, "offset": state["offset"]}
+
+    def write_chunk(self, upload_id, offset, data):
+        state = self.uploads.get(upload_id)
+        if state is None:
+            raise UploadError("Unbekannter Upload")
+        with self.lock:
+            if offset != state["offset"]:
+                # Client soll ab dem tatsächlichen Stand weitermachen
+                return state["offset"]
+            if state["offset"] + len(data) > state["size"]:
+                raise UploadError("Upload größer als angekündigt")
+            with open(state["part"], "ab") as f:
+                f.write(data)
+            state["hasher"].update(data)
+            state["offset"] += len(data)
+            state["touched"] = time.time()
+            return state["offset"]
+
+    def commit(self, upload_id, protect=()):
+        state = self.uploads.get(upload_id)
+        if state is None:
+            raise UploadError("Unbekannter Upload")
+        with self.lock:
+            if state["offset"] != state["size"]:
+                raise UploadError(f"Upload unvollständig ({state['offset']}/{state['size']} Bytes)")
+            if state["hasher"].hexdigest() != upload_id:
+                self.uploads.pop(upload_id, None)
+                os.remove(state["part"])
+                raise UploadError("Hash stimmt nicht, Upload verworfen")
+            os.replace(state["part"], self.blob_path(upload_id))
+            self.uploads.pop(upload_id, None)
+        path = self.link(state["filename"], upload_id)
+        self.enforce_quota(protect)
+        return path
+
+    def abort(self, upload_id):
+        with self.lock:
+            state = self.uploads.pop(upload_id, None)
+        if state and os.path.exists(state["part"]):
+            os.remove(state["part"])
+
+    def enforce_quota(self, protect=()):
+        """Löscht die am längsten nicht genutzten Dateien, bis die Quota eingehalten wird."""
+        blobs = []
+        total = 0
+        for entry in os.scandir(self.cas_dir):
+            st = entry.stat()
+            total += st.st_size
+            if len(entry.name) == 64:
+                blobs.append((st.st_mtime, entry.name, st.st_size))
+        if total <= self.quota_bytes:
+            return
+
+        # Dateinamen -> Hash, um Symlinks mit zu entfernen und geschützte Dateien zu erkennen
+        links = {}
+        for entry in os.scandir(self.shared_dir):
+            if entry.is_symlink():
+                links.setdefault(os.path.basename(os.readlink(entry.path)), []).append(entry.path)
+        protected = {os.path.basename(os.readlink(p)) for names in links.values() for p in names
+                     if os.path.basename(p) in protect}
+
+        for _, sha, size in sorted(blobs):
+            if total <= self.quota_bytes:
+                break
+            if sha in protected:
+                continue
+            os.remove(os.path.join(self.cas_dir, sha))
+            for link in links.get(sha, []):
+                os.remove(link)
+            total -= size
+            print(f"[HOST] Quota: {sha[:12]} entfernt ({size / 1e6:.1f} MB)")
@@ -0,0 +1,194 @@
+import struct
+import zlib
+import numpy as np
+import cv2
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Depth-Codecs für uint16-Tiefenbilder in Millimetern.
+# Die IDs stehen im Frame-Header (depth_codec, frame_protocol.py); RAW/PNG/ZLIB sind die alten Formate.
+#
+# Delta-Codecs: optional quantisieren (Shift), ungültige Pixel (0) optional als Lauflängen
+# abtrennen, zeilenweise Differenzen bilden. Differenzen in [-127, 127] werden als ein Byte
+# gespeichert, alle anderen als Escape (-128) plus uint16 in einem eigenen Strom; beide Ströme
+# werden mit zlib / LZ4 / zstd komprimiert. Payload: DELTA_HEADER + Body + Escapes
+# (+ bei RLE: u32 Länge + zlib-komprimierte Lauflängen).
+
+CODEC_RAW = 0
+CODEC_PNG = 2
+CODEC_ZLIB = 3
+CODEC_DELTA_ZLIB = 4
+CODEC_DELTA_LZ4 = 5
+CODEC_DELTA_ZSTD = 6
+
+# quant_shift, flags, Länge des Bodys, Anzahl und Länge der Escapes
+DELTA_HEADER = struct.Struct("<BBIII")
+FLAG_RLE_INVALID = 0x01
+ESCAPE = -128
+
+
+class DepthCodec:
+    def __init__(self, codec_id, name, compress=None, decompress=None):
+        self.codec_id = codec_id
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+    def encode(self, depth, quant_shift=0, rle=False):
+        raise NotImplementedError
+
+    def decode(self, buf, shape, out=None):
+        """Gibt ein uint16-Array (mm) zurück, mit `out` in diesen Buffer."""
+        raise NotImplementedError
+
+
+class RawCodec(DepthCodec):
+    def encode(self, depth, quant_shift=0, rle=False):
+        return np.ascontiguousarray(depth, dtype=np.uint16).tobytes()
+
+    def decode(self, buf, shape, out=None):
+        depth = np.frombuffer(buf, dtype=np.uint16).reshape(shape)
+        if out is None:
+            return depth
+        np.copyto(out, depth)
+        return out
+
+
+class PngCodec(DepthCodec):
+    def encode(self, depth, quant_shift=0, rle=False):
+        return cv2.imencode(".png", np.asarray(depth, dtype=np.uint16), [cv2.IMWRITE_PNG_COMPRESSION, 1])[1].tobytes()
+
+    def decode(self, buf, shape, out=None):
+        return cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+class ZlibCodec(DepthCodec):
+    def encode(self, depth, quant_shift=0, rle=False):
+        return zlib.compress(np.ascontiguousarray(depth, dtype=np.uint16).tobytes(), 1)
+
+    def decode(self, buf, shape, out=None):
+        return np.frombuffer(zlib.decompress(buf), dtype=np.uint16).reshape(shape)
+
+
+def fill_invalid(depth):
+    """Ersetzt ungültige Pixel durch den letzten gültigen Wert (-> Delta 0) und liefert die Lauflängen."""
+    flat = depth.ravel()
+    invalid = flat == 0
+    # Lauflängen abwechselnd gültig/ungültig, beginnend mit gültig
+    edges = np.flatnonzero(np.diff(invalid.view(np.int8))) + 1
+    runs = np.diff(np.concatenate(([0], edges, [flat.size]))).astype(np.uint32)
+    if invalid[0]:
+        runs = np.concatenate(([0], runs)).astype(np.uint32)
+    idx = np.where(invalid, 0, np.arange(flat.size))
+    np.maximum.accumulate(idx, out=idx)
+    return flat[idx].reshape(depth.shape), runs
+
+
+def invalid_mask(runs, size):
+    # Ungerade Läufe sind ungültig
+    values = np.zeros(len(runs), dtype=bool)
+    values[1::2] = True
+    return np.repeat(values, runs)[:size]
+
+
+class DeltaCodec(DepthCodec):
+    def encode(self, depth, quant_shift=0, rle=False):
+        depth = np.ascontiguousarray(depth, dtype=np.uint16)
+        if quant_shift:
+            depth = depth >> np.uint16(quant_shift)
+        flags = 0
+        runs = None
+        if rle:
+            depth, runs = fill_invalid(depth)
+            flags |= FLAG_RLE_INVALID
+        delta = np.empty_like(depth)
+        delta[:, 0] = depth[:, 0]
+        # uint16-Überlauf ist gewollt, beim Dekodieren hebt er sich wieder auf
+        np.subtract(depth[:, 1:], depth[:, :-1], out=delta[:, 1:])
+
+        residual = delta.view(np.int16)
+        escaped = (residual < -127) | (residual > 127)
+        small = residual.astype(np.int8)
+        small[escaped] = ESCAPE
+        escapes = delta[escaped]
+        body = self.compress(small.tobytes())
+        esc_data = self.compress(escapes.tobytes())
+        payload = DELTA_HEADER.pack(quant_shift, flags, len(body), len(escapes), len(esc_data)) + body + esc_data
+        if runs is not None:
+            rle_data = zlib.compress(runs.tobytes(), 1)
+            payload += struct.pack("<I", len(rle_data)) + rle_data
+        return payload
+
+    def decode(self, buf, shape, out=None):
+        buf = memoryview(buf).cast("B")
+        quant_shift, flags, body_len, esc_count, esc_len = DELTA_HEADER.unpack_from(buf)
+        pos = DELTA_HEADER.size
+        n = shape[0] * shape[1]
+        small = np.frombuffer(self.decompress(buf[pos:pos + body_len], n), dtype=np.int8).reshape(shape)
+        pos += body_len
+        escapes = np.frombuffer(self.decompress(buf[pos:pos + esc_len], 2 * esc_count) if esc_count else b"",
+                                dtype=np.uint16)
+        pos += esc_len
+
+        residual = small.astype(np.int16)
+        residual[small == ESCAPE] = escapes.view(np.int16)
+        depth = np.cumsum(residual.view(np.uint16), axis=1, dtype=np.uint16, out=out)
+
+        if quant_shift:
+            depth <<= np.uint16(quant_shift)
+        if flags & FLAG_RLE_INVALID:
+            (rle_len,) = struct.unpack_from("<I", buf, pos)
+            runs = np.frombuffer(zlib.decompress(buf[pos + 4:pos + 4 + rle_len]), dtype=np.uint32)
+            depth.ravel()[invalid_mask(runs, n)] = 0
+        return depth
+
+
+CODECS = {}
+
+
+def register(codec):
+    CODECS[codec.codec_id] = codec
+    return codec
+
+
+register(RawCodec(CODEC_RAW, "raw"))
+register(PngCodec(CODEC_PNG, "png"))
+register(ZlibCodec(CODEC_ZLIB, "zlib"))
+register(DeltaCodec(CODEC_DELTA_ZLIB, "delta_zlib",
+                    compress=lambda data: zlib.compress(data, 1),
+                    decompress=lambda data, size: zlib.decompress(data)))
+if lz4_block is not None:
+    register(DeltaCodec(CODEC_DELTA_LZ4, "delta_lz4",
+                        compress=lambda data: lz4_block.compress(data, store_size=False),
+                        decompress=lambda data, size: lz4_block.decompress(data, uncompressed_size=size)))
+if zstandard is not None:
+    register(DeltaCodec(CODEC_DELTA_ZSTD, "delta_zstd",
+                        compress=zstandard.ZstdCompressor(level=1).compress,
+                        decompress=lambda data, size: zstandard.ZstdDecompressor().decompress(data, max_output_size=size)))
+
+CODEC_IDS = {codec.name: codec_id for codec_id, codec in CODECS.items()}
+
+
+def available_codecs():
+    """Für die Aushandlung mit dem Client: {Name: ID} der hier verfügbaren Depth-Codecs."""
+    return dict(CODEC_IDS)
+
+
+def encode_depth(depth, codec=CODEC_DELTA_ZLIB, quant_shift=0, rle=False):
+    return CODECS[codec].encode(depth, quant_shift=quant_shift, rle=rle)
+
+
+def decode_depth(codec, buf, shape, out=None):
+    try:
+        impl = CODECS[codec]
+    except KeyError:
+        raise ValueError(f"Depth-Codec nicht verfügbar: {codec}") from None
+    return impl.decode(buf, shape, out=out)
@@ -1,58 +1,259 @@
 import os
-import requests
+import time
+import json
+import shutil
+import hashlib
 import zipfile
-import io
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
-def download_specific_materials(limit_per_category=100):
+from texture_catalog import MANIFEST_FILE, load_manifest
+
+# Lädt Material-Texturen von ambientcg.com in den Textur-Ordner des Proxys.
+# Mehrere Assets parallel (begrenzt, pro Thread eine Session mit Keep-Alive), Archive werden
+# gestreamt auf Platte geschrieben und abgebrochene Übertragungen per Range-Request fortgesetzt.
+# Aus jedem Archiv werden nur die benötigten Maps entpackt (Standard: Color-Map).
+# Das Manifest (textures/.manifest.json: Asset-ID, Kategorie, Dateien mit SHA-256 und Größe) entscheidet,
+# ob ein Asset vollständig ist; halb entpackte Assets werden repariert. Der Katalog des Proxys
+# übernimmt daraus die Kategorien (texture_catalog.py).
+# Für Tests gegen einen lokalen HTTP-Server: --api-url / --download-url.
+
+API_URL = os.environ.get("MTFPL_TEXTURE_API", "https://ambientcg.com/api/v2/full_json")
+DOWNLOAD_URL = os.environ.get("MTFPL_TEXTURE_DOWNLOAD", "https://ambientcg.com/get?file={asset}_{resolution}.zip")
+CATEGORIES = ["Metal", "Plastic", "Wood", "Fabric"]
+RESOLUTION = "1K-PNG"
+# Teilstrings der Dateinamen im Archiv, die entpackt werden (der Runner nutzt nur die Color-Map)
+MAPS = ("Color",)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DOWNLOAD_WORKERS = int(os.environ.get("MTFPL_DOWNLOAD_WORKERS", "4"))
+RETRIES = 4
+BACKOFF = 1.0
+TIMEOUT = (10, 30)
+CHUNK_BYTES = 1 << 20
+ARCHIVE_DIR = ".downloads"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TextureDownloader:
+    def __init__(self, textures_root, api_url=API_URL, download_url=DOWNLOAD_URL, workers=DOWNLOAD_WORKERS,
+                 resolution=RESOLUTION, maps=MAPS, retries=RETRIES, keep_archives=False, verify=False):
+        self.textures_root = textures_root
+        self.archive_dir = os.path.join(textures_root, ARCHIVE_DIR)
+        self.manifest_path = os.path.join(textures_root, MANIFEST_FILE)
+        self.api_url = api_url
+        self.download_url = download_url
+        self.workers = workers
+        self.resolution = resolution
+        self.maps = tuple(maps)
+        self.retries = retries
+        self.keep_archives = keep_archives
+        # Dateien zusätzlich per Hash statt nur per Größe prüfen
+        self.verify = verify
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self.manifest = load_manifest(textures_root)
+
+    def session(self):
+        # requests.Session ist nicht thread-safe -> eine pro Worker-Thread, Verbindungen bleiben offen
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        return session
+
+    def save_manifest(self):
+        # Nach jedem fertigen Asset, damit ein Abbruch den Fortschritt nicht verliert
+        with self.lock:
+            data = json.dumps(self.manifest, indent=1, sort_keys=True)
+            tmp = self.manifest_path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(data)
+            os.replace(tmp, self.manifest_path)
+
+    def list_assets(self, category, limit):
+        response = self.session().get(self.api_url, params={"type": "Material", "category": category, "limit": limit},
+                                      timeout=TIMEOUT)
+        response.raise_for_status()
+        return [asset["assetId"] for asset in response.json().get("foundAssets", [])]
+
+    def is_complete(self, asset_id):
+        entry = self.manifest["assets"].get(asset_id)
+        if not entry or not entry.get("files"):
+            return False
+        material_dir = os.path.join(self.textures_root, asset_id)
+        for name, info in entry["files"].items():
+            path = os.path.join(material_dir, name)
+            if not os.path.isfile(path) or os.path.getsize(path) != info["size"]:
+                return False
+            if self.verify and file_sha256(path) != info["sha256"]:
+                return False
+        return True
+
+    def fetch(self, url, path):
+        """Streamt `url` nach `path`, setzt eine vorhandene .part-Datei per Range fort."""
+        part = path + ".part"
+        for attempt in range(self.retries):
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with self.session().get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+                    if r.status_code == 416:
+                        # Schon vollständig
+                        break
+                    r.raise_for_status()
+                    if offset and r.status_code != 206:
+                        # Server ignoriert Range -> von vorn
+                        offset = 0
+                    total = r.headers.get("Content-Length")
+                    expected = offset + int(total) if total is not None else None
+                    with open(part, "ab" if offset else "wb") as f:
+                        for chunk in r.iter_content(CHUNK_BYTES):
+                            f.write(chunk)
+                if expected is None or os.path.getsize(part) == expected:
+                    break
+                raise IOError(f"Übertragung unvollständig ({os.path.getsize(part)}/{expected} Bytes)")
+            except (requests.RequestException, IOError) as e:
+                if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code < 500:
+                    raise
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(BACKOFF * 2 ** attempt)
+        os.replace(part, path)
+        return path
+
+    def wanted(self, members):
+        images = [m for m in members if m.filename.lower().endswith(IMAGE_EXTENSIONS) and not m.is_dir()]
+        selected = [m for m in images if any(key in os.path.basename(m.filename) for key in self.maps)]
+        # Wie find_color_map: ohne passende Map das erste Bild
+        return selected or sorted(images, key=lambda m: m.filename)[:1]
+
+    def extract(self, asset_id, archive):
+        """Entpackt die benötigten Maps flach in den Material-Ordner. Gibt {Datei: {sha256, size}} zurück."""
+        material_dir = os.path.join(self.textures_root, asset_id)
+        os.makedirs(material_dir, exist_ok=True)
+        files = {}
+        with zipfile.ZipFile(archive) as z:
+            for member in self.wanted(z.infolist()):
+                name = os.path.basename(member.filename)
+                target = os.path.join(material_dir, name)
+                tmp = target + ".tmp"
+                h = hashlib.sha256()
+                with z.open(member) as src, open(tmp, "wb") as dst:
+                    for chunk in iter(lambda: src.read(CHUNK_BYTES), b""):
+                        h.update(chunk)
+                        dst.write(chunk)
+                os.replace(tmp, target)
+                files[name] = {"sha256": h.hexdigest(), "size": member.file_size}
+        if not files:
+            raise IOError("Keine Bilddateien im Archiv")
+        return files
+
+    def download_asset(self, asset_id, category):
+        url = self.download_url.format(asset=asset_id, resolution=self.resolution)
+        archive = os.path.join(self.archive_dir, f"{asset_id}_{self.resolution}.zip")
+        for attempt in range(2):
+            if not os.path.exists(archive):
+                self.fetch(url, archive)
+            try:
+                files = self.extract(asset_id, archive)
+                break
+            except zipfile.BadZipFile:
+                # Defektes Archiv (z.B. von einem alten Abbruch) einmal neu laden
+                os.remove(archive)
+                if attempt:
+                    raise
+        if not self.keep_archives:
+            os.remove(archive)
+
+        with self.lock:
+            self.manifest["assets"][asset_id] = {
+                "asset_id": asset_id,
+                "category": category,
+                "resolution": self.resolution,
+                "source": url,
+                "files": files,
+                "downloaded": time.time(),
+            }
+        self.save_manifest()
+        return files
+
+    def run(self, categories=CATEGORIES, limit_per_category=100):
+        jobs = {}
+        for category in categories:
+            try:
+                for asset_id in self.list_assets(category, limit_per_category):
+                    jobs.setdefault(asset_id, category)
+            except Exception as e:
+                print(f"Fehler bei API Abfrage für {category}: {e}")
+
+        # Kategorien auch für schon vorhandene Assets nachtragen
+        changed = False
+        for asset_id, category in jobs.items():
+            entry = self.manifest["assets"].get(asset_id)
+            if entry and entry.get("category") != category:
+                entry["category"] = category
+                changed = True
+        if changed:
+            self.save_manifest()
+
+        todo = {aid: cat for aid, cat in jobs.items() if not self.is_complete(aid)}
+        print(f"=== {len(jobs)} Assets, {len(jobs) - len(todo)} vollständig, {len(todo)} zu laden ===")
+        failed = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.download_asset, aid, cat): aid for aid, cat in todo.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Lade Texturen"):
+                aid = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[aid] = str(e)
+                    print(f"Fehler bei {aid}: {e}")
+        if not self.keep_archives and not os.listdir(self.archive_dir):
+            shutil.rmtree(self.archive_dir, ignore_errors=True)
+        return {"total": len(jobs), "downloaded": len(todo) - len(failed), "failed": failed}
+
+
+def download_specific_materials(limit_per_category=100, categories=CATEGORIES, **kwargs):
     base_path = os.path.dirname(os.path.realpath(__file__))
     textures_root = os.path.join(base_path, "textures")
-    
     os.makedirs(textures_root, exist_ok=True)
 
-    categories = ["Metal", "Plastic", "Wood", "Fabric"]
-
     print(f"=== Starte Download in: {textures_root} ===")
     print(f"=== Kategorien: {', '.join(categories)} ===")
+    return TextureDownloader(textures_root, **kwargs).run(categories, limit_per_category)
 
-    for cat in categories:
-        print(f"\nSuche nach Kategorie: {cat}...")
-        
-        url = f"https://ambientcg.com/api/v2/full_json?type=Material&category={cat}&limit={limit_per_category}"
-        
-        try:
-            response = requests.get(url, timeout=10)
-            assets = response.json().get('foundAssets', [])
-        except Exception as e:
-            print(f"Fehler bei API Abfrage für {cat}: {e}")
-            continue
-
-        for asset in tqdm(assets, desc=f"Lade {cat}"):
-            aid = asset['assetId']
-            
-            material_dir = os.path.join(textures_root, aid)
-            
-            if os.path.exists(material_dir) and os.listdir(material_dir):
-                continue
-
-            dl_url = f"https://ambientcg.com/get?file={aid}_1K-PNG.zip"
-            
-            try:
-                r = requests.get(dl_url, timeout=30)
-                if r.status_code != 200:
-                    continue
-
-                with zipfile.ZipFile(io.BytesIO(r.content)) as z:
-                    os.makedirs(material_dir, exist_ok=True)
-                    
-                    for filename in z.namelist():
-                        if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                            z.extract(filename, material_dir)
-                            
-            except Exception as e:
-                print(f"Fehler bei {aid}: {e}")
 
 if __name__ == "__main__":
-    download_specific_materials(limit_per_category=100)
-    
-    print("\nFertig! Alle Texturen liegen im Ordner 'textures'.")
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=100, help="Assets pro Kategorie")
+    parser.add_argument("--categories", nargs="+", default=CATEGORIES)
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="Parallele Downloads")
+    parser.add_argument("--resolution", default=RESOLUTION, help="z.B. 1K-PNG, 2K-JPG")
+    parser.add_argument("--maps", nargs="+", default=list(MAPS), help="Zu entpackende Maps, z.B. Color NormalGL")
+    parser.add_argument("--keep-archives", action="store_true")
+    parser.add_argument("--verify", action="store_true", help="Vorhandene Dateien per SHA-256 prüfen")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--download-url", default=DOWNLOAD_URL, help="Vorlage mit {asset} und {resolution}")
+    args = parser.parse_args()
+
+    summary = download_specific_materials(
+        limit_per_category=args.limit, categories=args.categories, workers=args.workers,
+        resolution=args.resolution, maps=args.maps, keep_archives=args.keep_archives, verify=args.verify,
+        api_url=args.api_url, download_url=args.download_url)
+
+    if summary["failed"]:
+        print(f"\n{len(summary['failed'])} Assets fehlgeschlagen, erneuter Aufruf setzt fort.")
+    print("\nFertig! Alle Texturen liegen im Ordner 'textures'.")
@@ -0,0 +1,258 @@
+import struct
+import pickle
+import zlib
+import numpy as np
+import cv2
+
+from depth_codecs import CODECS as DEPTH_CODECS, decode_depth
+
+# Binäres Frame-Format (Version 3, Versionen 1 und 2 werden weiter gelesen):
+#   Part 0: fester Header (HEADER, little endian)
+#   Part 1: RGB-Buffer (roh oder komprimiert)
+#   Part 2: Depth-Buffer (roh oder komprimiert)
+# Alte Clients schicken weiterhin ein einzelnes gepickeltes Dict.
+
+MAGIC = b"MVFP"
+VERSION = 3
+
+# magic, version, flags, frame_id, capture_ts,
+# rgb_h, rgb_w, rgb_c, rgb_dtype, rgb_codec,
+# depth_h, depth_w, depth_dtype, depth_codec
+HEADER_V1 = struct.Struct("<4sBBQdHHBBBHHBB")
+# v2: + session_id (u32)
+HEADER_V2 = struct.Struct("<4sBBQdHHBBBHHBBI")
+# v3: + roi_x, roi_y, full_h, full_w (u16), Ausschnitt aus einem größeren Bild (roi_stream.py), full_w = 0: Vollbild
+HEADER = struct.Struct("<4sBBQdHHBBBHHBBIHHHH")
+HEADERS = {1: HEADER_V1, 2: HEADER_V2, 3: HEADER}
+
+CODEC_RAW = 0
+CODEC_JPEG = 1
+CODEC_PNG = 2
+CODEC_ZLIB = 3
+
+CODEC_NAMES = {
+    CODEC_RAW: "raw",
+    CODEC_JPEG: "jpg",
+    CODEC_PNG: "png",
+    CODEC_ZLIB: "zlib",
+}
+# Weitere Depth-Codecs (IDs ab 4) aus depth_codecs.py, z.B. CODEC_DELTA_ZLIB
+CODEC_NAMES.update({k: c.name for k, c in DEPTH_CODECS.items() if k not in CODEC_NAMES})
+
+DTYPES = {
+    0: np.dtype(np.uint8),
+    1: np.dtype(np.uint16),
+    2: np.dtype(np.float32),
+}
+DTYPE_CODES = {v: k for k, v in DTYPES.items()}
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def is_binary_frame(first_part):
+    return len(first_part) >= HEADER_V1.size and bytes(first_part[:4]) == MAGIC
+
+
+def pack_header(frame_id, timestamp, rgb_shape, rgb_codec, depth_shape, depth_codec,
+                rgb_dtype=np.uint8, depth_dtype=np.uint16, flags=0, session=0,
+                roi_offset=None, full_shape=None):
+    h, w = rgb_shape[:2]
+    c = rgb_shape[2] if len(rgb_shape) > 2 else 1
+    dh, dw = depth_shape[:2]
+    rx, ry = roi_offset or (0, 0)
+    fh, fw = full_shape[:2] if full_shape is not None else (0, 0)
+    return HEADER.pack(
+        MAGIC, VERSION, flags, frame_id, timestamp,
+        h, w, c, DTYPE_CODES[np.dtype(rgb_dtype)], rgb_codec,
+        dh, dw, DTYPE_CODES[np.dtype(depth_dtype)], depth_codec, session,
+        rx, ry, fh, fw,
+    )
+
+
+def unpack_header(buf):
+    if len(buf) < HEADER_V1.size:
+        raise ProtocolError("Header zu kurz")
+    version = buf[4]
+    header = HEADERS.get(version)
+    if header is None:
+        raise ProtocolError(f"Nicht unterstützte Protokoll-Version: {version}")
+    if len(buf) < header.size:
+        raise ProtocolError("Header zu kurz")
+    fields = header.unpack_from(buf)
+    if fields[0] != MAGIC:
+        raise ProtocolError("Falsches Magic")
+    return {
+        "flags": fields[2],
+        "frame_id": fields[3],
+        "timestamp": fields[4],
+        "rgb_shape": (fields[5], fields[6], fields[7]),
+        "rgb_dtype": DTYPES[fields[8]],
+        "rgb_codec": fields[9],
+        "depth_shape": (fields[10], fields[11]),
+        "depth_dtype": DTYPES[fields[12]],
+        "depth_codec": fields[13],
+        "session": fields[14] if version >= 2 else 0,
+        # (x, y, volle Höhe, volle Breite) oder None
+        "roi": fields[15:19] if version >= 3 and fields[18] else None,
+    }
+
+
+def pack_frame(rgb, depth, frame_id=0, timestamp=0.0,
+               rgb_codec=CODEC_RAW, depth_codec=CODEC_RAW,
+               rgb_shape=None, depth_shape=None, session=0, roi_offset=None, full_shape=None):
+    """Baut die Multipart-Liste [header, rgb, depth] für send_multipart(copy=False).
+
+    Bei CODEC_RAW werden die Arrays direkt (ohne Kopie) als Buffer übergeben,
+    bei komprimierten Codecs die bereits kodierten Bytes. rgb_shape/depth_shape
+    sind dann die Shapes der dekodierten Bilder. Bei Ausschnitten (roi_stream.py) geben
+    roi_offset (x, y) und full_shape (h, w) die Lage im vollen Kamerabild an.
+    """
+    if rgb_codec == CODEC_RAW:
+        rgb = np.ascontiguousarray(rgb)
+        rgb_shape, rgb_dtype = rgb.shape, rgb.dtype
+    else:
+        rgb_dtype = np.uint8
+    if depth_codec == CODEC_RAW:
+        depth = np.ascontiguousarray(depth)
+        depth_shape, depth_dtype = depth.shape, depth.dtype
+    else:
+        depth_dtype = np.uint16
+
+    header = pack_header(frame_id, timestamp, rgb_shape or (0, 0, 3), rgb_codec,
+                         depth_shape or (0, 0), depth_codec,
+                         rgb_dtype=rgb_dtype, depth_dtype=depth_dtype, session=session,
+                         roi_offset=roi_offset, full_shape=full_shape)
+    return [header, rgb, depth]
+
+
+def send_frame(socket, rgb, depth, **kwargs):
+    socket.send_multipart(pack_frame(rgb, depth, **kwargs), copy=False)
+
+
+def _buffer(part):
+    # zmq.Frame (copy=False) oder bytes
+    return part.buffer if hasattr(part, "buffer") else memoryview(part)
+
+
+def frame_session(parts):
+    """Session-ID einer Nachricht, ohne die Buffer anzufassen (Routing im Proxy). Pickle -> 0."""
+    first = _buffer(parts[0])
+    if not is_binary_frame(first):
+        return 0
+    return unpack_header(first)["session"]
+
+
+def unpack_frame(parts, allow_pickle=True):
+    """Wandelt eine empfangene Nachricht in das Packet-Dict um, das der Decoder erwartet.
+
+    Binäre Frames werden zu np.frombuffer-Views auf die zmq-Buffer (keine Kopie),
+    einteilige Nachrichten werden als Legacy-Pickle behandelt.
+    """
+    first = _buffer(parts[0])
+
+    if not is_binary_frame(first):
+        if len(parts) != 1 or not allow_pickle:
+            raise ProtocolError("Unbekanntes Frame-Format")
+        packet = pickle.loads(first)
+        packet.setdefault("session", 0)
+        return packet
+
+    if len(parts) != 3:
+        raise ProtocolError(f"Erwarte 3 Parts, erhalten: {len(parts)}")
+
+    hdr = unpack_header(first)
+    rgb_buf = _buffer(parts[1])
+    depth_buf = _buffer(parts[2])
+
+    packet = {
+        "frame_id": hdr["frame_id"],
+        "timestamp": hdr["timestamp"],
+        "session": hdr["session"],
+        "shape": hdr["depth_shape"],
+        "dtype": hdr["depth_dtype"].name,
+        "roi": hdr["roi"],
+    }
+
+    if hdr["rgb_codec"] == CODEC_RAW:
+        h, w, c = hdr["rgb_shape"]
+        packet["rgb"] = np.frombuffer(rgb_buf, dtype=hdr["rgb_dtype"]).reshape(h, w, c)
+    else:
+        packet["rgb_compressed"] = np.frombuffer(rgb_buf, dtype=np.uint8)
+
+    depth_codec = hdr["depth_codec"]
+    if depth_codec == CODEC_RAW:
+        packet["depth"] = np.frombuffer(depth_buf, dtype=hdr["depth_dtype"]).reshape(hdr["depth_shape"])
+    elif depth_codec == CODEC_PNG:
+        packet["depth_compressed"] = np.frombuffer(depth_buf, dtype=np.uint8)
+        packet["encoding"] = "png"
+    elif depth_codec == CODEC_ZLIB:
+        packet["depth_compressed"] = depth_buf
+        packet["encoding"] = "zlib"
+    elif depth_codec in DEPTH_CODECS:
+        packet["depth_compressed"] = depth_buf
+        packet["encoding"] = depth_codec
+    else:
+        raise ProtocolError(f"Unbekannter Depth-Codec: {depth_codec}")
+
+    return packet
+
+
+def decode_packet(packet, buffers=None, depth_metres=True):
+    """Dekodiert ein Packet-Dict zu (rgb, depth) mit RGB uint8 und Depth float32 in Metern.
+
+    Modul-Level-Funktion, damit sie auch in Worker-Prozessen aufgerufen werden kann.
+    Mit einem BufferPool (`buffers`) werden Farbkonvertierung und Depth-Skalierung
+    in recycelte Buffer geschrieben. Mit depth_metres=False bleibt Depth uint16 in mm
+    (Umrechnung später mit depth_to_metres).
+    """
+    rgb = None
+    depth_raw = None
+
+    if "rgb_compressed" in packet:
+        # imdecode kann in der Python-API nicht in einen vorhandenen Buffer schreiben,
+        # daher wird das dekodierte Bild in-place nach RGB konvertiert
+        rgb_bgr = cv2.imdecode(packet["rgb_compressed"], cv2.IMREAD_COLOR)
+        rgb = cv2.cvtColor(rgb_bgr, cv2.COLOR_BGR2RGB, dst=rgb_bgr)
+    elif "rgb" in packet:
+        rgb_bgr = packet["rgb"]
+        dst = buffers.acquire(rgb_bgr.shape, np.uint8) if buffers is not None else None
+        rgb = cv2.cvtColor(rgb_bgr, cv2.COLOR_BGR2RGB, dst=dst)
+
+    if "depth_compressed" in packet:
+        encoding = packet.get("encoding")
+        # Alte Pickle-Clients schicken bei zlib nicht immer die Shape mit -> wie RGB
+        shape = packet.get("shape") or (rgb.shape[:2] if rgb is not None else (480, 640))
+        if encoding == "png":
+            depth_raw = cv2.imdecode(packet["depth_compressed"], cv2.IMREAD_UNCHANGED)
+        elif encoding in (None, "zlib"):
+            depth_data = zlib.decompress(packet["depth_compressed"])
+            dtype = packet.get("dtype", "uint16")
+            depth_raw = np.frombuffer(depth_data, dtype=dtype).reshape(shape)
+        else:
+            out = buffers.acquire(tuple(shape), np.uint16) if buffers is not None else None
+            depth_raw = decode_depth(encoding, packet["depth_compressed"], tuple(shape), out=out)
+    elif "depth" in packet:
+        depth_raw = packet["depth"]
+
+    if rgb is None or depth_raw is None:
+        return None
+
+    if not depth_metres and depth_raw.dtype == np.uint16:
+        if depth_raw.base is not None and buffers is not None:
+            # View auf den Empfangs-Buffer -> in einen eigenen Buffer, der Frame kann länger leben
+            own = buffers.acquire(depth_raw.shape, np.uint16)
+            np.copyto(own, depth_raw)
+            depth_raw = own
+        return rgb, depth_raw
+    depth = depth_to_metres(depth_raw, buffers)
+    if buffers is not None and depth_raw.dtype == np.uint16 and depth_raw.base is None:
+        buffers.release(depth_raw)
+    return rgb, depth
+
+
+def depth_to_metres(depth_raw, buffers=None):
+    # Eine Operation statt astype() + Division (zwei Allokationen)
+    out = buffers.acquire(depth_raw.shape, np.float32) if buffers is not None else None
+    return np.divide(depth_raw, np.float32(1000.0), out=out, dtype=np.float32)
@@ -0,0 +1,290 @@
+import os
+import glob
+import time
+import pickle
+import numpy as np
+import cv2
+
+# Bildquellen für den Client (mtfpl_client.py). Eine Quelle liefert Frames (bgr uint8, depth uint16 in mm,
+# Capture-Zeitstempel) und die Intrinsics K passend zur Bildgröße:
+#
+#   with open_source("zivid") as source:          # oder "file:aufnahme/", "file:session.mvrec", "synthetic:1280x720"
+#       bgr, depth, ts = source.read()
+#
+# Eigene Kameras: FrameSource ableiten und mit @register_source("name") eintragen.
+# Datei- und synthetische Quellen takten sich selbst (fps, 0 = so schnell wie möglich) und laufen in Schleife.
+
+K_DEFAULT = [[615.3, 0.0, 320.0], [0.0, 615.3, 240.0], [0.0, 0.0, 1.0]]
+SOURCE_FPS = 30.0
+
+SOURCES = {}
+
+
+class SourceClosed(Exception):
+    pass
+
+
+def register_source(name):
+    def wrap(cls):
+        SOURCES[name] = cls
+        cls.name = name
+        return cls
+    return wrap
+
+
+def open_source(spec, **kwargs):
+    """"name" oder "name:argument", z.B. "file:aufnahme/" -> FileSource("aufnahme/")."""
+    name, _, arg = spec.partition(":")
+    if name not in SOURCES:
+        raise ValueError(f"Unbekannte Bildquelle: {name} (verfügbar: {', '.join(sorted(SOURCES))})")
+    source = SOURCES[name](arg, **kwargs) if arg else SOURCES[name](**kwargs)
+    source.open()
+    return source
+
+
+def scale_k(width, height):
+    # Intrinsics der Standard-Kamera (640x480) auf die gewählte Auflösung
+    K = np.array(K_DEFAULT)
+    K[0] *= width / 640.0
+    K[1] *= height / 480.0
+    return K.tolist()
+
+
+def synthetic_depth(width, height, seed=0):
+    """Tiefenbild wie von einer RGB-D-Kamera: glatte Flächen, Sensorrauschen in mm, Löcher (0)."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    depth = 900 + 150 * np.sin(xx / 80.0) + 0.3 * yy
+    # Objekt im Vordergrund
+    box = (abs(xx - width / 2) < width / 8) & (abs(yy - height / 2) < height / 6)
+    depth[box] = 600 + 0.1 * xx[box]
+    # Quantisierung/Rauschen wie bei Structured Light, nimmt mit der Entfernung zu
+    depth += rng.normal(0, 1, depth.shape) * depth / 1000.0
+    depth = np.round(depth).astype(np.uint16)
+    # Ungültige Bereiche: Schattenkante am Objekt + verstreute Ausfälle
+    depth[(abs(xx - width / 2 - width / 8) < 6) & (abs(yy - height / 2) < height / 6)] = 0
+    depth[rng.random(depth.shape) < 0.01] = 0
+    return depth
+
+
+def synthetic_rgb(depth, seed=0):
+    rng = np.random.default_rng(seed)
+    h, w = depth.shape
+    rgb = np.empty((h, w, 3), np.uint8)
+    rgb[..., 0] = (np.arange(w) * 255 // max(1, w - 1))[None, :]
+    rgb[..., 1] = (np.arange(h) * 255 // max(1, h - 1))[:, None]
+    rgb[..., 2] = np.clip(depth // 8, 0, 255)
+    rgb += rng.integers(0, 8, rgb.shape, dtype=np.uint8)
+    return rgb
+
+
+class FrameSource:
+    """Basisklasse: open(), read() -> (bgr, depth_mm, capture_ts), close(). Nach dem Ende: SourceClosed."""
+
+    name = None
+
+    def __init__(self, fps=SOURCE_FPS):
+        self.fps = fps
+        self.K = K_DEFAULT
+        self.next_frame = None
+
+    def open(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def pace(self):
+        # Für Quellen ohne eigenen Takt (Dateien, synthetisch)
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self.next_frame is None or now - self.next_frame > 1.0 / self.fps:
+            # Start oder zu weit zurück -> kein Nachholen im Burst
+            self.next_frame = now
+        elif self.next_frame > now:
+            time.sleep(self.next_frame - now)
+        self.next_frame += 1.0 / self.fps
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        try:
+            while True:
+                yield self.read()
+        except SourceClosed:
+            return
+
+
+@register_source("synthetic")
+class SyntheticSource(FrameSource):
+    """Synthetische RGB-D-Frames wie in bench_e2e.py (Objekt in der Bildmitte). Argument: "BxH"."""
+
+    def __init__(self, size="640x480", frames=16, fps=SOURCE_FPS):
+        super().__init__(fps)
+        self.width, self.height = (int(v) for v in size.lower().split("x"))
+        self.K = scale_k(self.width, self.height)
+        self.frames = []
+        for i in range(frames):
+            depth = synthetic_depth(self.width, self.height, seed=i)
+            self.frames.append((synthetic_rgb(depth, seed=i), depth))
+        self.count = 0
+
+    def read(self):
+        self.pace()
+        bgr, depth = self.frames[self.count % len(self.frames)]
+        self.count += 1
+        return bgr, depth, time.time()
+
+
+@register_source("file")
+class FileSource(FrameSource):
+    """Ordner mit rgb_*.jpg/png + depth_*.png (mm) oder eine Aufnahme (.mvrec, recording.py).
+
+    Bei Aufnahmen kommt K aus dem ersten aufgezeichneten INIT, sonst aus `K` bzw. der Standard-Kamera.
+    """
+
+    def __init__(self, path, fps=SOURCE_FPS, loop=True, K=None):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.K_override = K
+        self.items = []
+        self.count = 0
+        self.skipped = 0
+        self.reader = None
+
+    def open(self):
+        if os.path.isdir(self.path):
+            rgb_files = sorted(glob.glob(os.path.join(self.path, "rgb_*")))
+            depth_files = sorted(glob.glob(os.path.join(self.path, "depth_*.png")))
+            if not rgb_files or len(rgb_files) != len(depth_files):
+                raise ValueError(f"Erwarte gleich viele rgb_* und depth_*.png in {self.path}")
+            self.items = list(zip(rgb_files, depth_files))
+            first = cv2.imread(depth_files[0], cv2.IMREAD_UNCHANGED)
+            self.K = scale_k(first.shape[1], first.shape[0])
+        else:
+            from recording import CaptureReader, KIND_FRAME, KIND_COMMAND
+            from frame_protocol import is_binary_frame, unpack_header
+            self.reader = CaptureReader(self.path)
+            index = self.reader.index
+            # ROI-Ausschnitte (roi_stream.py) überspringen, die Quelle liefert volle Bilder
+            for i in np.flatnonzero(index["kind"] == KIND_FRAME).tolist():
+                first = self.reader.record(i)[4][0]
+                if not is_binary_frame(first) or unpack_header(first)["roi"] is None:
+                    self.items.append(i)
+            if not self.items:
+                raise ValueError(f"Keine Frames in {self.path}")
+            for i in np.flatnonzero(index["kind"] == KIND_COMMAND):
+                msg = pickle.loads(self.reader.record(i)[4][0])
+                if msg.get("cmd") == "INIT" and msg.get("K") is not None:
+                    self.K = np.asarray(msg["K"]).tolist()
+                    break
+        if self.K_override is not None:
+            self.K = self.K_override
+
+    def read(self):
+        # Nicht dekodierbare Aufnahme-Frames überspringen; ist kein einziges lesbar, endet die Quelle
+        for _ in range(len(self.items)):
+            if self.count >= len(self.items):
+                if not self.loop:
+                    raise SourceClosed()
+                self.count = 0
+            item = self.items[self.count]
+            self.count += 1
+            frame = self.load(item)
+            if frame is not None:
+                self.pace()
+                return frame[0], frame[1], time.time()
+        raise SourceClosed(f"Keine lesbaren Frames in {self.path}")
+
+    def load(self, item):
+        """(bgr, depth_mm) oder None, wenn das Frame nicht dekodiert werden kann."""
+        if self.reader is None:
+            return cv2.imread(item[0], cv2.IMREAD_COLOR), cv2.imread(item[1], cv2.IMREAD_UNCHANGED)
+        from frame_protocol import unpack_frame, decode_packet
+        try:
+            frame = decode_packet(unpack_frame(self.reader.record(item)[4]), depth_metres=False)
+        except Exception:
+            frame = None
+        if frame is None:
+            self.skipped += 1
+            return None
+        # Aufnahme enthält das Frame wie gesendet, der Decoder liefert RGB
+        return cv2.cvtColor(frame[0], cv2.COLOR_RGB2BGR), np.array(frame[1], dtype=np.uint16)
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+@register_source("zivid")
+class ZividSource(FrameSource):
+    """Zivid 2/2+ (zivid-python): 2D+3D-Capture, Farbe aus der Punktwolke, Tiefe = z in mm.
+
+    Argument: Seriennummer (optional). `settings`: Pfad einer .yml aus Zivid Studio.
+    Die Kamera bestimmt den Takt selbst, fps wird nicht verwendet.
+    """
+
+    def __init__(self, serial=None, settings=None, fps=0):
+        super().__init__(fps)
+        self.serial = serial
+        self.settings_path = settings
+        self.app = None
+        self.camera = None
+
+    def open(self):
+        import zivid
+        import zivid.experimental.calibration
+        self.app = zivid.Application()
+        print("[ZIVID] Suche und verbinde Kamera...")
+        if self.serial:
+            cameras = [c for c in self.app.cameras() if c.info.serial_number == self.serial]
+            if not cameras:
+                raise RuntimeError(f"Zivid-Kamera {self.serial} nicht gefunden")
+            self.camera = cameras[0]
+            self.camera.connect()
+        else:
+            self.camera = self.app.connect_camera()
+
+        if self.settings_path:
+            self.settings = zivid.Settings.load(self.settings_path)
+        else:
+            self.settings = zivid.Settings(acquisitions=[zivid.Settings.Acquisition()])
+            if hasattr(self.settings, "color"):
+                # SDK >= 2.12: Farbe kommt aus einer eigenen 2D-Aufnahme
+                self.settings.color = zivid.Settings2D(acquisitions=[zivid.Settings2D.Acquisition()])
+        # Neuere SDKs: capture_2d_3d, ältere: capture mit 3D-Settings
+        self.capture = getattr(self.camera, "capture_2d_3d", self.camera.capture)
+
+        intrinsics = zivid.experimental.calibration.intrinsics(self.camera, self.settings)
+        m = intrinsics.camera_matrix
+        self.K = [[m.fx, 0.0, m.cx], [0.0, m.fy, m.cy], [0.0, 0.0, 1.0]]
+        print(f"[ZIVID] Verbunden: {self.camera.info.serial_number}")
+
+    def read(self):
+        if self.camera is None:
+            raise SourceClosed()
+        # Zeitstempel vor der Belichtung, wie bei den anderen Quellen
+        ts = time.time()
+        frame = self.capture(self.settings)
+        point_cloud = frame.point_cloud()
+        z = point_cloud.copy_data("z")
+        rgba = point_cloud.copy_data("rgba")
+        # Ungültige Punkte sind NaN -> 0 wie bei den anderen Quellen
+        depth = np.nan_to_num(z, nan=0.0).clip(0, 65535).astype(np.uint16)
+        bgr = cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+        return bgr, depth, ts
+
+    def close(self):
+        if self.camera is not None:
+            self.camera.disconnect()
+            self.camera = None
@@ -0,0 +1,138 @@
+import os
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import trimesh
+from PIL import Image
+
+# Persistenter Cache für vorverarbeitete Meshes (geladen, skaliert, dezimiert).
+# Schlüssel = Hash über Dateiinhalt (OBJ + gleichnamige .mtl/.png) und Verarbeitungsparameter.
+# Pro Schlüssel ein Ordner mit .npy-Dateien, die per mmap geladen werden.
+
+MESH_CACHE_DIR = os.environ.get("MTFPL_MESH_CACHE", "/workspace/mesh_cache")
+CACHE_VERSION = 1
+LRU_SIZE = 8
+
+
+def file_digest(paths, params):
+    h = hashlib.sha256(f"v{CACHE_VERSION}|{params}".encode())
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class MeshCache:
+    def __init__(self, cache_dir=MESH_CACHE_DIR, lru_size=LRU_SIZE):
+        self.cache_dir = cache_dir
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        # (Pfad, Größe, mtime) -> Hash, damit unveränderte Dateien nicht neu gehasht werden
+        self.digests = {}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, mesh_path, scale, max_faces):
+        base = os.path.splitext(mesh_path)[0]
+        paths = [mesh_path] + [p for p in (base + ".mtl", base + ".png") if os.path.exists(p)]
+        params = f"scale={scale}|max_faces={max_faces}"
+        stat_key = (params,) + tuple((p, os.path.getsize(p), os.path.getmtime(p)) for p in paths)
+        digest = self.digests.get(stat_key)
+        if digest is None:
+            digest = file_digest(paths, params)
+            self.digests[stat_key] = digest
+        return digest
+
+    def load(self, mesh_path, scale=0.001, max_faces=10000):
+        """Gibt eine eigene (veränderbare) Kopie des vorverarbeiteten Meshes zurück."""
+        key = self.key(mesh_path, scale, max_faces)
+
+        with self.lock:
+            mesh = self.lru.get(key)
+            if mesh is not None:
+                self.lru.move_to_end(key)
+                print(f"[CACHE] Mesh aus Speicher: {key[:12]}")
+                return mesh.copy(include_cache=True)
+
+        mesh = self.load_from_disk(key)
+        if mesh is not None:
+            print(f"[CACHE] Mesh von Platte: {key[:12]}")
+        else:
+            mesh = self.build(mesh_path, scale, max_faces)
+            try:
+                self.save(key, mesh)
+            except Exception as e:
+                print(f"[CACHE] Konnte Mesh nicht speichern: {e}")
+
+        with self.lock:
+            self.lru[key] = mesh
+            self.lru.move_to_end(key)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+        return mesh.copy(include_cache=True)
+
+    def build(self, mesh_path, scale, max_faces):
+        mesh = trimesh.load(mesh_path, force='mesh')
+        mesh.apply_scale(scale)
+
+        if len(mesh.faces) > max_faces:
+            mesh = mesh.simplify_quadratic_decimation(max_faces)
+        return mesh
+
+    def save(self, key, mesh):
+        target = os.path.join(self.cache_dir, key)
+        if os.path.exists(target):
+            return
+        tmp = f"{target}.tmp{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+
+        np.save(os.path.join(tmp, "vertices.npy"), np.asarray(mesh.vertices))
+        np.save(os.path.join(tmp, "faces.npy"), np.asarray(mesh.faces, dtype=np.int32))
+        np.save(os.path.join(tmp, "normals.npy"), np.asarray(mesh.vertex_normals))
+
+        uv = getattr(mesh.visual, 'uv', None)
+        if uv is not None:
+            np.save(os.path.join(tmp, "uv.npy"), np.asarray(uv))
+            image = getattr(getattr(mesh.visual, 'material', None), 'image', None)
+            if image is not None:
+                image.save(os.path.join(tmp, "texture.png"))
+
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Paralleler Schreiber war schneller
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def load_from_disk(self, key):
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            def arr(name):
+                return np.load(os.path.join(path, name), mmap_mode='r')
+
+            mesh = trimesh.Trimesh(
+                vertices=arr("vertices.npy"),
+                faces=arr("faces.npy"),
+                vertex_normals=arr("normals.npy"),
+                process=False,
+            )
+
+            uv_path = os.path.join(path, "uv.npy")
+            if os.path.exists(uv_path):
+                material = None
+                tex_path = os.path.join(path, "texture.png")
+                if os.path.exists(tex_path):
+                    image = Image.open(tex_path)
+                    image.load()
+                    material = trimesh.visual.texture.SimpleMaterial(image=image)
+                mesh.visual = trimesh.visual.TextureVisuals(uv=np.load(uv_path), material=material)
+            return mesh
+        except Exception as e:
+            print(f"[CACHE] Defekter Cache-Eintrag {key[:12]}, wird neu erzeugt: {e}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
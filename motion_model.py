@@ -0,0 +1,80 @@
+import os
+import threading
+import numpy as np
+import cv2
+
+# Bewegungsmodell für Posen (konstante Geschwindigkeit auf SE(3), Alpha-Beta-Filter).
+# Zeitbasis sind die Capture-Zeitstempel des Clients, damit der Client Posen direkt
+# für seine eigene Anzeigezeit anfordern kann.
+
+SMOOTH_ALPHA = float(os.environ.get("MTFPL_SMOOTH_ALPHA", "1.0"))
+SMOOTH_BETA = float(os.environ.get("MTFPL_SMOOTH_BETA", "0.5"))
+# Weiter wird nicht extrapoliert (Sekunden), sonst laufen Posen bei Aussetzern davon
+MAX_HORIZON = float(os.environ.get("MTFPL_PREDICT_MAX", "0.2"))
+# Größere Lücken setzen die Geschwindigkeit zurück
+MAX_GAP = 0.5
+
+
+def rotvec(R):
+    return cv2.Rodrigues(np.asarray(R, dtype=np.float64))[0].ravel()
+
+
+def rotmat(v):
+    return cv2.Rodrigues(np.asarray(v, dtype=np.float64).reshape(3, 1))[0]
+
+
+class MotionModel:
+    """alpha: Gewicht der Messung bei der Pose (1 = keine Glättung),
+    beta: Gewicht der gemessenen Geschwindigkeit (0 = Geschwindigkeit bleibt 0)."""
+
+    def __init__(self, alpha=SMOOTH_ALPHA, beta=SMOOTH_BETA, max_horizon=MAX_HORIZON):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_horizon = max_horizon
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.R = None
+        self.t = None
+        self.timestamp = None
+        self.v = np.zeros(3)
+        self.w = np.zeros(3)
+
+    def extrapolate(self, dt):
+        dt = min(max(dt, -self.max_horizon), self.max_horizon)
+        return rotmat(self.w * dt) @ self.R, self.t + self.v * dt
+
+    def update(self, pose, timestamp):
+        """Nimmt eine gemessene Pose auf und gibt die (geglättete) Pose zum Zeitpunkt `timestamp` zurück."""
+        pose = np.asarray(pose, dtype=np.float64)
+        with self.lock:
+            if self.R is None or timestamp <= self.timestamp or timestamp - self.timestamp > MAX_GAP:
+                self.reset()
+                self.R, self.t, self.timestamp = pose[:3, :3].copy(), pose[:3, 3].copy(), timestamp
+                return pose
+
+            dt = timestamp - self.timestamp
+            R_pred, t_pred = self.extrapolate(dt)
+            # Korrektur: Residuum zwischen Messung und Vorhersage
+            r_rot = rotvec(pose[:3, :3] @ R_pred.T)
+            r_trans = pose[:3, 3] - t_pred
+            R_new = rotmat(self.alpha * r_rot) @ R_pred
+            t_new = t_pred + self.alpha * r_trans
+            self.w += self.beta * r_rot / dt
+            self.v += self.beta * r_trans / dt
+
+            self.R, self.t, self.timestamp = R_new, t_new, timestamp
+            out = np.eye(4)
+            out[:3, :3], out[:3, 3] = R_new, t_new
+            return out
+
+    def predict(self, timestamp):
+        """Pose zum Zeitpunkt `timestamp` (Client-Uhr) oder None ohne Messung."""
+        with self.lock:
+            if self.R is None:
+                return None
+            R, t = self.extrapolate(timestamp - self.timestamp)
+        pose = np.eye(4)
+        pose[:3, :3], pose[:3, 3] = R, t
+        return pose
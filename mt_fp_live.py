@@ -3,95 +3,433 @@ import os
 sys.path.append("/workspace")
 import time
 import numpy as np
-import cv2
 import zmq
 import trimesh
 import threading
 import queue
+import pickle
+import functools
+import importlib
+import atexit
+import signal
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from PIL import Image
 
-from estimater import *
-from datareader import *
-from myUtils import *
+from frame_protocol import unpack_frame, decode_packet, depth_to_metres
+from result_protocol import pack_result, FLAG_PREDICTED, FLAG_FULL_FRAME
+from roi_stream import roi_from_points, crop_k, crop_rect
+from motion_model import MotionModel
+from buffer_pool import BufferPool
+from shm_ring import FrameRing, ring_name, notify_endpoint, is_notification
+from recording import Recorder, recording_path, RECORD_PATH, RECORDED_COMMANDS
+from telemetry import telemetry, serve_prometheus, Timer
+from mesh_cache import MeshCache
+from scheduler import SessionRegistry, SessionScheduler
+from tracking_budget import (IterationBudget, TrackingMonitor, depth_inlier_ratio, rect_from_points,
+                             sample_model_points, TARGET_FRAME_MS, REGISTER_ITER)
+from startup import Startup, mesh_candidates, warmup_frame, PRELOAD_MESHES, WARMUP
 
-PORT_CMD = 6666
-PORT_VID_IN = 6667   
-PORT_VID_OUT = 6668
-SHARED_DIR = "/workspace/shared_data"
+# Die Estimator-Module (torch, nvdiffrast, ...) brauchen Sekunden zum Import und werden erst nach dem
+# Binden der Sockets geladen (load_estimator). MTFPL_STUB_ESTIMATOR=1: CPU-Ersatz, z.B. für bench_e2e.py
+STUB_ESTIMATOR = os.environ.get("MTFPL_STUB_ESTIMATOR", "0") == "1"
+ESTIMATOR_MODULES = ("stub_estimator",) if STUB_ESTIMATOR else ("estimater", "datareader", "myUtils")
+
+# Mehrere Worker auf einem Host: MTFPL_PORT_BASE=7666 -> 7666/7667/7668 (siehe worker_pool.py)
+PORT_CMD = int(os.environ.get("MTFPL_PORT_BASE", "6666"))
+PORT_VID_IN = PORT_CMD + 1
+PORT_VID_OUT = PORT_CMD + 2
+SHARED_DIR = os.environ.get("MTFPL_SHARED_DIR", "/workspace/shared_data")
+# Legacy-Clients schicken gepickelte Dicts. Mit 0 werden nur noch Binär-Frames akzeptiert.
+ALLOW_PICKLE = os.environ.get("MTFPL_ALLOW_PICKLE", "1") == "1"
+# Anzahl paralleler Decode-Worker (1 = im Decoder-Thread) und Art ("thread" oder "process")
+DECODE_WORKERS = int(os.environ.get("MTFPL_DECODE_WORKERS", "1"))
+DECODE_MODE = os.environ.get("MTFPL_DECODE_MODE", "thread")
+# Lazy: nur das neueste Roh-Paket halten und erst dekodieren, wenn der Runner einen Frame holt.
+# Prefetch: das nächste Paket kurz vor Ende des aktuellen Trackings im Hintergrund dekodieren.
+LAZY_DECODE = os.environ.get("MTFPL_LAZY_DECODE", "1") == "1"
+PREFETCH = os.environ.get("MTFPL_PREFETCH", "1") == "1"
+STATS_INTERVAL = 10.0
+TEXTURE_CACHE_SIZE = 16
+# Optionaler Prometheus-Endpunkt (z.B. 9100), leer = aus
+METRICS_PORT = os.environ.get("MTFPL_METRICS_PORT", "")
+# Mehrere Sessions: "round_robin" oder "deadline" (Ankunft + Budget in Sekunden)
+SCHED_POLICY = os.environ.get("MTFPL_SCHED_POLICY", "round_robin")
+SCHED_BUDGET = float(os.environ.get("MTFPL_SCHED_BUDGET", "0.05"))
+# Posen um so viele Sekunden über den Capture-Zeitstempel hinaus extrapolieren (0 = aus)
+PREDICT_LEAD = float(os.environ.get("MTFPL_PREDICT_LEAD", "0"))
+# track_one mit der vorhergesagten statt der letzten Pose starten
+PREDICT_INIT = os.environ.get("MTFPL_PREDICT_INIT", "0") == "1"
+# Frames von Proxy/Clients auf demselben Host über einen Shared-Memory-Ring (shm_ring.py)
+SHM_TRANSPORT = os.environ.get("MTFPL_SHM", "0") == "1"
+# Depth bis zum Tracking als uint16 (mm) halten, erst direkt davor in float32-Meter umrechnen
+DEPTH_UINT16 = os.environ.get("MTFPL_DEPTH_UINT16", "1") == "1"
 script_dir = os.path.dirname(os.path.realpath(__file__))
 texture_dir = os.path.join(script_dir, "textures")
 print(f"[DEBUG] Suche Texturen in: {texture_dir}")
 
+def load_estimator():
+    """Wie `from estimater import *` usw., nur zu einem selbst gewählten Zeitpunkt.
+
+    Namen, die dieses Modul schon definiert (z.B. make_mask_from_rect), bleiben erhalten wie beim
+    früheren Star-Import vor den eigenen Definitionen.
+    """
+    namespace = globals()
+    for name in ESTIMATOR_MODULES:
+        module = importlib.import_module(name)
+        public = getattr(module, "__all__", None) or [n for n in dir(module) if not n.startswith("_")]
+        for n in public:
+            namespace.setdefault(n, getattr(module, n))
+    set_logging_format()
+    set_seed(0)
+
 def make_mask_from_rect(rect, width, height):
     x, y, w, h = rect
     mask = np.zeros((height, width), dtype=np.uint8)
     mask[y:y+h, x:x+w] = 1
     return mask.astype(bool).astype(np.uint8)
 
+def packet_meta(packet):
+    return packet.get("frame_id", 0), packet.get("timestamp", 0.0), packet.get("roi")
+
+class FrameSlot:
+    """Latest-wins-Ablage einer Session: rohes Paket (lazy), laufender Prefetch oder dekodierter Frame (eager)."""
+
+    def __init__(self):
+        self.latest_packet = None
+        self.prefetch_future = None
+        self.latest_frame = None
+        self.latest_meta = None
+        self.latest_seq = 0
+        self.latest_time = 0.0
+        # Gleitendes Mittel der Abhol-Abstände für das Prefetch-Timing
+        self.last_get = 0.0
+        self.avg_cycle = 0.0
+
+    def ready_time(self):
+        for item in (self.prefetch_future, self.latest_packet):
+            if item is not None:
+                return item[2]
+        if self.latest_frame is not None:
+            return self.latest_time
+        return None
+
 class PacketDecoder(threading.Thread):
-    def __init__(self, context, port_in):
+    def __init__(self, context, port_in, workers=DECODE_WORKERS, mode=DECODE_MODE,
+                 lazy=LAZY_DECODE, prefetch=PREFETCH, wake=None, recorder=None):
         super().__init__()
         self.socket = context.socket(zmq.PULL)
-        self.socket.setsockopt(zmq.CONFLATE, 1)
+        # CONFLATE unterstützt keine Multipart-Nachrichten (und würde Sessions gegenseitig verdrängen)
+        # -> kleine HWM + Drain in recv_batch(), Latest-wins pro Session
+        self.socket.setsockopt(zmq.RCVHWM, 8)
         self.socket.bind(f"tcp://0.0.0.0:{port_in}")
+        self.ring = None
+        if SHM_TRANSPORT:
+            # Gleicher Socket, zusätzlich ipc für die Benachrichtigungen aus dem Ring
+            self.ring = FrameRing.create(ring_name(port_in))
+            self.socket.bind(notify_endpoint(port_in))
+            print(f"[DOCKER] Shared-Memory-Ring: {self.ring.slots} x {self.ring.slot_size >> 20} MB")
         self.running = True
-        self.latest_frame = None
+        # Session-ID -> FrameSlot
+        self.frame_slots = {}
+        # Ankunftszeit und (Frame-ID, Capture-Zeitstempel, ROI) des zuletzt abgeholten Frames
+        self.last_arrival = 0.0
+        self.last_meta = (0, 0.0, None)
         self.lock = threading.Lock()
-        
+        # Wird gesetzt, sobald ein neuer Frame abgeholt werden kann
+        self.wake = wake or threading.Event()
+        # Zeichnet alle empfangenen Pakete auf (recording.py), auch die später verworfenen
+        self.recorder = recorder
+
         self.packet_count = 0
         self.start_time = time.time()
-        
+        self.frames_decoded = 0
+        self.frames_tracked = 0
+        self.frames_dropped = 0
+
+        self.lazy = lazy
+        self.prefetch = prefetch
+        self.prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") if lazy and prefetch else None
+        self.avg_decode = 0.0
+
+        self.workers = max(1, workers)
+        self.use_processes = mode == "process"
+        # Getrackter Frame + Prefetch/Worker + neuester Frame
+        self.buffers = BufferPool(depth=self.workers + 3)
+        self.slots = threading.BoundedSemaphore(self.workers)
+        self.pool = None
+        if self.workers > 1 and not lazy:
+            if self.use_processes:
+                # fork startet alle Worker beim ersten submit -> vor dem CUDA-Setup in FPRunner
+                self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context("fork"))
+                self.pool.submit(int).result()
+            else:
+                self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decode")
+        if lazy:
+            print(f"[DOCKER] Decoder: lazy (Prefetch: {'an' if prefetch else 'aus'})")
+        else:
+            print(f"[DOCKER] Decoder: {self.workers} Worker ({mode if self.pool else 'inline'})")
+
+    def slot(self, session):
+        slot = self.frame_slots.get(session)
+        if slot is None:
+            slot = self.frame_slots[session] = FrameSlot()
+        return slot
+
+    def recv_batch(self):
+        # Blockierend auf die erste Nachricht warten, dann alles Angestaute mitnehmen
+        batch = [self.socket.recv_multipart(copy=False)]
+        cpu = time.thread_time()
+        while True:
+            try:
+                batch.append(self.socket.recv_multipart(flags=zmq.NOBLOCK, copy=False))
+            except zmq.Again:
+                break
+        t_arrival = time.perf_counter()
+
+        # Latest-wins pro Session: ältere Pakete derselben Session im Batch verwerfen
+        latest = {}
+        for parts in batch:
+            self.packet_count += 1
+            token = None
+            if self.ring is not None and is_notification(parts):
+                entry = self.ring.read(parts[1])
+                if entry is None:
+                    # Slot schon wieder überschrieben
+                    self.frames_dropped += 1
+                    telemetry.count("dropped_torn")
+                    continue
+                parts, token = entry
+            if self.recorder is not None:
+                self.recorder.frame(parts, t_arrival, copy=token is not None)
+            try:
+                packet = unpack_frame(parts, allow_pickle=ALLOW_PICKLE)
+                if token is not None:
+                    packet["shm"] = token
+            except Exception as e:
+                print(f"Decoder Error: {e}")
+                continue
+            session = packet.get("session", 0)
+            if session in latest:
+                self.frames_dropped += 1
+                telemetry.count("dropped_drain")
+            latest[session] = (self.packet_count, packet, t_arrival)
+        telemetry.record("receive", time.perf_counter() - t_arrival)
+        telemetry.record_cpu("receive", time.thread_time() - cpu)
+        return latest
+
     def run(self):
         print("[DOCKER] Decoder-Thread gestartet.")
         while self.running:
+            if self.lazy:
+                self.receive_raw()
+            else:
+                self.receive_and_decode()
+
+    def receive_raw(self):
+        try:
+            latest = self.recv_batch()
+        except Exception as e:
+            print(f"Decoder Error: {e}")
+            return
+
+        with self.lock:
+            for session, entry in latest.items():
+                slot = self.slot(session)
+                if slot.latest_packet is not None:
+                    self.frames_dropped += 1
+                    telemetry.count("dropped_overwrite")
+                slot.latest_packet = entry
+
+                if self.prefetch and slot.prefetch_future is None and self.prefetch_due(slot):
+                    seq, packet, t_arrival = slot.latest_packet
+                    slot.latest_packet = None
+                    slot.prefetch_future = (seq, self.prefetcher.submit(self.decode, packet), t_arrival,
+                                            packet_meta(packet))
+        if latest:
+            self.wake.set()
+
+    def prefetch_due(self, slot):
+        # Erst dekodieren, wenn der Runner voraussichtlich gleich fertig ist,
+        # sonst kommt bis dahin ohnehin ein neueres Paket
+        return time.perf_counter() >= slot.last_get + slot.avg_cycle - self.avg_decode
+
+    def decode_checked(self, packet):
+        cpu = time.thread_time()
+        frame = decode_packet(packet, self.buffers, depth_metres=not DEPTH_UINT16)
+        telemetry.record_cpu("decode", time.thread_time() - cpu)
+        token = packet.get("shm")
+        if frame is not None and token is not None and not self.ring.valid(token):
+            # Der Schreiber hat den Slot während des Dekodierens überholt
+            self.buffers.release(*frame)
+            self.frames_dropped += 1
+            telemetry.count("dropped_torn")
+            return None
+        return frame
+
+    def decode(self, packet):
+        t0 = time.perf_counter()
+        frame = self.decode_checked(packet)
+        dt = time.perf_counter() - t0
+        telemetry.record("decode", dt)
+        with self.lock:
+            self.frames_decoded += 1
+            self.avg_decode = 0.8 * self.avg_decode + 0.2 * dt if self.avg_decode else dt
+        return frame
+
+    def receive_and_decode(self):
+        # Erst empfangen, wenn ein Worker frei ist, damit immer das neueste Paket dekodiert wird
+        self.slots.acquire()
+        holding = True
+        try:
+            for session, (seq, packet, t_arrival) in self.recv_batch().items():
+                if not holding:
+                    self.slots.acquire()
+                holding = False
+                self.decode_async(session, seq, packet, t_arrival)
+        except Exception as e:
+            print(f"Decoder Error: {e}")
+        if holding:
+            self.slots.release()
+
+    def decode_async(self, session, seq, packet, t_arrival):
+        # Gibt den Worker-Slot in jedem Fall wieder frei (inline sofort, im Pool per Callback)
+        if self.pool is None:
             try:
-                packet = self.socket.recv_pyobj()
-                
-                rgb = None
-                depth = None
-                
-                if "rgb_compressed" in packet:
-                    rgb_bytes = packet["rgb_compressed"]
-                    rgb_bgr = cv2.imdecode(rgb_bytes, cv2.IMREAD_COLOR)
-                    rgb = cv2.cvtColor(rgb_bgr, cv2.COLOR_BGR2RGB)
-                elif "rgb" in packet:
-                    rgb_bgr = packet["rgb"]
-                    rgb = cv2.cvtColor(rgb_bgr, cv2.COLOR_BGR2RGB)
-                
-                if "depth_compressed" in packet:
-                    if "encoding" in packet and packet["encoding"] == "png":
-                        depth_raw = cv2.imdecode(packet["depth_compressed"], cv2.IMREAD_UNCHANGED)
-                    else:
-                        import zlib
-                        depth_data = zlib.decompress(packet["depth_compressed"])
-                        dtype = packet.get("dtype", "uint16")
-                        shape = packet.get("shape", (480, 640))
-                        depth_raw = np.frombuffer(depth_data, dtype=dtype).reshape(shape)
-                    
-                    depth = depth_raw.astype(np.float32) / 1000.0
-                elif "depth" in packet:
-                    depth_raw = packet["depth"]
-                    depth = depth_raw.astype(np.float32) / 1000.0
-
-                if rgb is not None and depth is not None:
-                    with self.lock:
-                        self.latest_frame = (rgb, depth)
-                    
+                t_decode = time.perf_counter()
+                frame = self.decode_checked(packet)
+                telemetry.record("decode", time.perf_counter() - t_decode)
+                self.publish(session, seq, frame, t_arrival, packet_meta(packet))
             except Exception as e:
                 print(f"Decoder Error: {e}")
+            finally:
+                self.slots.release()
+            return
+
+        if self.use_processes:
+            # memoryviews auf zmq-Frames sind nicht picklebar, Buffer-Pool nur im selben Prozess
+            token = packet.pop("shm", None)
+            packet = {k: bytes(v) if isinstance(v, memoryview) else v for k, v in packet.items()}
+            if token is not None and not self.ring.valid(token):
+                self.slots.release()
+                return
+            future = self.pool.submit(decode_packet, packet, None, not DEPTH_UINT16)
+        else:
+            future = self.pool.submit(self.decode_checked, packet)
+        future.add_done_callback(functools.partial(self.on_decoded, session, seq, t_arrival, packet_meta(packet)))
 
-    def get_latest(self):
+    def on_decoded(self, session, seq, t_arrival, meta, future):
+        try:
+            # Bei Worker-Pools inkl. Wartezeit im Pool
+            telemetry.record("decode", time.perf_counter() - t_arrival)
+            self.publish(session, seq, future.result(), t_arrival, meta)
+        except Exception as e:
+            print(f"Decoder Error: {e}")
+        finally:
+            self.slots.release()
+
+    def publish(self, session, seq, frame, t_arrival, meta):
+        if frame is None:
+            return
         with self.lock:
-            frame = self.latest_frame
-            self.latest_frame = None
-            return frame
+            self.frames_decoded += 1
+            slot = self.slot(session)
+            # Ein älteres Paket, das später fertig wird, darf kein neueres überschreiben
+            if seq > slot.latest_seq:
+                if slot.latest_frame is not None:
+                    self.frames_dropped += 1
+                    telemetry.count("dropped_overwrite")
+                    self.buffers.release(*slot.latest_frame)
+                slot.latest_seq = seq
+                slot.latest_frame = frame
+                slot.latest_meta = meta
+                slot.latest_time = t_arrival
+                self.wake.set()
+            else:
+                self.frames_dropped += 1
+                telemetry.count("dropped_late")
+                self.buffers.release(*frame)
+
+    def ready_sessions(self):
+        """{Session-ID: Ankunftszeit} aller Sessions mit abholbereitem Frame."""
+        with self.lock:
+            ready = {}
+            for session, slot in self.frame_slots.items():
+                t = slot.ready_time()
+                if t is not None:
+                    ready[session] = t
+            return ready
+
+    def get_latest(self, session=0):
+        with self.lock:
+            slot = self.frame_slots.get(session)
+            if slot is None:
+                return None
+            if not self.lazy:
+                frame = slot.latest_frame
+                slot.latest_frame = None
+                if frame is not None:
+                    self.last_arrival = slot.latest_time
+                    self.last_meta = slot.latest_meta
+                    telemetry.record("queue_wait", time.perf_counter() - slot.latest_time)
+                return frame
+
+            pending = slot.prefetch_future
+            slot.prefetch_future = None
+            raw = None
+            if pending is None and slot.latest_packet is not None:
+                raw = slot.latest_packet
+                slot.latest_packet = None
+
+        if pending is None and raw is None:
+            return None
+        self.last_arrival = (pending or raw)[2]
+        self.last_meta = pending[3] if pending is not None else packet_meta(raw[1])
+        telemetry.record("queue_wait", time.perf_counter() - self.last_arrival)
+        try:
+            frame = pending[1].result() if pending is not None else self.decode(raw[1])
+        except Exception as e:
+            print(f"Decoder Error: {e}")
+            return None
+
+        now = time.perf_counter()
+        if slot.last_get:
+            cycle = now - slot.last_get
+            slot.avg_cycle = 0.8 * slot.avg_cycle + 0.2 * cycle if slot.avg_cycle else cycle
+        slot.last_get = now
+        return frame
+
+    def drop_session(self, session):
+        with self.lock:
+            slot = self.frame_slots.pop(session, None)
+        if slot is not None and slot.latest_frame is not None:
+            self.buffers.release(*slot.latest_frame)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "received": self.packet_count,
+                "decoded": self.frames_decoded,
+                "tracked": self.frames_tracked,
+                "dropped": self.frames_dropped,
+                "sessions": len(self.frame_slots),
+                "uptime": time.time() - self.start_time,
+            }
 
 class FPRunner:
-    def __init__(self):
+    def __init__(self, shared=None):
+        """`shared`: vorhandener Runner, dessen Netze, GL-Kontext und Caches mitbenutzt werden (weitere Sessions)."""
         self.est = None
-        self.scorer = ScorePredictor()
-        self.refiner = PoseRefinePredictor()
-        self.glctx = dr.RasterizeCudaContext()
+        if shared is not None:
+            self.scorer = shared.scorer
+            self.refiner = shared.refiner
+            self.glctx = shared.glctx
+        else:
+            self.scorer = ScorePredictor()
+            self.refiner = PoseRefinePredictor()
+            self.glctx = dr.RasterizeCudaContext()
 
         self.mesh_loaded = False
         self.bbox = None
@@ -102,62 +440,105 @@ class FPRunner:
         
         self.current_mesh_file = None
         self.current_texture_name = None
+        self.mesh_key = None
+        # Iterationen nach Latenz-Budget, Re-Registrierung bei Tracking-Verlust
+        self.budget = IterationBudget()
+        self.monitor = TrackingMonitor()
+        self.model_pts = None
+        self.last_good_rect = None
+        self.confidence = None
+        # Bewegungsmodell für Glättung, Extrapolation und Startpose von track_one
+        self.motion = MotionModel()
+        self.predict_lead = PREDICT_LEAD
+        self.predict_init = PREDICT_INIT
+        self.predicted = False
+        # ROI für den nächsten Frame des Clients (roi_stream.py), None = Vollbild
+        self.roi = None
+        self.full_frame = True
+        self.mesh_cache = shared.mesh_cache if shared is not None else MeshCache()
+        self.texture_images = shared.texture_images if shared is not None else OrderedDict()
+
+    def find_texture_file(self, texture_name):
+        tex_path = os.path.join(texture_dir, texture_name)
+        if not os.path.exists(tex_path):
+            return None
+        for f in os.listdir(tex_path):
+            if "Color" in f and f.endswith(('.jpg', '.png')):
+                return os.path.join(tex_path, f)
+        for f in os.listdir(tex_path):
+            if f.endswith(('.jpg', '.png')):
+                return os.path.join(tex_path, f)
+        return None
+
+    def load_texture_image(self, texture_name):
+        # Dekodierte Texturen nach Name cachen, damit ein Wechsel kein erneutes PNG-Decoding braucht
+        image = self.texture_images.get(texture_name)
+        if image is not None:
+            self.texture_images.move_to_end(texture_name)
+            return image
+
+        image_file = self.find_texture_file(texture_name)
+        if not image_file:
+            return None
+        print(f"[DOCKER] Lade Textur: {image_file}")
+        image = Image.open(image_file).convert('RGB')
+
+        self.texture_images[texture_name] = image
+        while len(self.texture_images) > TEXTURE_CACHE_SIZE:
+            self.texture_images.popitem(last=False)
+        return image
+
+    def apply_texture(self, mesh, texture_name):
+        """Setzt das Material auf dem Mesh. Gibt ein neues Mesh zurück, wenn die Fallback-Farbe nötig war."""
+        if texture_name:
+            try:
+                pil_image = self.load_texture_image(texture_name)
+            except Exception as e:
+                print(f"[ERROR] Textur konnte nicht geladen werden: {e}")
+                return trimesh_add_pure_colored_texture(mesh, np.array([200, 50, 50]))
+
+            if pil_image is not None:
+                print(f"[DOCKER] Appliziere Textur: {texture_name}")
+                material = trimesh.visual.texture.SimpleMaterial(image=pil_image)
+
+                if hasattr(mesh.visual, 'uv') and mesh.visual.uv is not None:
+                    mesh.visual.material = material
+                else:
+                    print("[WARN] Mesh hat keine UV-Koordinaten! Textur wird komisch aussehen.")
+                    mesh.visual = trimesh.visual.TextureVisuals(uv=mesh.vertices[:, :2], material=material)
+                return mesh
+
+            print("[WARN] Textur-Ordner leer oder nicht gefunden. Nutze Standard-Farbe.")
+            return trimesh_add_pure_colored_texture(mesh, np.array([90, 160, 200]))
+
+        has_auto_texture = hasattr(mesh.visual, 'material') and hasattr(mesh.visual.material, 'image') and mesh.visual.material.image is not None
+
+        if has_auto_texture:
+            print("[DOCKER] Nutze gebündelte Textur aus .mtl/.png.")
+            return mesh
+        print("[DOCKER] Keine Textur gefunden. Nutze Standard-Farbe blau.")
+        color_array = np.array([90, 160, 200])
+        return trimesh_add_pure_colored_texture(mesh, color_array)
 
     def load_mesh(self, filename, texture_name=None):
         mesh_path = os.path.join(SHARED_DIR, filename)
         print(f"[DOCKER] Lade Mesh von: {mesh_path}")
-        
+
+        mesh_key = self.mesh_cache.key(mesh_path, scale=0.001, max_faces=10000)
+        if self.est is not None and mesh_key == self.mesh_key and texture_name == self.current_texture_name:
+            # Gleiches Mesh wie beim Vorladen/letzten INIT: Estimator wiederverwenden, register() setzt die Pose neu
+            self.mesh_loaded = True
+            print("[DOCKER] FoundationPose wiederverwendet.")
+            return
+
         self.current_mesh_file = filename
         self.current_texture_name = texture_name
         
-        mesh = trimesh.load(mesh_path, force='mesh')
-        mesh.apply_scale(0.001) 
-        
-        if len(mesh.faces) > 10000:
-            mesh = mesh.simplify_quadratic_decimation(10000)
-            
-        if texture_name:
-            tex_path = os.path.join(texture_dir, texture_name)
-            image_file = None
-            if os.path.exists(tex_path):
-                for f in os.listdir(tex_path):
-                    if "Color" in f and f.endswith(('.jpg', '.png')):
-                        image_file = os.path.join(tex_path, f)
-                        break
-                if not image_file:
-                    for f in os.listdir(tex_path):
-                        if f.endswith(('.jpg', '.png')):
-                            image_file = os.path.join(tex_path, f)
-                            break
-            
-            if image_file:
-                print(f"[DOCKER] Appliziere Textur: {image_file}")
-                try:
-                    pil_image = Image.open(image_file)
-                    material = trimesh.visual.texture.SimpleMaterial(image=pil_image)
-                    
-                    if hasattr(mesh.visual, 'uv') and mesh.visual.uv is not None:
-                        mesh.visual.material = material
-                    else:
-                        print("[WARN] Mesh hat keine UV-Koordinaten! Textur wird komisch aussehen.")
-                        mesh.visual = trimesh.visual.TextureVisuals(uv=mesh.vertices[:, :2], material=material)
-                except Exception as e:
-                    print(f"[ERROR] Textur konnte nicht geladen werden: {e}")
-                    mesh = trimesh_add_pure_colored_texture(mesh, np.array([200, 50, 50]))
-            else:
-                print("[WARN] Textur-Ordner leer oder nicht gefunden. Nutze Standard-Farbe.")
-                mesh = trimesh_add_pure_colored_texture(mesh, np.array([90, 160, 200]))
-        else:
-            has_auto_texture = hasattr(mesh.visual, 'material') and hasattr(mesh.visual.material, 'image') and mesh.visual.material.image is not None
-            
-            if has_auto_texture:
-                print("[DOCKER] Nutze gebündelte Textur aus .mtl/.png.")
-            else:
-                print("[DOCKER] Keine Textur gefunden. Nutze Standard-Farbe blau.")
-                color_array = np.array([90, 160, 200])
-                mesh = trimesh_add_pure_colored_texture(mesh, color_array)
+        mesh = self.mesh_cache.load(mesh_path, scale=0.001, max_faces=10000)
+        mesh = self.apply_texture(mesh, texture_name)
         
         self.bbox = mesh.bounds 
+        self.model_pts = sample_model_points(mesh.vertices)
         
         self.est = FoundationPose(
             model_pts=mesh.vertices, 
@@ -167,9 +548,37 @@ class FPRunner:
             refiner=self.refiner, 
             glctx=self.glctx
         )
+        self.mesh_key = mesh_key
         self.mesh_loaded = True
         print("[DOCKER] FoundationPose (Re-)Initialized.")
 
+    def set_texture(self, texture_name):
+        """Wechselt nur das Material am bestehenden Estimator, der Tracking-Zustand bleibt erhalten."""
+        if self.est is None or not texture_name:
+            # Ohne Texturname zurück zur gebündelten Textur -> Mesh neu aus dem Cache
+            pose_last = getattr(self.est, 'pose_last', None)
+            self.load_mesh(self.current_mesh_file, texture_name=texture_name)
+            self.est.pose_last = pose_last
+            return
+
+        t0 = time.perf_counter()
+        mesh = self.est.mesh
+        textured = self.apply_texture(mesh, texture_name)
+
+        if textured is mesh:
+            # Nur die Textur-Tensoren für den Renderer neu erzeugen
+            self.est.mesh_tensors = make_mesh_tensors(mesh)
+        else:
+            # Die Fallback-Farbtextur ändert die Geometrie (UV-Unwrap) -> Estimator neu, letzte Pose übernehmen
+            pose_last = self.est.pose_last
+            self.load_mesh(self.current_mesh_file, texture_name=texture_name)
+            self.est.pose_last = pose_last
+
+        self.current_texture_name = texture_name
+        dt = time.perf_counter() - t0
+        telemetry.record("texture_swap", dt)
+        print(f"[DOCKER] Textur gewechselt in {dt * 1000:.1f} ms")
+
     def get_box_points_2d(self, pose, K):
         min_pt = self.bbox[0]
         max_pt = self.bbox[1]
@@ -197,104 +606,380 @@ class FPRunner:
         
         return corners_2d.astype(int).tolist()
 
-    def process_frame(self, rgb, depth):
+    def seed_pose(self, pose):
+        # pose_last liegt im Koordinatensystem des zentrierten Meshes
+        tf = self.est.get_tf_to_centered_mesh()
+        if isinstance(tf, np.ndarray):
+            # stub_estimator.py rechnet ohne torch
+            self.est.pose_last = pose @ np.linalg.inv(tf)
+            return
+        self.est.pose_last = torch.as_tensor(pose, dtype=tf.dtype, device=tf.device) @ torch.linalg.inv(tf)
+
+    def process_frame(self, rgb, depth, timestamp=None, roi=None):
+        """`timestamp`: Capture-Zeit des Frames (Client-Uhr), Zeitbasis für das Bewegungsmodell.
+        `roi`: (x, y, volle Höhe, volle Breite), wenn rgb/depth nur ein Ausschnitt sind."""
         if not self.mesh_loaded: return None, None
+        if self.is_first_frame and roi is not None:
+            # Registrieren nur auf einem Vollbild: die Maske kann außerhalb des Ausschnitts liegen
+            # (neue Session, Tracking verloren). Der Client schickt nach FLAG_FULL_FRAME bzw. SET_MASK eins.
+            self.full_frame = True
+            self.roi = None
+            telemetry.count("register_skip_roi")
+            return None, None
 
-        H, W = rgb.shape[:2]
+        h, w = rgb.shape[:2]
+        if roi is not None:
+            ox, oy, H, W = roi
+            K = crop_k(self.K, ox, oy)
+        else:
+            ox, oy, H, W = 0, 0, h, w
+            K = self.K
         pose = None
         
-        iter_count = 1
+        timer = Timer()
         
         if self.is_first_frame:
-            mask = make_mask_from_rect(self.mask_rect, W, H)
-            pose = self.est.register(K=self.K, rgb=rgb, depth=depth, ob_mask=mask, iteration=5)
+            mask = make_mask_from_rect(crop_rect(self.mask_rect, ox, oy, w, h), w, h)
+            pose = self.est.register(K=K, rgb=rgb, depth=depth, ob_mask=mask, iteration=REGISTER_ITER)
             self.is_first_frame = False
+            self.monitor.reset()
+            self.motion.reset()
+            timer.lap("register")
             print("[DOCKER] Initial Registration done.")
         else:
-            pose = self.est.track_one(rgb=rgb, depth=depth, K=self.K, iteration=iter_count)
+            iter_count = self.budget.iterations()
+            if self.predict_init and timestamp is not None:
+                predicted = self.motion.predict(timestamp)
+                if predicted is not None:
+                    self.seed_pose(predicted)
+            t0 = time.perf_counter()
+            pose = self.est.track_one(rgb=rgb, depth=depth, K=K, iteration=iter_count)
+            self.budget.observe(iter_count, time.perf_counter() - t0)
+            timer.lap("track")
 
         try:
+            # Box immer in Koordinaten des vollen Kamerabilds
             points_2d = self.get_box_points_2d(pose, self.K)
-            return points_2d, pose
+            timer.lap("projection")
         except Exception as e:
             print(f"Calc Error: {e}")
             return None
 
+        self.confidence = depth_inlier_ratio(pose, K, self.model_pts, depth)
+        good, lost = self.monitor.update(self.confidence)
+        if good:
+            self.last_good_rect = rect_from_points(points_2d, W, H) or self.last_good_rect
+        elif lost and self.last_good_rect is not None:
+            # Im nächsten Frame neu registrieren, Maske aus der letzten guten Box
+            print(f"[DOCKER] Tracking verloren (Konfidenz {self.confidence:.2f}), registriere neu.")
+            telemetry.count("reregister")
+            self.mask_rect = self.last_good_rect
+            self.is_first_frame = True
+        timer.lap("confidence")
+        # Bei unsicherem Tracking oder anstehender Registrierung ein Vollbild anfordern
+        self.full_frame = not good or self.is_first_frame
+
+        self.predicted = False
+        if timestamp is not None:
+            pose = self.motion.update(pose, timestamp)
+            if self.predict_lead > 0:
+                pose = self.motion.predict(timestamp + self.predict_lead)
+                self.predicted = True
+            if self.predicted or self.motion.alpha < 1.0:
+                points_2d = self.get_box_points_2d(pose, self.K)
+            timer.lap("motion")
+        # Aus der (ggf. extrapolierten) Box, liegt damit näher an der Lage im nächsten Frame
+        self.roi = None if self.full_frame else roi_from_points(points_2d, W, H)
+        return points_2d, pose
+
+def handle_command(registry, msg):
+    cmd = msg.get("cmd")
+    session = msg.get("session", 0)
+    runner = registry.get(session, create=cmd == "INIT")
+    if runner is None:
+        return "ERROR: NO SESSION"
+
+    if cmd == "INIT":
+        try:
+            runner.mask_rect = msg["mask_rect"]
+            if "K" in msg: runner.K = np.array(msg["K"])
+            runner.load_mesh(msg["filename"])
+            runner.is_first_frame = True
+            runner.last_good_rect = runner.mask_rect
+            return "OK"
+        except Exception as e:
+            print(f"INIT Error: {e}")
+            return "ERROR"
+
+    elif cmd == "STOP":
+        runner.mesh_loaded = False
+        return "OK"
+
+    elif cmd == "SET_TEXTURE":
+        try:
+            tex_name = msg.get("name")
+            if runner.current_mesh_file:
+                runner.set_texture(tex_name)
+                return "OK"
+            return "ERROR: NO MESH"
+        except Exception as e:
+            print(f"Texture Error: {e}")
+            return "ERROR"
+
+    elif cmd == "SET_PREDICTION":
+        # lead: Extrapolation in Sekunden, alpha/beta: Glättung, seed: Startpose für track_one
+        if "lead" in msg: runner.predict_lead = max(0.0, float(msg["lead"]))
+        if "alpha" in msg: runner.motion.alpha = min(1.0, max(0.0, float(msg["alpha"])))
+        if "beta" in msg: runner.motion.beta = min(1.0, max(0.0, float(msg["beta"])))
+        if "seed" in msg: runner.predict_init = bool(msg["seed"])
+        return "OK"
+
+    return "UNKNOWN"
+
+def record_command(recorder, msg):
+    if msg.get("cmd") == "INIT":
+        # Mesh samt Material mit aufzeichnen, das Replay braucht den SHARED_DIR nicht
+        base = os.path.splitext(os.path.join(SHARED_DIR, msg["filename"]))[0]
+        for path in (os.path.join(SHARED_DIR, msg["filename"]), base + ".mtl", base + ".png"):
+            recorder.asset(path)
+    recorder.command(msg)
+
+def predict_reply(registry, msg):
+    """PREDICT: Pose einer Session zum angefragten Zeitpunkt (Client-Uhr), ohne auf das Tracking zu warten."""
+    runner = registry.get(msg.get("session", 0))
+    pose = runner.motion.predict(msg["timestamp"]) if runner is not None and "timestamp" in msg else None
+    if pose is None:
+        return {"status": "ERROR"}
+    return {"status": "OK", "pose": pose, "timestamp": msg["timestamp"]}
+
+def collect_stats(decoder, startup=None, scheduler=None):
+    stats = telemetry.snapshot()
+    stats["frames"] = decoder.stats()
+    if scheduler is not None:
+        # Getrackte Frames pro Session (Fairness der Policy)
+        stats["scheduler"] = scheduler.stats()
+    if startup is not None:
+        # Der Proxy verteilt Sessions erst an bereite Worker
+        stats["startup"] = startup.health()
+    # Für die lastabhängige Platzierung im Proxy
+    stats["queue_depth"] = len(decoder.ready_sessions())
+    return stats
+
+def command_stage(cmd_socket, reply_socket, cmd_queue, wake, decoder, registry, startup, scheduler):
+    # Empfängt Befehle (ROUTER), ausgeführt werden sie im Tracking-Thread (Runner ist nicht thread-safe).
+    # Dessen Antworten kommen samt Envelope über inproc zurück, so können mehrere Befehle offen sein.
+    poller = zmq.Poller()
+    poller.register(cmd_socket, zmq.POLLIN)
+    poller.register(reply_socket, zmq.POLLIN)
+    while True:
+        try:
+            socks = dict(poller.poll())
+            if reply_socket in socks:
+                cmd_socket.send_multipart(reply_socket.recv_multipart())
+            if cmd_socket in socks:
+                frames = cmd_socket.recv_multipart()
+                envelope = frames[:-1]
+                msg = pickle.loads(frames[-1])
+                if msg.get("cmd") == "STATS":
+                    # Direkt beantworten, auch während ein INIT läuft
+                    cmd_socket.send_multipart(envelope + [pickle.dumps(collect_stats(decoder, startup, scheduler))])
+                    continue
+                if msg.get("cmd") in ("HEALTH", "READY"):
+                    # Auch während des Starts, bevor die Netze geladen sind
+                    cmd_socket.send_multipart(envelope + [pickle.dumps(startup.health())])
+                    continue
+                if msg.get("cmd") == "PREDICT":
+                    cmd_socket.send_multipart(envelope + [pickle.dumps(predict_reply(registry, msg))])
+                    continue
+                cmd_queue.put((msg, envelope))
+                wake.set()
+        except Exception as e:
+            print(f"CMD Error: {e}")
+
+def publish_stage(vid_out_socket, result_queue, recorder=None, startup=None):
+    # Versendet Ergebnisse parallel zum Tracking des nächsten Frames
+    while True:
+        result, t_arrival = result_queue.get()
+        try:
+            t0 = time.perf_counter()
+            cpu = time.thread_time()
+            parts = pack_result(server_send=time.time(), **result)
+            vid_out_socket.send_multipart(parts)
+            if recorder is not None:
+                recorder.result(result["session"], parts)
+            t1 = time.perf_counter()
+            telemetry.record("publish", t1 - t0)
+            telemetry.record_cpu("publish", time.thread_time() - cpu)
+            telemetry.record("server_total", t1 - t_arrival)
+            if startup is not None:
+                startup.first_frame()
+        except Exception as e:
+            print(f"Publish Error: {e}")
+
+def track_session(runner, decoder, session, result_queue):
+    frame_data = decoder.get_latest(session)
+    if not frame_data:
+        return
+    rgb, depth = frame_data
+    depth_mm = None
+    if depth.dtype == np.uint16:
+        depth_mm, depth = depth, depth_to_metres(depth, decoder.buffers)
+    t_arrival = decoder.last_arrival
+    try:
+        now = time.time()
+        frame_id, capture_ts, roi = decoder.last_meta
+        server_recv = now - (time.perf_counter() - t_arrival)
+        # Ohne Client-Zeitstempel (alte Clients) läuft das Bewegungsmodell auf der Server-Uhr
+        points_2d, pose = runner.process_frame(rgb, depth, timestamp=capture_ts or server_recv, roi=roi)
+        with decoder.lock:
+            decoder.frames_tracked += 1
+
+        if points_2d is not None:
+            result_queue.put(({
+                "session": session,
+                "frame_id": frame_id,
+                "capture_ts": capture_ts,
+                "server_recv": server_recv,
+                "server_tracked": time.time(),
+                "box_points": points_2d,
+                "pose": pose,
+                "confidence": runner.confidence,
+                "roi": runner.roi,
+                "flags": (FLAG_PREDICTED if runner.predicted else 0) | (FLAG_FULL_FRAME if runner.full_frame else 0),
+            }, t_arrival))
+    except Exception as e:
+        print(f"Tracking Crash (Session {session}): {e}")
+    finally:
+        decoder.buffers.release(rgb, depth)
+        if depth_mm is not None:
+            decoder.buffers.release(depth_mm)
+
+def preload(base_runner, startup):
+    """Meshes aus SHARED_DIR in den Mesh-Cache laden, das neueste mit Estimator und einem Probelauf."""
+    names = mesh_candidates(SHARED_DIR, PRELOAD_MESHES)
+    for name in names:
+        try:
+            base_runner.mesh_cache.load(os.path.join(SHARED_DIR, name), scale=0.001, max_faces=10000)
+            startup.preloaded.append(name)
+        except Exception as e:
+            print(f"[STARTUP] Vorladen von {name} fehlgeschlagen: {e}")
+    startup.mark("preload")
+    if not WARMUP or not startup.preloaded:
+        return
+
+    name = startup.preloaded[0]
+    try:
+        base_runner.load_mesh(name)
+        rgb, depth, mask = warmup_frame()
+        K = base_runner.K
+        base_runner.est.register(K=K, rgb=rgb, depth=depth, ob_mask=mask, iteration=REGISTER_ITER)
+        base_runner.est.track_one(rgb=rgb, depth=depth, K=K, iteration=2)
+        startup.warm_mesh = name
+    except Exception as e:
+        print(f"[STARTUP] Warmup mit {name} fehlgeschlagen: {e}")
+    finally:
+        # Vorgeladen, aber noch keine Session: erst INIT startet das Tracking
+        base_runner.mesh_loaded = False
+    startup.mark("warmup")
+
 def main():
+    # Erst Sockets binden, damit Proxy und Clients sofort HEALTH/STATS bekommen, dann die Netze laden
+    startup = Startup()
     context = zmq.Context()
     
-    cmd_socket = context.socket(zmq.REP)
+    cmd_socket = context.socket(zmq.ROUTER)
     cmd_socket.bind(f"tcp://0.0.0.0:{PORT_CMD}")
+    cmd_replies_in = context.socket(zmq.PULL)
+    cmd_replies_in.bind("inproc://cmd_replies")
+    cmd_replies_out = context.socket(zmq.PUSH)
+    cmd_replies_out.connect("inproc://cmd_replies")
     
-    vid_out_socket = context.socket(zmq.PUSH)
+    # PUB mit Topic pro Session (result_protocol.py), mehrere Abonnenten möglich
+    vid_out_socket = context.socket(zmq.PUB)
     vid_out_socket.bind(f"tcp://0.0.0.0:{PORT_VID_OUT}")
+
+    # Ein gemeinsames Event weckt den Tracking-Thread bei neuem Frame oder Befehl
+    wake = threading.Event()
+    cmd_queue = queue.Queue()
+    result_queue = queue.Queue()
     
-    decoder_thread = PacketDecoder(context, PORT_VID_IN)
+    recorder = None
+    if RECORD_PATH:
+        recorder = Recorder(recording_path(RECORD_PATH))
+        recorder.start()
+        # Index und Footer beim Beenden schreiben (docker stop schickt SIGTERM)
+        atexit.register(recorder.close)
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    decoder_thread = PacketDecoder(context, PORT_VID_IN, wake=wake, recorder=recorder)
     decoder_thread.daemon = True
     decoder_thread.start()
-    
-    runner = FPRunner()
-    
-    poller = zmq.Poller()
-    poller.register(cmd_socket, zmq.POLLIN)
 
-    print("[DOCKER] High-Perf Pipeline (Threaded Decode).")
+    # Session 0 besitzt Netze und GL-Kontext, weitere Sessions teilen sie sich.
+    # Bis die Netze geladen sind, ist die Registry leer (PREDICT -> ERROR, Befehle warten in cmd_queue)
+    base = {}
+    registry = SessionRegistry(lambda sid: base["runner"] if sid == 0 else FPRunner(shared=base["runner"]))
+    scheduler = SessionScheduler(SCHED_POLICY, budget=SCHED_BUDGET)
+
+    threading.Thread(target=command_stage, args=(cmd_socket, cmd_replies_in, cmd_queue, wake, decoder_thread, registry,
+                                                 startup, scheduler), daemon=True).start()
+    threading.Thread(target=publish_stage, args=(vid_out_socket, result_queue, recorder, startup), daemon=True).start()
+
+    if METRICS_PORT:
+        serve_prometheus(int(METRICS_PORT), extra_counters=lambda: {
+            f"frames_{k}": v for k, v in decoder_thread.stats().items() if k != "uptime"})
+    startup.mark("sockets")
+
+    # Im Haupt-Thread: hier läuft später auch das Tracking (CUDA-/GL-Kontext)
+    try:
+        load_estimator()
+        startup.mark("imports")
+        base["runner"] = FPRunner()
+        registry.get(0, create=True)
+        startup.mark("networks")
+        if PRELOAD_MESHES:
+            preload(base["runner"], startup)
+    except Exception as e:
+        startup.fail(e)
+        raise
+    startup.set_ready()
+
+    print("[DOCKER] High-Perf Pipeline (Threaded Decode, Event-basiert).")
+    last_report = time.time()
 
     while True:
-        socks = dict(poller.poll(0))
-        
-        if cmd_socket in socks:
-            msg = cmd_socket.recv_pyobj()
-            cmd = msg.get("cmd")
-            
-            if cmd == "INIT":
-                try:
-                    runner.mask_rect = msg["mask_rect"]
-                    if "K" in msg: runner.K = np.array(msg["K"])
-                    runner.load_mesh(msg["filename"])
-                    runner.is_first_frame = True 
-                    cmd_socket.send_string("OK")
-                except Exception as e: 
-                    print(f"INIT Error: {e}")
-                    cmd_socket.send_string("ERROR")
-            
-            elif cmd == "STOP":
-                runner.mesh_loaded = False 
-                cmd_socket.send_string("OK")
-                
-            elif cmd == "SET_TEXTURE":
-                try:
-                    tex_name = msg.get("name")
-                    if runner.current_mesh_file:
-                        runner.load_mesh(runner.current_mesh_file, texture_name=tex_name)
-                        cmd_socket.send_string("OK")
-                    else:
-                        cmd_socket.send_string("ERROR: NO MESH")
-                except Exception as e:
-                    print(f"Texture Error: {e}")
-                    cmd_socket.send_string("ERROR")
-
-        frame_data = decoder_thread.get_latest()
-        
-        if frame_data and runner.mesh_loaded:
-            rgb, depth = frame_data
-            try:
-                t_start = time.time()
-                points_2d, pose = runner.process_frame(rgb, depth)
-                dt = time.time() - t_start
-                
-                if points_2d is not None:
-                    vid_out_socket.send_pyobj({
-                        "box_points": points_2d,
-                        "pose": pose,
-                        "timestamp": time.time()
-                    })
-            except Exception as e:
-                print(f"Tracking Crash: {e}")
-        else:
-            time.sleep(0.001)
+        wake.wait(timeout=STATS_INTERVAL)
+        wake.clear()
+
+        while not cmd_queue.empty():
+            msg, envelope = cmd_queue.get()
+            if recorder is not None and msg.get("cmd") in RECORDED_COMMANDS:
+                record_command(recorder, msg)
+            cmd_replies_out.send_multipart(envelope + [handle_command(registry, msg).encode()])
+            if msg.get("cmd") == "STOP" and msg.get("session", 0) != 0:
+                registry.remove(msg["session"])
+                scheduler.forget(msg["session"])
+                decoder_thread.drop_session(msg["session"])
+
+        if time.time() - last_report > STATS_INTERVAL:
+            st = decoder_thread.stats()
+            print(f"[DOCKER] Frames: empfangen={st['received']} dekodiert={st['decoded']} "
+                  f"getrackt={st['tracked']} verworfen={st['dropped']}")
+            last_report = time.time()
+
+        # Nur Sessions mit geladenem Mesh werden bedient (im Lazy-Modus wird auch nur dort dekodiert).
+        # Pro Durchlauf ein Frame, danach wieder Befehle prüfen
+        active = registry.active()
+        ready = {sid: t for sid, t in decoder_thread.ready_sessions().items() if sid in active}
+        session = scheduler.next(ready)
+        if session is None:
+            continue
+        runner = registry.get(session)
+        # Mehrere Sessions teilen sich die GPU und damit das Frame-Budget
+        runner.budget.target = TARGET_FRAME_MS / 1000.0 / max(1, len(active))
+        track_session(runner, decoder_thread, session, result_queue)
+        if len(ready) > 1:
+            wake.set()
 
 if __name__ == '__main__':
-    set_logging_format()
-    set_seed(0)
     main()
@@ -0,0 +1,500 @@
+import os
+import sys
+import time
+import pickle
+import asyncio
+import argparse
+import itertools
+import threading
+from concurrent.futures import Future
+import numpy as np
+import cv2
+import zmq
+
+from frame_protocol import pack_frame, CODEC_RAW, CODEC_JPEG
+from depth_codecs import CODEC_IDS, encode_depth
+from result_protocol import unpack_result, topic
+from roi_stream import RoiStreamer
+from frame_sources import open_source, SourceClosed
+
+# Client-Bibliothek für den Proxy (externe Ports 5555/5556/5558).
+# Capture, Encoding und Senden laufen als getrennte Stages in eigenen Threads, dazwischen je ein
+# LatestSlot: ist die nächste Stage noch beschäftigt, ersetzt ein neues Frame das wartende
+# (Latest-wins wie beim Runner), die Kamera wird nie ausgebremst und es staut sich keine Latenz auf.
+# Befehle laufen asynchron über einen DEALER mit Request-ID im Envelope (mehrere gleichzeitig
+# unterwegs), Ergebnisse kommen per SUB auf das Topic der Session.
+#
+#   client = TrackingClient("10.0.0.5", session=1)
+#   client.start(open_source("zivid"))
+#   client.track("objekt.obj", rect=[[x0, y0], [x1, y1]]).result()
+#   result = client.latest(timeout=1.0)
+#   client.close()
+#
+# asyncio: AsyncTrackingClient (await client.command(...), async for result in client.results()).
+
+EXT_PORT_CMD = 5555
+EXT_PORT_VID_IN = 5556
+EXT_PORT_RESULTS = 5558
+COMMAND_TIMEOUT = 30.0
+# Befehle, die der Proxy an Docker weiterreicht, dauern länger (Mesh laden, Registrierung)
+SLOW_COMMANDS = {"SET_MASK": 120.0, "SET_TEXTURE": 120.0, "UPLOAD_CAD": 60.0, "UPLOAD_CAD_BUNDLE": 60.0}
+JPEG_QUALITY = int(os.environ.get("MTFPL_CLIENT_JPEG_QUALITY", "90"))
+ENCODE_WORKERS = int(os.environ.get("MTFPL_CLIENT_ENCODE_WORKERS", "2"))
+# Bevorzugte Depth-Codecs, der erste vom Server unterstützte wird genommen (GET_CODECS)
+DEPTH_CODEC_PREFERENCE = ("delta_lz4", "delta_zstd", "delta_zlib", "png")
+# Wenige Nachrichten im Socket-Puffer: alles darüber wäre nur zusätzliche Latenz
+SEND_HWM = 2
+POLL_MS = 50
+
+
+def decode_reply(data):
+    """Antworten sind entweder rohe Bytes (b"OK", b"ERROR") oder ein gepickeltes Dict."""
+    if data[:1] == b"\x80":
+        try:
+            return pickle.loads(data)
+        except Exception:
+            pass
+    return data
+
+
+class LatestSlot:
+    """Übergabe zwischen zwei Stages mit genau einem Platz: put() ersetzt ein noch nicht abgeholtes Element."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.closed = False
+        self.replaced = 0
+
+    def put(self, item):
+        with self.cond:
+            if self.item is not None:
+                self.replaced += 1
+            self.item = item
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Gibt das Element zurück, None bei Timeout oder nach close()."""
+        with self.cond:
+            if self.item is None and not self.closed:
+                self.cond.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class TrackingClient:
+    def __init__(self, host="127.0.0.1", session=0, rgb_codec="jpg", jpeg_quality=JPEG_QUALITY, depth_codec=None,
+                 quant=0, roi=False, encode_workers=ENCODE_WORKERS, context=None):
+        self.host = host
+        self.session = session
+        self.rgb_codec = rgb_codec
+        self.jpeg_quality = jpeg_quality
+        # None = mit dem Server aushandeln
+        self.depth_codec = CODEC_IDS[depth_codec] if depth_codec else None
+        self.quant = quant
+        self.encode_workers = encode_workers
+        self.context = context or zmq.Context.instance()
+        self.streamer = RoiStreamer() if roi else None
+        self.roi_lock = threading.Lock()
+
+        self.running = threading.Event()
+        self.running.set()
+        self.threads = []
+        self.source = None
+        self.capture_slot = LatestSlot()
+        self.send_slot = LatestSlot()
+        self.frame_ids = itertools.count()
+
+        # Befehle: Request-ID -> (Future, Deadline); Einreichen über einen inproc-Socket,
+        # alle Sockets gehören dem I/O-Thread
+        self.request_ids = itertools.count(1)
+        self.pending = {}
+        self.submit_lock = threading.Lock()
+        self.submit_endpoint = f"inproc://mtfpl_client_{id(self)}"
+        self.submit = self.context.socket(zmq.PUSH)
+        self.submit.bind(self.submit_endpoint)
+
+        self.result_cond = threading.Condition()
+        self.result = None
+        self.callbacks = []
+        self.stats = {"captured": 0, "encoded": 0, "sent": 0, "send_blocked": 0, "results": 0, "stale": 0}
+        self.latencies = []
+        self.last_sent_id = -1
+
+        self.start_thread(self.io_loop, "io")
+
+    def start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=f"mtfpl-{name}", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    # --- Befehle ---
+
+    def command(self, msg, timeout=None):
+        """Schickt einen Befehl, gibt ein concurrent.futures.Future mit der (dekodierten) Antwort zurück."""
+        msg = dict(msg)
+        if self.session and "session" not in msg and msg.get("cmd") in ("SET_MASK", "STOP", "SET_TEXTURE", "PREDICT"):
+            msg["session"] = self.session
+        future = Future()
+        timeout = timeout or SLOW_COMMANDS.get(msg.get("cmd"), COMMAND_TIMEOUT)
+        with self.submit_lock:
+            req_id = str(next(self.request_ids)).encode()
+            self.pending[req_id] = (future, time.time() + timeout)
+            self.submit.send_multipart([req_id, pickle.dumps(msg)])
+        return future
+
+    def track(self, filename=None, rect=None, K=None):
+        """SET_MASK: startet das Tracking. rect = [[x0, y0], [x1, y1]], K aus der Quelle, wenn nicht angegeben."""
+        if K is None and self.source is not None:
+            K = self.source.K
+        msg = {"cmd": "SET_MASK", "points": rect, "K": np.asarray(K).tolist() if K is not None else None}
+        if filename:
+            msg["filename"] = os.path.basename(filename)
+        if msg["K"] is None:
+            del msg["K"]
+        self.reset_roi()
+        return self.command(msg)
+
+    def stop_tracking(self):
+        self.reset_roi()
+        return self.command({"cmd": "STOP"})
+
+    def reset_roi(self):
+        # Der Runner registriert nur auf Vollbildern; ohne Ergebnis käme sonst keine Anforderung dafür
+        if self.streamer is not None:
+            with self.roi_lock:
+                self.streamer.reset(self.last_sent_id)
+
+    def set_texture(self, name):
+        return self.command({"cmd": "SET_TEXTURE", "name": name})
+
+    def server_stats(self):
+        return self.command({"cmd": "STATS"})
+
+    def health(self, timeout=5.0):
+        return self.command({"cmd": "HEALTH"}, timeout=timeout)
+
+    def wait_ready(self, timeout=120.0, interval=0.2):
+        """Wartet, bis der Proxy bereit meldet (alle Worker gestartet, Netze geladen). Gibt die letzte HEALTH-Antwort zurück."""
+        deadline = time.time() + timeout
+        reply = None
+        while time.time() < deadline:
+            try:
+                reply = self.health().result()
+            except TimeoutError:
+                continue
+            if isinstance(reply, dict) and reply.get("ready"):
+                return reply
+            time.sleep(interval)
+        raise TimeoutError(f"Server nicht bereit: {reply}")
+
+    def upload_cad(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        return self.command({"cmd": "UPLOAD_CAD", "filename": os.path.basename(path), "data": data})
+
+    def negotiate_depth_codec(self, timeout=5.0):
+        try:
+            reply = self.command({"cmd": "GET_CODECS"}, timeout=timeout).result()
+            server = reply.get("depth_codecs", {}) if isinstance(reply, dict) else {}
+        except Exception as e:
+            print(f"[CLIENT] GET_CODECS fehlgeschlagen, nutze png: {e}")
+            server = {}
+        for name in DEPTH_CODEC_PREFERENCE:
+            if name in server and name in CODEC_IDS:
+                return CODEC_IDS[name]
+        return CODEC_IDS["png"]
+
+    # --- Ergebnisse ---
+
+    def on_result(self, callback):
+        """callback(result) wird im I/O-Thread aufgerufen und sollte nicht blockieren."""
+        self.callbacks.append(callback)
+
+    def latest(self, timeout=None, newer_than=None):
+        """Letztes Ergebnis; mit newer_than (frame_id) wird auf ein neueres gewartet."""
+        with self.result_cond:
+            self.result_cond.wait_for(
+                lambda: self.result is not None and (newer_than is None or self.result["frame_id"] > newer_than),
+                timeout)
+            return self.result
+
+    # --- Pipeline ---
+
+    def start(self, source):
+        """Startet Capture, Encoding und Senden für `source` (frame_sources.py)."""
+        self.source = source
+        if self.depth_codec is None:
+            self.depth_codec = self.negotiate_depth_codec()
+        self.start_thread(self.capture_loop, "capture")
+        for i in range(self.encode_workers):
+            self.start_thread(self.encode_loop, f"encode-{i}")
+        self.start_thread(self.send_loop, "send")
+
+    def capture_loop(self):
+        try:
+            while self.running.is_set():
+                bgr, depth, ts = self.source.read()
+                self.stats["captured"] += 1
+                self.capture_slot.put((next(self.frame_ids), bgr, depth, ts))
+        except SourceClosed:
+            print("[CLIENT] Bildquelle beendet")
+        except Exception as e:
+            print(f"[CLIENT] Capture-Fehler: {e}")
+        finally:
+            self.capture_slot.close()
+
+    def encode(self, frame_id, bgr, depth, ts):
+        kwargs = {}
+        if self.streamer is not None:
+            with self.roi_lock:
+                bgr, depth, kwargs = self.streamer.select(bgr, depth)
+        kwargs.update(rgb_shape=bgr.shape, depth_shape=depth.shape)
+        if self.rgb_codec == "jpg":
+            rgb = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])[1]
+            kwargs["rgb_codec"] = CODEC_JPEG
+        else:
+            rgb = bgr
+        if self.depth_codec != CODEC_RAW:
+            depth = encode_depth(depth, self.depth_codec, quant_shift=self.quant)
+            kwargs["depth_codec"] = self.depth_codec
+        return pack_frame(rgb, depth, frame_id=frame_id, timestamp=ts, session=self.session, **kwargs)
+
+    def encode_loop(self):
+        while self.running.is_set():
+            item = self.capture_slot.get(timeout=POLL_MS / 1000.0)
+            if item is None:
+                if self.capture_slot.closed:
+                    break
+                continue
+            try:
+                self.send_slot.put((item[0], self.encode(*item)))
+                self.stats["encoded"] += 1
+            except Exception as e:
+                print(f"[CLIENT] Encoding-Fehler: {e}")
+
+    def send_loop(self):
+        push = self.context.socket(zmq.PUSH)
+        push.setsockopt(zmq.SNDHWM, SEND_HWM)
+        push.setsockopt(zmq.LINGER, 0)
+        push.connect(f"tcp://{self.host}:{EXT_PORT_VID_IN}")
+        item = None
+        try:
+            while self.running.is_set():
+                newer = self.send_slot.get(timeout=0 if item is not None else POLL_MS / 1000.0)
+                if newer is not None:
+                    item = newer
+                if item is None:
+                    continue
+                frame_id, parts = item
+                if frame_id <= self.last_sent_id:
+                    # Mehrere Encoder: ein langsamer kann ein älteres Frame nachliefern
+                    self.stats["stale"] += 1
+                    item = None
+                    continue
+                try:
+                    push.send_multipart(parts, copy=False, flags=zmq.NOBLOCK)
+                except zmq.Again:
+                    # Puffer voll: auf Platz warten, währenddessen darf ein neueres Frame das alte ersetzen
+                    self.stats["send_blocked"] += 1
+                    push.poll(POLL_MS, zmq.POLLOUT)
+                    continue
+                self.last_sent_id = frame_id
+                self.stats["sent"] += 1
+                item = None
+        finally:
+            push.close()
+
+    def io_loop(self):
+        dealer = self.context.socket(zmq.DEALER)
+        dealer.setsockopt(zmq.LINGER, 0)
+        dealer.connect(f"tcp://{self.host}:{EXT_PORT_CMD}")
+        sub = self.context.socket(zmq.SUB)
+        sub.setsockopt(zmq.LINGER, 0)
+        sub.setsockopt(zmq.RCVHWM, 4)
+        sub.setsockopt(zmq.SUBSCRIBE, topic(self.session))
+        sub.connect(f"tcp://{self.host}:{EXT_PORT_RESULTS}")
+        submitted = self.context.socket(zmq.PULL)
+        submitted.connect(self.submit_endpoint)
+
+        poller = zmq.Poller()
+        poller.register(dealer, zmq.POLLIN)
+        poller.register(sub, zmq.POLLIN)
+        poller.register(submitted, zmq.POLLIN)
+        try:
+            while self.running.is_set():
+                try:
+                    socks = dict(poller.poll(POLL_MS))
+                    if submitted in socks:
+                        req_id, payload = submitted.recv_multipart()
+                        # Der ROUTER des Proxys schickt alles vor dem letzten Frame als Envelope zurück
+                        dealer.send_multipart([req_id, b"", payload])
+                    if dealer in socks:
+                        frames = dealer.recv_multipart()
+                        entry = self.pending.pop(frames[0], None)
+                        if entry is not None and not entry[0].done():
+                            entry[0].set_result(decode_reply(frames[-1]))
+                    if sub in socks:
+                        parts = sub.recv_multipart()
+                        try:
+                            result = unpack_result(parts)
+                        except Exception as e:
+                            # Eine kaputte oder fremde Nachricht darf den I/O-Thread nicht beenden
+                            print(f"[CLIENT] Ergebnis nicht lesbar, übersprungen: {e}")
+                        else:
+                            self.handle_result(result)
+                    now = time.time()
+                    for req_id in [r for r, e in list(self.pending.items()) if e[1] < now]:
+                        future, _ = self.pending.pop(req_id)
+                        if not future.done():
+                            future.set_exception(TimeoutError("Keine Antwort vom Server"))
+                except zmq.ContextTerminated:
+                    break
+                except Exception as e:
+                    # Pro Nachricht abfangen, sonst scheitern alle offenen und künftigen Befehle
+                    print(f"[CLIENT] I/O-Fehler: {e}")
+        finally:
+            for future, _ in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Client geschlossen"))
+            dealer.close()
+            sub.close()
+            submitted.close()
+
+    def handle_result(self, result):
+        result["client_recv"] = time.time()
+        self.stats["results"] += 1
+        self.latencies.append(result["client_recv"] - result["capture_ts"])
+        if self.streamer is not None:
+            with self.roi_lock:
+                self.streamer.update(result)
+        with self.result_cond:
+            self.result = result
+            self.result_cond.notify_all()
+        for callback in self.callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"[CLIENT] Fehler im Ergebnis-Callback: {e}")
+
+    def summary(self):
+        stats = dict(self.stats)
+        stats["dropped_capture"] = self.capture_slot.replaced
+        stats["dropped_encoded"] = self.send_slot.replaced
+        if self.latencies:
+            latencies = np.asarray(self.latencies[-1000:]) * 1000.0
+            stats["latency_ms"] = {"p50": float(np.percentile(latencies, 50)), "p95": float(np.percentile(latencies, 95))}
+        return stats
+
+    def close(self, stop=True):
+        if stop and self.source is not None and self.running.is_set():
+            try:
+                self.stop_tracking().result(timeout=5.0)
+            except Exception:
+                pass
+        self.running.clear()
+        self.capture_slot.close()
+        self.send_slot.close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2.0)
+        if self.source is not None:
+            self.source.close()
+        self.submit.close()
+
+
+class AsyncTrackingClient:
+    """asyncio-Fassade: Befehle als Coroutines, Ergebnisse als async-Iterator (je Iterator Latest-wins)."""
+
+    def __init__(self, *args, **kwargs):
+        self.client = TrackingClient(*args, **kwargs)
+
+    def start(self, source):
+        self.client.start(source)
+
+    async def command(self, msg, timeout=None):
+        return await asyncio.wrap_future(self.client.command(msg, timeout))
+
+    async def track(self, filename=None, rect=None, K=None):
+        return await asyncio.wrap_future(self.client.track(filename, rect, K))
+
+    async def results(self):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+
+        def push(result):
+            # Nur das neueste Ergebnis aufheben, wenn der Konsument nicht hinterherkommt
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(result)
+
+        callback = lambda result: loop.call_soon_threadsafe(push, result)
+        self.client.on_result(callback)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.client.callbacks.remove(callback)
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.client.close)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frames einer Bildquelle an den Proxy streamen und Posen ausgeben")
+    parser.add_argument("--source", default="synthetic", help="zivid[:seriennr], file:<ordner|.mvrec>, synthetic[:BxH]")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--session", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=30.0, help="Takt für Datei-/synthetische Quellen")
+    parser.add_argument("--mesh", help="CAD-Datei hochladen und tracken")
+    parser.add_argument("--rect", type=int, nargs=4, metavar=("X0", "Y0", "X1", "Y1"),
+                        help="Maske für die Registrierung (Standard: mittlere Bildfläche)")
+    parser.add_argument("--rgb-codec", choices=["jpg", "raw"], default="jpg")
+    parser.add_argument("--depth-codec", choices=sorted(CODEC_IDS), help="Standard: mit dem Server aushandeln")
+    parser.add_argument("--roi", action="store_true", help="Nur den ROI-Ausschnitt senden (roi_stream.py)")
+    parser.add_argument("--duration", type=float, default=0, help="Nach N Sekunden beenden (0 = bis STRG+C)")
+    args = parser.parse_args()
+
+    source_kwargs = {"fps": args.fps} if not args.source.startswith("zivid") else {}
+    source = open_source(args.source, **source_kwargs)
+    client = TrackingClient(args.host, session=args.session, rgb_codec=args.rgb_codec,
+                            depth_codec=args.depth_codec, roi=args.roi)
+    try:
+        client.wait_ready()
+        if args.mesh:
+            reply = client.upload_cad(args.mesh).result()
+            if reply != b"OK":
+                raise SystemExit(f"Upload fehlgeschlagen: {reply!r}")
+        # Bildgröße für die Standard-Maske, bevor der Capture-Thread die Quelle übernimmt
+        bgr, _, _ = source.read()
+        h, w = bgr.shape[:2]
+        client.start(source)
+        rect = [args.rect[:2], args.rect[2:]] if args.rect else [[w * 3 // 8, h // 3], [w * 5 // 8, h * 2 // 3]]
+        reply = client.track(args.mesh, rect).result()
+        print(f"[CLIENT] SET_MASK -> {reply!r}")
+        if reply != b"OK":
+            raise SystemExit(1)
+
+        t_end = time.time() + args.duration if args.duration else None
+        last_print = time.time()
+        while t_end is None or time.time() < t_end:
+            result = client.latest(timeout=1.0, newer_than=client.result["frame_id"] if client.result else None)
+            if time.time() - last_print >= 1.0 and result is not None:
+                last_print = time.time()
+                t = result["translation"]
+                print(f"[CLIENT] Frame {result['frame_id']}: t = ({t[0]:.3f}, {t[1]:.3f}, {t[2]:.3f}) m, "
+                      f"Konfidenz {result['confidence']}, {client.summary()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        print(f"[CLIENT] {client.summary()}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,7 @@ docker run -d \
   -p 5555:5555 \
   -p 5556:5556 \
   -p 5557:5557 \
+  -p 5558:5558 \
   --name $CONTAINER_NAME \
   --rm \
   $IMAGE_NAME
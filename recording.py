@@ -0,0 +1,293 @@
+import os
+import time
+import mmap
+import queue
+import struct
+import pickle
+import threading
+import numpy as np
+
+from frame_protocol import frame_session
+from telemetry import telemetry
+
+# Aufzeichnung von Sessions für Replay und Offline-Profiling (replay.py).
+# Der Runner hängt rohe Frame-Pakete (wie empfangen), Befehle (INIT, SET_TEXTURE, ...), die dazu
+# nötigen Mesh-Dateien und die versendeten Ergebnisse an eine Capture-Datei an: MTFPL_RECORD=<Ordner>.
+# Geschrieben wird in einem eigenen Thread, der Empfangs-Thread stellt nur Referenzen in eine Queue
+# (bei voller Queue wird der Eintrag verworfen, nie blockiert).
+#
+# Datei: Header (eine Page) + Chunks. Chunks sind vorab allozierte, per mmap beschriebene Bereiche
+# (CHUNK_HEADER: magic, Anzahl Records, Größe, belegte Bytes), ein Record liegt nie über einer Chunk-Grenze.
+# Record: RECORD (kind, Anzahl Teile, session, seq, t) + Längen der Teile (u32), Teile auf 8 Bytes ausgerichtet.
+# Beim Schließen wird der letzte Chunk gekürzt und ein Index (INDEX_DTYPE) samt Footer angehängt;
+# fehlt der Footer (Absturz), baut der Reader den Index aus den Chunk-Headern neu auf.
+
+FILE_MAGIC = b"MVREC"
+FILE_VERSION = 1
+# magic, version, Chunk-Größe, Startzeit (time.time())
+FILE_HEADER = struct.Struct("<5sBxxQd")
+CHUNK_MAGIC = b"MVCK"
+CHUNK_HEADER = struct.Struct("<4sIQQ")
+CHUNK_HEADER_SIZE = 64
+# kind, Anzahl Teile, session, seq, t (Sekunden seit Aufnahmebeginn, Empfangszeit)
+RECORD = struct.Struct("<BBxxIQd")
+INDEX_MAGIC = b"MVIX"
+# magic, Offset des Index, Anzahl Einträge
+FOOTER = struct.Struct("<4sxxxxQQ")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("t", "<f8"), ("session", "<u4"), ("kind", "u1"), ("pad", "V3")])
+ALIGN = 8
+
+KIND_FRAME = 1
+KIND_COMMAND = 2
+KIND_RESULT = 3
+KIND_ASSET = 4
+KIND_NAMES = {KIND_FRAME: "frame", KIND_COMMAND: "command", KIND_RESULT: "result", KIND_ASSET: "asset"}
+
+RECORD_PATH = os.environ.get("MTFPL_RECORD", "")
+RECORD_CHUNK_BYTES = int(os.environ.get("MTFPL_RECORD_CHUNK_MB", "64")) * 1024 * 1024
+RECORD_QUEUE = 64
+# Befehle, die den Zustand einer Session ändern und beim Replay wiederholt werden
+RECORDED_COMMANDS = ("INIT", "STOP", "SET_TEXTURE", "SET_PREDICTION")
+
+
+def aligned(n, align=ALIGN):
+    return (n + align - 1) // align * align
+
+
+def as_view(part):
+    # zmq.Frame (copy=False), bytes oder memoryview
+    view = part.buffer if hasattr(part, "buffer") else memoryview(part)
+    return view.cast("B") if view.ndim != 1 or view.format != "B" else view
+
+
+def recording_path(path=RECORD_PATH):
+    """Ordner -> neue Datei mit Zeitstempel darin, sonst der Pfad selbst."""
+    if os.path.isdir(path) or path.endswith(os.sep):
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, time.strftime("session_%Y%m%d_%H%M%S.mvrec"))
+    return path
+
+
+class CaptureWriter:
+    def __init__(self, path, chunk_size=RECORD_CHUNK_BYTES):
+        self.path = path
+        page = mmap.ALLOCATIONGRANULARITY
+        # Chunks beginnen auf Page-Grenzen (mmap-Offset)
+        self.chunk_size = aligned(chunk_size, page)
+        self.data_start = page
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self.fd, self.data_start)
+        os.pwrite(self.fd, FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, self.chunk_size, time.time()), 0)
+        self.chunk = None
+        self.chunk_offset = self.data_start
+        self.chunk_len = 0
+        self.used = 0
+        self.count = 0
+        self.seq = 0
+        self.index = []
+
+    def new_chunk(self, needed):
+        self.finish_chunk()
+        self.chunk_offset += self.chunk_len
+        self.chunk_len = max(self.chunk_size, aligned(CHUNK_HEADER_SIZE + needed, mmap.ALLOCATIONGRANULARITY))
+        os.ftruncate(self.fd, self.chunk_offset + self.chunk_len)
+        self.chunk = mmap.mmap(self.fd, self.chunk_len, offset=self.chunk_offset)
+        self.used = CHUNK_HEADER_SIZE
+        self.count = 0
+        CHUNK_HEADER.pack_into(self.chunk, 0, CHUNK_MAGIC, 0, self.chunk_len, self.used)
+
+    def finish_chunk(self):
+        if self.chunk is not None:
+            CHUNK_HEADER.pack_into(self.chunk, 0, CHUNK_MAGIC, self.count, self.chunk_len, self.used)
+            self.chunk.close()
+            self.chunk = None
+
+    def append(self, kind, session, parts, t):
+        views = [as_view(p) for p in parts]
+        head = aligned(RECORD.size + 4 * len(views))
+        size = head + sum(aligned(v.nbytes) for v in views)
+        if self.chunk is None or self.used + size > self.chunk_len:
+            self.new_chunk(size)
+
+        buf = self.chunk
+        pos = self.used
+        RECORD.pack_into(buf, pos, kind, len(views), session, self.seq, t)
+        struct.pack_into(f"<{len(views)}I", buf, pos + RECORD.size, *(v.nbytes for v in views))
+        data = pos + head
+        for v in views:
+            buf[data:data + v.nbytes] = v
+            data += aligned(v.nbytes)
+
+        self.index.append((self.chunk_offset + pos, t, session, kind))
+        self.used += size
+        self.count += 1
+        self.seq += 1
+        # Header nach jedem Record aktuell halten, damit ein Absturz höchstens den letzten Record kostet
+        CHUNK_HEADER.pack_into(buf, 0, CHUNK_MAGIC, self.count, self.chunk_len, self.used)
+
+    def close(self):
+        if self.chunk is not None:
+            # Letzten Chunk auf die belegten Bytes kürzen
+            self.chunk_len = aligned(self.used)
+            CHUNK_HEADER.pack_into(self.chunk, 0, CHUNK_MAGIC, self.count, self.chunk_len, self.used)
+            self.chunk.close()
+            self.chunk = None
+        end = self.chunk_offset + self.chunk_len
+        index = np.zeros(len(self.index), dtype=INDEX_DTYPE)
+        if self.index:
+            offsets, times, sessions, kinds = zip(*self.index)
+            index["offset"], index["t"], index["session"], index["kind"] = offsets, times, sessions, kinds
+        os.ftruncate(self.fd, end)
+        os.pwrite(self.fd, index.tobytes() + FOOTER.pack(INDEX_MAGIC, end, len(index)), end)
+        os.close(self.fd)
+
+
+class CaptureReader:
+    """Liest eine Capture-Datei per mmap; Teile sind memoryviews in die Datei (keine Kopie).
+
+    reader = CaptureReader("session.mvrec")
+    for kind, session, seq, t, parts in reader: ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mm)
+        magic, version, self.chunk_size, self.created = FILE_HEADER.unpack_from(self.buf)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"Keine Capture-Datei: {path}")
+        if version != FILE_VERSION:
+            raise ValueError(f"Nicht unterstützte Capture-Version: {version}")
+        self.data_start = mmap.ALLOCATIONGRANULARITY
+        self.index = self.read_index()
+        if self.index is None:
+            print(f"[REPLAY] Kein Index in {path} (Aufnahme abgebrochen?), baue ihn aus den Chunks neu auf")
+            self.index = self.scan()
+
+    def read_index(self):
+        if len(self.buf) < self.data_start + FOOTER.size:
+            return None
+        magic, offset, count = FOOTER.unpack_from(self.buf, len(self.buf) - FOOTER.size)
+        if magic != INDEX_MAGIC or offset + count * INDEX_DTYPE.itemsize + FOOTER.size != len(self.buf):
+            return None
+        return np.frombuffer(self.buf, dtype=INDEX_DTYPE, count=count, offset=offset)
+
+    def scan(self):
+        entries = []
+        pos = self.data_start
+        while pos + CHUNK_HEADER_SIZE <= len(self.buf):
+            magic, count, size, used = CHUNK_HEADER.unpack_from(self.buf, pos)
+            if magic != CHUNK_MAGIC or size == 0:
+                break
+            offset = pos + CHUNK_HEADER_SIZE
+            for _ in range(count):
+                kind, n, session, seq, t = RECORD.unpack_from(self.buf, offset)
+                lengths = struct.unpack_from(f"<{n}I", self.buf, offset + RECORD.size)
+                entries.append((offset, t, session, kind))
+                offset += aligned(RECORD.size + 4 * n) + sum(aligned(length) for length in lengths)
+            pos += size
+        index = np.zeros(len(entries), dtype=INDEX_DTYPE)
+        if entries:
+            offsets, times, sessions, kinds = zip(*entries)
+            index["offset"], index["t"], index["session"], index["kind"] = offsets, times, sessions, kinds
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def record(self, i):
+        """(kind, session, seq, t, [memoryview, ...]) des i-ten Records."""
+        offset = int(self.index["offset"][i])
+        kind, n, session, seq, t = RECORD.unpack_from(self.buf, offset)
+        lengths = struct.unpack_from(f"<{n}I", self.buf, offset + RECORD.size)
+        pos = offset + aligned(RECORD.size + 4 * n)
+        parts = []
+        for length in lengths:
+            parts.append(self.buf[pos:pos + length])
+            pos += aligned(length)
+        return kind, session, seq, t, parts
+
+    def __iter__(self):
+        for i in range(len(self.index)):
+            yield self.record(i)
+
+    def duration(self):
+        return float(self.index["t"][-1] - self.index["t"][0]) if len(self.index) else 0.0
+
+    def close(self):
+        self.index = None
+        try:
+            self.buf.release()
+            self.mm.close()
+        except BufferError:
+            # Es gibt noch Views auf die Datei (z.B. noch nicht gesendete Frames)
+            pass
+
+
+class Recorder(threading.Thread):
+    """Schreib-Thread. frame() kehrt sofort zurück und verwirft bei voller Queue; Befehle, Assets und
+    Ergebnisse warten auf Platz, sonst fehlten dem Replay INIT/SET_TEXTURE oder das Mesh."""
+
+    def __init__(self, path, chunk_size=RECORD_CHUNK_BYTES, queue_size=RECORD_QUEUE):
+        super().__init__(daemon=True)
+        self.writer = CaptureWriter(path, chunk_size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.t0 = time.perf_counter()
+        self.assets = set()
+        self.dropped = 0
+        print(f"[RECORD] Zeichne auf nach {path}")
+
+    def put(self, kind, session, parts, t=None):
+        item = (kind, session, parts, time.perf_counter() if t is None else t)
+        if kind != KIND_FRAME:
+            # Selten und für das Replay nötig: in Reihenfolge mit den Frames, notfalls blockierend
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            telemetry.count("record_dropped")
+
+    def frame(self, parts, t_arrival, copy=False):
+        """`copy`: Teile zeigen in einen Puffer, der gleich überschrieben wird (Shared-Memory-Ring)."""
+        if copy:
+            parts = [bytes(p) for p in parts]
+        self.put(KIND_FRAME, None, parts, t_arrival)
+
+    def result(self, session, parts):
+        self.put(KIND_RESULT, session, parts)
+
+    def command(self, msg):
+        self.put(KIND_COMMAND, msg.get("session", 0), [pickle.dumps(msg)])
+
+    def asset(self, path):
+        """Datei (z.B. Mesh, .mtl, Textur) einmalig mit aufzeichnen, damit das Replay ohne SHARED_DIR auskommt."""
+        if path in self.assets or not os.path.isfile(path):
+            return
+        self.assets.add(path)
+        with open(path, "rb") as f:
+            self.put(KIND_ASSET, 0, [os.path.basename(path).encode(), f.read()])
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            kind, session, parts, t = item
+            try:
+                if session is None:
+                    try:
+                        session = frame_session(parts)
+                    except Exception:
+                        session = 0
+                self.writer.append(kind, session, parts, t - self.t0)
+            except Exception as e:
+                print(f"[RECORD] Fehler: {e}")
+        self.writer.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+        print(f"[RECORD] {self.writer.seq} Records geschrieben, {self.dropped} verworfen")
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+import zmq
+
+from recording import CaptureReader, KIND_FRAME, KIND_COMMAND, KIND_RESULT, KIND_ASSET, KIND_NAMES
+from frame_protocol import unpack_frame, decode_packet
+from result_protocol import unpack_result
+
+# Replay einer Aufnahme (recording.py) für Profiling und Regressionstests.
+#   python replay.py session.mvrec --info
+#   python replay.py session.mvrec                       im Prozess, jeder getrackte Frame, so schnell wie möglich
+#   python replay.py session.mvrec --speed 1             im Prozess mit Original-Timing
+#   python replay.py session.mvrec --network --port 6666 an einen laufenden Runner (Ports wie mt_fp_live.py)
+#
+# Im Prozess werden standardmäßig genau die Frames getrackt, zu denen es in der Aufnahme ein Ergebnis gibt
+# (die Latest-wins-Verluste der Aufnahme werden so nachgebildet, die Posen sind vergleichbar); --all-frames
+# trackt alle. Gemessene Posen werden mit den aufgezeichneten verglichen, bei Abweichungen über den
+# Toleranzen endet das Skript mit Code 1. Frames werden direkt aus der gemappten Datei gelesen/gesendet.
+
+COMMAND_TIMEOUT = 120.0
+
+
+def pose_error(a, b):
+    """(Translation in mm, Rotation in Grad) zwischen zwei 4x4-Posen."""
+    trans = 1000.0 * float(np.linalg.norm(a[:3, 3] - b[:3, 3]))
+    cos = (np.trace(a[:3, :3].T @ b[:3, :3]) - 1.0) / 2.0
+    return trans, float(np.degrees(np.arccos(np.clip(cos, -1.0, 1.0))))
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = np.asarray(values)
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+
+
+def recorded_results(reader):
+    """(session, frame_id) -> Ergebnis-Dict aus der Aufnahme."""
+    results = {}
+    for i in np.flatnonzero(reader.index["kind"] == KIND_RESULT):
+        result = unpack_result(reader.record(i)[4])
+        results[(result["session"], result["frame_id"])] = result
+    return results
+
+
+def write_asset(shared_dir, parts):
+    name = os.path.basename(bytes(parts[0]).decode())
+    path = os.path.join(shared_dir, name)
+    data = parts[1]
+    if os.path.exists(path) and os.path.getsize(path) == data.nbytes:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class Pacer:
+    """Wartet bis zur Original-Ankunftszeit (t / speed), speed = 0: nicht warten."""
+
+    def __init__(self, speed):
+        self.speed = speed
+        self.start = None
+
+    def wait(self, t):
+        if self.speed <= 0:
+            return
+        now = time.perf_counter()
+        if self.start is None:
+            self.start = now - t / self.speed
+        delay = self.start + t / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def replay_direct(reader, args):
+    # Erst hier importieren und die Estimator-Module (bzw. stub_estimator.py) laden
+    import mt_fp_live
+    from scheduler import SessionRegistry
+
+    expected = recorded_results(reader)
+    mt_fp_live.load_estimator()
+    base_runner = mt_fp_live.FPRunner()
+    registry = SessionRegistry(lambda sid: base_runner if sid == 0 else mt_fp_live.FPRunner(shared=base_runner))
+    registry.get(0, create=True)
+    pacer = Pacer(args.speed)
+    replayed = {}
+    frame_times = []
+    skipped = 0
+
+    for kind, session, seq, t, parts in reader:
+        if kind == KIND_ASSET:
+            write_asset(mt_fp_live.SHARED_DIR, parts)
+        elif kind == KIND_COMMAND:
+            msg = pickle.loads(parts[0])
+            reply = mt_fp_live.handle_command(registry, msg)
+            print(f"[REPLAY] {msg.get('cmd')} (Session {session}) -> {reply}")
+            if msg.get("cmd") == "STOP" and msg.get("session", 0) != 0:
+                registry.remove(msg["session"])
+        elif kind == KIND_FRAME:
+            packet = unpack_frame(parts)
+            key = (packet.get("session", 0), packet.get("frame_id", 0))
+            if not args.all_frames and key not in expected:
+                skipped += 1
+                continue
+            runner = registry.get(key[0])
+            if runner is None or not runner.mesh_loaded:
+                skipped += 1
+                continue
+            pacer.wait(t)
+            t0 = time.perf_counter()
+            frame = decode_packet(packet)
+            if frame is None:
+                skipped += 1
+                continue
+            t1 = time.perf_counter()
+            # Wie im Runner: ohne Client-Zeitstempel die Ankunftszeit als Zeitbasis
+            _, pose = runner.process_frame(*frame, timestamp=packet.get("timestamp") or t, roi=packet.get("roi"))
+            t2 = time.perf_counter()
+            frame_times.append((t1 - t0, t2 - t1))
+            if pose is not None:
+                replayed[key] = np.asarray(pose)
+
+    return expected, replayed, frame_times, skipped
+
+
+def replay_network(reader, args):
+    expected = recorded_results(reader)
+    context = zmq.Context()
+    cmd = context.socket(zmq.DEALER)
+    cmd.setsockopt(zmq.RCVTIMEO, int(COMMAND_TIMEOUT * 1000))
+    cmd.connect(f"tcp://{args.host}:{args.port}")
+    vid = context.socket(zmq.PUSH)
+    vid.setsockopt(zmq.SNDHWM, 8)
+    vid.connect(f"tcp://{args.host}:{args.port + 1}")
+    sub = context.socket(zmq.SUB)
+    sub.setsockopt(zmq.SUBSCRIBE, b"")
+    sub.connect(f"tcp://{args.host}:{args.port + 2}")
+    time.sleep(0.3)
+
+    pacer = Pacer(args.speed)
+    replayed = {}
+    latencies = []
+    sent = 0
+
+    def collect(timeout=0):
+        while sub.poll(timeout):
+            result = unpack_result(sub.recv_multipart())
+            if result["pose"] is not None:
+                replayed[(result["session"], result["frame_id"])] = result["pose"]
+            latencies.append(result["server_send"] - result["server_recv"])
+            timeout = 0
+
+    for kind, session, seq, t, parts in reader:
+        if kind == KIND_ASSET:
+            if args.shared_dir:
+                write_asset(args.shared_dir, parts)
+        elif kind == KIND_COMMAND:
+            msg = pickle.loads(parts[0])
+            cmd.send(pickle.dumps(msg))
+            print(f"[REPLAY] {msg.get('cmd')} (Session {session}) -> {cmd.recv().decode()}")
+        elif kind == KIND_FRAME:
+            pacer.wait(t)
+            # memoryviews in die gemappte Datei, zmq sendet ohne Kopie
+            vid.send_multipart(parts, copy=False)
+            sent += 1
+        collect()
+    collect(timeout=1000)
+    return expected, replayed, [(0.0, s) for s in latencies], sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", help="Aufnahme (.mvrec)")
+    parser.add_argument("--info", action="store_true", help="Nur Inhalt der Aufnahme anzeigen")
+    parser.add_argument("--speed", type=float, default=0.0, help="1 = Original-Timing, 0 = so schnell wie möglich")
+    parser.add_argument("--all-frames", action="store_true", help="Auch Frames ohne aufgezeichnetes Ergebnis tracken")
+    parser.add_argument("--network", action="store_true", help="An einen laufenden Runner senden statt im Prozess")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6666, help="Befehls-Port des Runners (+1 Video, +2 Ergebnisse)")
+    parser.add_argument("--shared-dir", default=os.environ.get("MTFPL_SHARED_DIR"),
+                        help="Aufgezeichnete Meshes hierhin schreiben (--network, Runner auf demselben Host)")
+    parser.add_argument("--tolerance-mm", type=float, default=5.0)
+    parser.add_argument("--tolerance-deg", type=float, default=2.0)
+    parser.add_argument("--output", help="JSON-Bericht")
+    args = parser.parse_args()
+
+    reader = CaptureReader(args.capture)
+    kinds, counts = np.unique(reader.index["kind"], return_counts=True)
+    print(f"[REPLAY] {args.capture}: {len(reader)} Records, {reader.duration():.1f} s, "
+          + ", ".join(f"{KIND_NAMES.get(k, k)}={c}" for k, c in zip(kinds, counts))
+          + f", Sessions {sorted(set(reader.index['session'].tolist()))}")
+    if args.info:
+        return
+
+    t0 = time.perf_counter()
+    if args.network:
+        expected, replayed, frame_times, extra = replay_network(reader, args)
+    else:
+        expected, replayed, frame_times, extra = replay_direct(reader, args)
+    elapsed = time.perf_counter() - t0
+
+    errors = [pose_error(replayed[key], expected[key]["pose"])
+              for key in sorted(replayed) if key in expected and expected[key]["pose"] is not None]
+    trans = [e[0] for e in errors]
+    rot = [e[1] for e in errors]
+    failed = sum(1 for t, r in errors if t > args.tolerance_mm or r > args.tolerance_deg)
+    report = {
+        "capture": args.capture,
+        "mode": "network" if args.network else "direct",
+        "speed": args.speed,
+        "elapsed_s": elapsed,
+        "frames": len(frame_times),
+        "fps": len(frame_times) / elapsed if elapsed else None,
+        "decode_ms": percentiles([1000.0 * d for d, _ in frame_times]) if not args.network else None,
+        # Im Prozess: process_frame, über das Netz: Server-Latenz aus den Ergebnissen
+        "track_ms": percentiles([1000.0 * s for _, s in frame_times]),
+        "compared": len(errors),
+        "missing": len([k for k in expected if k not in replayed]),
+        "translation_mm": percentiles(trans),
+        "rotation_deg": percentiles(rot),
+        "failed": failed,
+    }
+    if args.network:
+        report["sent"] = extra
+    else:
+        report["skipped"] = extra
+
+    print(f"[REPLAY] {report['frames']} Frames in {elapsed:.1f} s ({report['fps'] or 0:.1f} fps)")
+    if report["track_ms"]:
+        label = "Server" if args.network else "Tracking"
+        print(f"[REPLAY] {label} p50 {report['track_ms']['p50']:.1f} ms, p95 {report['track_ms']['p95']:.1f} ms")
+    if errors:
+        print(f"[REPLAY] Abweichung zur Aufnahme ({len(errors)} Posen): "
+              f"Translation p50 {report['translation_mm']['p50']:.2f} / max {report['translation_mm']['max']:.2f} mm, "
+              f"Rotation p50 {report['rotation_deg']['p50']:.2f} / max {report['rotation_deg']['max']:.2f} Grad, "
+              f"{failed} über Toleranz")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    reader.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import math
+import struct
+import numpy as np
+
+# Binäres Ergebnis-Format (Runner -> Proxy -> Clients) über PUB/XPUB.
+# Nachricht = [Topic, Record]; Topic "pose.<session>." erlaubt Abos pro Session
+# ("pose." = alle Sessions, der Punkt am Ende verhindert, dass "pose.1." auch Session 10 trifft).
+#
+# Record (little endian, 156 Bytes, Version 1 ohne ROI: 148 Bytes):
+#   4s  magic "MVFR"      B version     B flags     2x Padding
+#   I   session           Q frame_id
+#   d   capture_ts (Client-Zeitstempel aus dem Frame-Header)
+#   d   server_recv, d server_tracked, d server_send   (time.time() auf dem Server)
+#   4f  Quaternion (w, x, y, z)    3f Translation (m)
+#   16i Box-Ecken (8 x u, v)       f  Konfidenz (NaN = unbekannt)
+#   4H  ROI (x, y, w, h) für den nächsten Frame, gültig mit FLAG_ROI (roi_stream.py)
+
+RESULT_MAGIC = b"MVFR"
+RESULT_VERSION = 2
+RESULT_V1 = struct.Struct("<4sBBxxIQdddd4f3f16if")
+RESULT = struct.Struct("<4sBBxxIQdddd4f3f16if4H")
+TOPIC_PREFIX = b"pose."
+
+FLAG_POSE = 0x01
+FLAG_BOX = 0x02
+# Pose/Box auf einen späteren Zeitpunkt extrapoliert (motion_model.py)
+FLAG_PREDICTED = 0x04
+FLAG_ROI = 0x08
+# Server bittet um ein volles Bild (Tracking unsicher oder Re-Registrierung)
+FLAG_FULL_FRAME = 0x10
+
+
+def topic(session=None):
+    """Topic bzw. Abo-Präfix; None = alle Sessions."""
+    if session is None:
+        return TOPIC_PREFIX
+    return TOPIC_PREFIX + str(session).encode() + b"."
+
+
+def matrix_to_quat(R):
+    # Shepperd: numerisch stabiler Zweig je nach größtem Diagonalelement
+    R = np.asarray(R, dtype=np.float64)
+    trace = R[0, 0] + R[1, 1] + R[2, 2]
+    if trace > 0:
+        s = 2.0 * np.sqrt(trace + 1.0)
+        q = [0.25 * s, (R[2, 1] - R[1, 2]) / s, (R[0, 2] - R[2, 0]) / s, (R[1, 0] - R[0, 1]) / s]
+    elif R[0, 0] > R[1, 1] and R[0, 0] > R[2, 2]:
+        s = 2.0 * np.sqrt(1.0 + R[0, 0] - R[1, 1] - R[2, 2])
+        q = [(R[2, 1] - R[1, 2]) / s, 0.25 * s, (R[0, 1] + R[1, 0]) / s, (R[0, 2] + R[2, 0]) / s]
+    elif R[1, 1] > R[2, 2]:
+        s = 2.0 * np.sqrt(1.0 + R[1, 1] - R[0, 0] - R[2, 2])
+        q = [(R[0, 2] - R[2, 0]) / s, (R[0, 1] + R[1, 0]) / s, 0.25 * s, (R[1, 2] + R[2, 1]) / s]
+    else:
+        s = 2.0 * np.sqrt(1.0 + R[2, 2] - R[0, 0] - R[1, 1])
+        q = [(R[1, 0] - R[0, 1]) / s, (R[0, 2] + R[2, 0]) / s, (R[1, 2] + R[2, 1]) / s, 0.25 * s]
+    q = np.array(q)
+    return q / np.linalg.norm(q)
+
+
+def quat_to_matrix(q):
+    w, x, y, z = np.asarray(q, dtype=np.float64) / np.linalg.norm(q)
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def pack_result(session=0, frame_id=0, capture_ts=0.0, server_recv=0.0, server_tracked=0.0, server_send=0.0,
+                pose=None, box_points=None, confidence=None, flags=0, roi=None):
+    """Gibt [Topic, Record] für send_multipart zurück."""
+    quat, trans = (1.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0)
+    if pose is not None:
+        pose = np.asarray(pose)
+        quat, trans = matrix_to_quat(pose[:3, :3]), pose[:3, 3]
+        flags |= FLAG_POSE
+    box = [0] * 16
+    if box_points is not None:
+        box = [int(v) for pt in box_points[:8] for v in pt[:2]]
+        box += [0] * (16 - len(box))
+        flags |= FLAG_BOX
+    if roi is not None:
+        flags |= FLAG_ROI
+    record = RESULT.pack(
+        RESULT_MAGIC, RESULT_VERSION, flags, session, frame_id,
+        capture_ts, server_recv, server_tracked, server_send,
+        *quat, *trans, *box, float("nan") if confidence is None else confidence,
+        *(roi if roi is not None else (0, 0, 0, 0)),
+    )
+    return [topic(session), record]
+
+
+def unpack_result(parts):
+    """[Topic, Record] (oder nur Record) -> Dict mit 4x4-Pose und Box wie im alten Pickle-Format."""
+    record = parts[-1]
+    record = record.buffer if hasattr(record, "buffer") else record
+    fields = (RESULT_V1 if record[4] < 2 else RESULT).unpack_from(record)
+    if fields[0] != RESULT_MAGIC:
+        raise ValueError("Falsches Magic im Ergebnis")
+    flags = fields[2]
+    quat, trans = fields[9:13], fields[13:16]
+    box = fields[16:32]
+    pose = None
+    if flags & FLAG_POSE:
+        pose = np.eye(4)
+        pose[:3, :3] = quat_to_matrix(quat)
+        pose[:3, 3] = trans
+    confidence = fields[32]
+    return {
+        "session": fields[3],
+        "frame_id": fields[4],
+        "capture_ts": fields[5],
+        "server_recv": fields[6],
+        "server_tracked": fields[7],
+        "server_send": fields[8],
+        "timestamp": fields[8],
+        "quat": quat,
+        "translation": trans,
+        "pose": pose,
+        "box_points": [[box[i], box[i + 1]] for i in range(0, 16, 2)] if flags & FLAG_BOX else None,
+        "confidence": None if math.isnan(confidence) else confidence,
+        "roi": list(fields[33:37]) if flags & FLAG_ROI else None,
+        "flags": flags,
+    }
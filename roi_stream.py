@@ -0,0 +1,93 @@
+import os
+import numpy as np
+
+from result_protocol import FLAG_FULL_FRAME
+
+# Pose-gesteuertes ROI-Streaming: der Server meldet mit jedem Ergebnis ein gepolstertes Rechteck
+# um die projizierte 3D-Box (result_protocol.py, FLAG_ROI), der Client schickt nur diesen Ausschnitt
+# von RGB und Depth (Offset und volle Bildgröße im Frame-Header, frame_protocol.py).
+# Der Runner verschiebt dafür den Hauptpunkt von K um den Offset.
+# Zur Wiederherstellung schickt der Client regelmäßig und auf Anforderung (FLAG_FULL_FRAME) ein volles Bild.
+
+# Polsterung relativ zur Boxgröße plus fester Rand in Pixeln
+ROI_PAD = float(os.environ.get("MTFPL_ROI_PAD", "0.25"))
+ROI_MARGIN = int(os.environ.get("MTFPL_ROI_MARGIN", "32"))
+# Ausschnitte auf Vielfache von 16 ausrichten (JPEG-MCUs, weniger Größenwechsel beim Dekodieren)
+ROI_ALIGN = 16
+# Spätestens jeder n-te Frame geht voll raus (0 = nur auf Anforderung)
+ROI_FULL_EVERY = int(os.environ.get("MTFPL_ROI_FULL_EVERY", "30"))
+
+
+def roi_from_points(points_2d, width, height, pad=ROI_PAD, margin=ROI_MARGIN, align=ROI_ALIGN):
+    """Gepolstertes, ausgerichtetes Rechteck [x, y, w, h] um projizierte Punkte, auf das Bild beschnitten (oder None)."""
+    pts = np.asarray(points_2d, dtype=np.float64)
+    if pts.size == 0:
+        return None
+    x0, y0 = pts.min(axis=0)[:2]
+    x1, y1 = pts.max(axis=0)[:2]
+    px = pad * (x1 - x0) + margin
+    py = pad * (y1 - y0) + margin
+    x0 = int(max(0, np.floor((x0 - px) / align) * align))
+    y0 = int(max(0, np.floor((y0 - py) / align) * align))
+    x1 = int(min(width, np.ceil((x1 + px) / align) * align))
+    y1 = int(min(height, np.ceil((y1 + py) / align) * align))
+    if x1 - x0 < align or y1 - y0 < align:
+        return None
+    return [x0, y0, x1 - x0, y1 - y0]
+
+
+def crop_k(K, x, y):
+    """Intrinsics für einen Ausschnitt mit Offset (x, y): nur der Hauptpunkt verschiebt sich."""
+    K = np.array(K, dtype=np.float64)
+    K[0, 2] -= x
+    K[1, 2] -= y
+    return K
+
+
+def crop_rect(rect, x, y, width, height):
+    """Rechteck [x, y, w, h] aus Vollbild-Koordinaten in einen Ausschnitt (width x height bei Offset x, y)."""
+    rx, ry, rw, rh = rect
+    x0, y0 = max(0, rx - x), max(0, ry - y)
+    x1, y1 = min(width, rx - x + rw), min(height, ry - y + rh)
+    return [x0, y0, max(0, x1 - x0), max(0, y1 - y0)]
+
+
+class RoiStreamer:
+    """Client-Seite: wählt pro Frame Vollbild oder Ausschnitt anhand des letzten Ergebnisses.
+
+    streamer.update(unpack_result(parts))
+    rgb, depth, kwargs = streamer.select(rgb, depth)
+    send_frame(socket, rgb, depth, frame_id=..., **kwargs)
+    """
+
+    def __init__(self, full_every=ROI_FULL_EVERY):
+        self.full_every = full_every
+        self.roi = None
+        self.full_requested = True
+        self.since_full = 0
+        # Ergebnisse zu Frames bis einschließlich dieser ID stammen aus der Zeit vor reset()
+        self.ignore_until = -1
+
+    def reset(self, last_frame_id=-1):
+        """Neues Tracking (SET_MASK/STOP): Vollbilder, bis ein Ergebnis zu einem späteren Frame ein ROI liefert."""
+        self.roi = None
+        self.full_requested = True
+        self.ignore_until = last_frame_id
+
+    def update(self, result):
+        if result.get("frame_id", 0) <= self.ignore_until:
+            return
+        self.roi = result.get("roi")
+        self.full_requested = bool(result.get("flags", 0) & FLAG_FULL_FRAME) or self.roi is None
+
+    def select(self, rgb, depth):
+        """Gibt (rgb, depth, kwargs für pack_frame) zurück; Ausschnitte sind Views (bei CODEC_RAW kopiert pack_frame)."""
+        self.since_full += 1
+        if self.roi is None or self.full_requested or (self.full_every and self.since_full >= self.full_every):
+            self.since_full = 0
+            self.full_requested = False
+            return rgb, depth, {}
+        x, y, w, h = self.roi
+        H, W = depth.shape[:2]
+        return (rgb[y:y + h, x:x + w], depth[y:y + h, x:x + w],
+                {"roi_offset": (x, y), "full_shape": (H, W)})
@@ -4,10 +4,13 @@ cd /workspace/MetaVisionFPLiveServer
 
 mkdir -p /workspace/shared_data
 
+# Zeitbasis für die Start-Zeiten (HEALTH/STATS, startup.py)
+export MTFPL_BOOT_TS=$(date +%s.%N)
+
+# Keine feste Wartezeit: der Runner bindet seine Ports sofort und meldet per HEALTH, wann die Netze
+# geladen sind, der Proxy hält INIT-Befehle bis dahin zurück
 echo "[ENTRYPOINT] Starte Proxy Server..."
 python MTFPL_server_proxy.py &
 
-sleep 2
-
 echo "[ENTRYPOINT] Starte FoundationPose Runner..."
-python mt_fp_live.py
\ No newline at end of file
+exec python mt_fp_live.py
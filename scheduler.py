@@ -0,0 +1,85 @@
+import threading
+
+# Verteilung der GPU auf mehrere Tracking-Sessions.
+# Bewusst ohne GPU-/FoundationPose-Abhängigkeiten, damit Registry und Scheduler
+# auch mit einem Stub-Estimator auf der CPU laufen.
+
+POLICIES = ("round_robin", "deadline")
+
+
+class SessionRegistry:
+    """Hält pro Session-ID ein eigenes Runner-Objekt (Estimator-Zustand, K, Maske, Mesh).
+
+    `factory(session_id)` erzeugt den Runner beim ersten Zugriff.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_id, create=False):
+        with self.lock:
+            runner = self.sessions.get(session_id)
+            if runner is None and create:
+                runner = self.sessions[session_id] = self.factory(session_id)
+                print(f"[SESSION] Neue Session: {session_id}")
+            return runner
+
+    def remove(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None)
+
+    def active(self):
+        with self.lock:
+            return [sid for sid, r in self.sessions.items() if r.mesh_loaded]
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SessionScheduler:
+    """Wählt die nächste Session, deren Frame getrackt wird.
+
+    round_robin: reihum über alle Sessions mit wartendem Frame.
+    deadline:    die Session, deren Frame (Ankunft + Budget) am frühesten fällig ist.
+    """
+
+    def __init__(self, policy="round_robin", budget=0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"Unbekannte Scheduling-Policy: {policy}")
+        self.policy = policy
+        self.budget = budget
+        self.last = None
+        # Bediente Frames pro Session (STATS), gelesen vom Befehls-Thread
+        self.served = {}
+        self.lock = threading.Lock()
+
+    def next(self, ready):
+        """`ready`: {session_id: Ankunftszeit des wartenden Frames}. Gibt eine Session-ID oder None zurück."""
+        if not ready:
+            return None
+
+        if self.policy == "deadline":
+            sid = min(ready, key=lambda s: (ready[s] + self.budget, s))
+        else:
+            order = sorted(ready)
+            sid = order[0]
+            if self.last is not None:
+                # Erste Session nach der zuletzt bedienten
+                later = [s for s in order if s > self.last]
+                if later:
+                    sid = later[0]
+
+        self.last = sid
+        with self.lock:
+            self.served[sid] = self.served.get(sid, 0) + 1
+        return sid
+
+    def forget(self, session_id):
+        with self.lock:
+            self.served.pop(session_id, None)
+
+    def stats(self):
+        with self.lock:
+            return {"policy": self.policy, "served": dict(self.served)}
@@ -0,0 +1,172 @@
+import os
+import struct
+import secrets
+import zmq
+from multiprocessing import shared_memory, resource_tracker
+
+# Shared-Memory-Ring für Frames zwischen Prozessen auf demselben Host (Proxy -> Runner oder Client -> Runner).
+# Der Runner legt den Ring an, genau ein Schreiber kopiert die Multipart-Teile eines Frames
+# (Header, RGB, Depth aus frame_protocol.py) in einen Slot und schickt nur eine kleine
+# Benachrichtigung [SHM_TAG, slot, seq] per ZeroMQ (ipc). Der Runner liest die Teile in place.
+#
+# Layout: Ring-Header (64 B) + pro Slot Slot-Header (64 B) und slot_size Bytes Daten.
+# Slot-Header: state (u64) + Längen der drei Teile. state = 2*seq+1 während des Schreibens,
+# 2*seq+2 wenn fertig (Seqlock) -> Leser erkennen überschriebene oder halb geschriebene Slots.
+
+RING_MAGIC = b"MVSR"
+RING_HEADER = struct.Struct("<4sIIQ")
+SLOT_HEADER = struct.Struct("<QIII")
+HEADER_SIZE = 64
+SHM_TAG = b"MVSHM"
+NOTIFY = struct.Struct("<IQ")
+
+SHM_SLOTS = int(os.environ.get("MTFPL_SHM_SLOTS", "8"))
+SHM_SLOT_BYTES = int(os.environ.get("MTFPL_SHM_SLOT_MB", "8")) * 1024 * 1024
+
+
+def ring_name(port):
+    return f"mtfpl_frames_{port}"
+
+
+def notify_endpoint(port):
+    return f"ipc:///tmp/mtfpl_frames_{port}.ipc"
+
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        magic, self.slots, self.slot_size, self.instance = RING_HEADER.unpack_from(shm.buf)
+        if magic != RING_MAGIC:
+            raise ValueError(f"Kein Frame-Ring: {shm.name}")
+        self.next_seq = 0
+
+    @classmethod
+    def create(cls, name, slots=SHM_SLOTS, slot_size=SHM_SLOT_BYTES):
+        try:
+            # Reste eines abgestürzten Runners entfernen
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + slots * (HEADER_SIZE + slot_size))
+        RING_HEADER.pack_into(shm.buf, 0, RING_MAGIC, slots, slot_size, secrets.randbits(64))
+        for i in range(slots):
+            SLOT_HEADER.pack_into(shm.buf, cls.slot_offset(i, slot_size), 0, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        # Sonst löscht der resource_tracker den Ring beim Beenden des Schreibers (Python < 3.13)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @staticmethod
+    def slot_offset(index, slot_size):
+        return HEADER_SIZE + index * (HEADER_SIZE + slot_size)
+
+    def write(self, parts):
+        """Kopiert die Teile in den nächsten Slot. Gibt die Benachrichtigung zurück oder None, wenn der Frame zu groß ist."""
+        views = [p.buffer if hasattr(p, "buffer") else memoryview(p) for p in parts]
+        views = [v.cast("B") if v.ndim != 1 or v.format != "B" else v for v in views]
+        if len(views) != 3 or sum(v.nbytes for v in views) > self.slot_size:
+            return None
+
+        seq = self.next_seq
+        self.next_seq += 1
+        index = seq % self.slots
+        offset = self.slot_offset(index, self.slot_size)
+        buf = self.shm.buf
+        SLOT_HEADER.pack_into(buf, offset, 2 * seq + 1, 0, 0, 0)
+        pos = offset + HEADER_SIZE
+        for v in views:
+            buf[pos:pos + v.nbytes] = v
+            pos += v.nbytes
+        SLOT_HEADER.pack_into(buf, offset, 2 * seq + 2, *(v.nbytes for v in views))
+        return [SHM_TAG, NOTIFY.pack(index, seq)]
+
+    def read(self, notification):
+        """Gibt (Teile als memoryviews in den Ring, (index, seq)) zurück oder None, wenn der Slot schon überschrieben ist."""
+        index, seq = NOTIFY.unpack(bytes(notification))
+        offset = self.slot_offset(index, self.slot_size)
+        state, *lengths = SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        if state != 2 * seq + 2:
+            return None
+        parts = []
+        pos = offset + HEADER_SIZE
+        for n in lengths:
+            parts.append(self.shm.buf[pos:pos + n])
+            pos += n
+        return parts, (index, seq)
+
+    def valid(self, token):
+        """True, solange der Slot noch den Frame `token` enthält (nach dem Lesen in place prüfen)."""
+        index, seq = token
+        state = SLOT_HEADER.unpack_from(self.shm.buf, self.slot_offset(index, self.slot_size))[0]
+        return state == 2 * seq + 2
+
+    def stale(self):
+        """True, wenn unter dem Namen inzwischen ein neuer Ring liegt (Runner neu gestartet)."""
+        try:
+            current = FrameRing.attach(self.shm.name)
+        except FileNotFoundError:
+            return True
+        try:
+            return current.instance != self.instance
+        finally:
+            current.close()
+
+    def close(self):
+        try:
+            self.shm.close()
+        except BufferError:
+            # Es gibt noch Views in den Ring (z.B. ein zurückgehaltenes Paket)
+            return
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def is_notification(parts):
+    return len(parts) == 2 and bytes(parts[0]) == SHM_TAG
+
+
+class ShmSender:
+    """Schreibseite für Clients oder den Proxy auf demselben Host wie der Runner.
+
+    sender = ShmSender(context, port=6667); sender.send(pack_frame(...))   (Video-Port des Runners)
+    Zu große Frames gehen normal über `fallback` (z.B. den TCP-Socket), falls angegeben.
+    """
+
+    def __init__(self, context, port, fallback=None):
+        self.port = port
+        self.ring = FrameRing.attach(ring_name(port))
+        self.socket = context.socket(zmq.PUSH)
+        self.socket.setsockopt(zmq.SNDHWM, 4)
+        self.socket.connect(notify_endpoint(port))
+        self.fallback = fallback
+
+    def send(self, parts):
+        notification = self.ring.write(parts)
+        if notification is None:
+            if self.fallback is not None:
+                try:
+                    self.fallback.send_multipart(parts, copy=False, flags=zmq.NOBLOCK)
+                except zmq.Again:
+                    pass
+            return False
+        try:
+            self.socket.send_multipart(notification, flags=zmq.NOBLOCK)
+        except zmq.Again:
+            return False
+        return True
+
+    def reattach_if_stale(self):
+        if self.ring.stale():
+            self.ring.close()
+            self.ring = FrameRing.attach(ring_name(self.port))
+            print(f"[SHM] Ring für Port {self.port} neu verbunden")
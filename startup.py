@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+import numpy as np
+
+from telemetry import telemetry
+
+# Gestufter Start des Runners: Sockets sofort binden, dann Estimator-Module und Netze laden,
+# optional Meshes aus SHARED_DIR vorladen und einmal durchrechnen (Warmup), dann READY.
+# Bis dahin beantwortet der Runner HEALTH/STATS, andere Befehle warten in der Queue;
+# der Proxy schickt Docker-Befehle erst an Worker, die bereit sind (worker_pool.py).
+#
+# Zeiten werden ab MTFPL_BOOT_TS gemessen (Container-Start, von run.sh gesetzt), sonst ab Prozess-Start.
+# Stages: sockets, imports, networks, preload, warmup, ready, first_frame (erstes versendetes Ergebnis).
+
+PROCESS_START = time.time()
+BOOT_TS = float(os.environ.get("MTFPL_BOOT_TS", "0") or 0) or PROCESS_START
+# Meshes aus SHARED_DIR in den Mesh-Cache laden (neueste zuerst), 0 = aus
+PRELOAD_MESHES = int(os.environ.get("MTFPL_PRELOAD_MESHES", "4"))
+# Estimator für das neueste Mesh bauen und einmal registrieren/tracken (CUDA-Kernel, Allokationen)
+WARMUP = os.environ.get("MTFPL_WARMUP", "1") == "1"
+MESH_EXTENSIONS = (".obj", ".ply", ".stl", ".glb", ".gltf", ".off")
+
+
+class Startup:
+    def __init__(self, boot_ts=BOOT_TS):
+        self.boot_ts = boot_ts
+        self.stage = "starting"
+        self.marks = {}
+        self.error = None
+        self.preloaded = []
+        self.warm_mesh = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+
+    def mark(self, stage):
+        elapsed = time.time() - self.boot_ts
+        with self.lock:
+            if stage in self.marks:
+                return
+            self.marks[stage] = elapsed
+            if stage != "first_frame":
+                self.stage = stage
+        telemetry.record(f"startup_{stage}", elapsed)
+        print(f"[STARTUP] {stage}: {elapsed:.2f} s")
+
+    def set_ready(self):
+        self.mark("ready")
+        self.ready.set()
+
+    def fail(self, error):
+        with self.lock:
+            self.stage = "failed"
+            self.error = str(error)
+        print(f"[STARTUP] Fehlgeschlagen: {error}")
+
+    def first_frame(self):
+        if "first_frame" not in self.marks:
+            self.mark("first_frame")
+
+    def health(self):
+        """Antwort auf HEALTH (und Teil von STATS)."""
+        with self.lock:
+            status = "FAILED" if self.error else ("READY" if self.ready.is_set() else "STARTING")
+            return {
+                "status": status,
+                "ready": self.ready.is_set(),
+                # Zuletzt abgeschlossene Stage
+                "stage": self.stage,
+                "error": self.error,
+                "since_boot_s": dict(self.marks),
+                "uptime_s": time.time() - PROCESS_START,
+                "preloaded": list(self.preloaded),
+                "warm_mesh": self.warm_mesh,
+            }
+
+
+def mesh_candidates(shared_dir, limit=PRELOAD_MESHES):
+    """Mesh-Dateien in SHARED_DIR, zuletzt geänderte zuerst."""
+    try:
+        entries = [e for e in os.scandir(shared_dir) if e.is_file() and e.name.lower().endswith(MESH_EXTENSIONS)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [e.name for e in entries[:limit]]
+
+
+def warmup_frame(width=640, height=480, distance=0.6):
+    """Synthetisches Frame (Ebene in `distance` m, Maske in der Bildmitte) für einen Probelauf."""
+    rgb = np.full((height, width, 3), 128, np.uint8)
+    depth = np.full((height, width), distance, np.float32)
+    mask = np.zeros((height, width), np.uint8)
+    mask[height // 3:height * 2 // 3, width * 3 // 8:width * 5 // 8] = 1
+    return rgb, depth, mask
@@ -0,0 +1,90 @@
+import os
+import time
+import random
+import numpy as np
+import trimesh
+
+# CPU-Ersatz für die FoundationPose-Module (estimater, datareader, myUtils), damit mt_fp_live.py
+# ohne GPU läuft: MTFPL_STUB_ESTIMATOR=1. Der echte Runner (Decoder, Scheduler, Latenz-Budget,
+# Bewegungsmodell, Ergebnis-Stream) bleibt unverändert, nur register/track_one werden durch
+# eine einstellbare Rechenzeit ersetzt. Verwendet von bench_e2e.py.
+
+# Kosten pro Refinement-Iteration bzw. für die Registrierung (ms)
+STUB_ITER_MS = float(os.environ.get("MTFPL_STUB_ITER_MS", "5"))
+STUB_REGISTER_MS = float(os.environ.get("MTFPL_STUB_REGISTER_MS", "200"))
+# "sleep" (wie GPU-Arbeit, gibt den GIL frei) oder "spin" (belegt einen CPU-Kern)
+STUB_MODE = os.environ.get("MTFPL_STUB_MODE", "sleep")
+
+
+def stub_work(ms):
+    if STUB_MODE == "spin":
+        end = time.perf_counter() + ms / 1000.0
+        while time.perf_counter() < end:
+            pass
+    else:
+        time.sleep(ms / 1000.0)
+
+
+class ScorePredictor:
+    pass
+
+
+class PoseRefinePredictor:
+    pass
+
+
+class dr:
+    class RasterizeCudaContext:
+        pass
+
+
+class FoundationPose:
+    """Gleiche Schnittstelle wie estimater.FoundationPose. Die Pose liegt im Tiefen-Schwerpunkt der Maske."""
+
+    def __init__(self, model_pts, model_normals, mesh=None, scorer=None, refiner=None, glctx=None, **kwargs):
+        self.mesh = mesh
+        self.mesh_tensors = None
+        self.center = (mesh.bounds[0] + mesh.bounds[1]) / 2.0 if mesh is not None else np.zeros(3)
+        self.pose_last = None
+
+    def get_tf_to_centered_mesh(self):
+        tf = np.eye(4)
+        tf[:3, 3] = -self.center
+        return tf
+
+    def register(self, K, rgb, depth, ob_mask, iteration=5, **kwargs):
+        stub_work(STUB_REGISTER_MS)
+        v, u = np.nonzero(ob_mask)
+        z = depth[v, u] if len(u) else np.zeros(0)
+        z = float(np.median(z[z > 0.1])) if np.any(z > 0.1) else 1.0
+        center = np.array([u.mean(), v.mean(), 1.0]) if len(u) else np.array([K[0][2], K[1][2], 1.0])
+        # Vorderseite der Bounding-Box auf die gemessene Oberfläche, damit die Tiefen-Konfidenz plausibel ist
+        if self.mesh is not None:
+            z += self.center[2] - self.mesh.bounds[0][2]
+        pose = np.eye(4)
+        pose[:3, 3] = np.linalg.inv(K) @ center * z - self.center
+        self.pose_last = pose @ np.linalg.inv(self.get_tf_to_centered_mesh())
+        return pose
+
+    def track_one(self, rgb, depth, K, iteration=2, **kwargs):
+        stub_work(STUB_ITER_MS * iteration)
+        return self.pose_last @ self.get_tf_to_centered_mesh()
+
+
+def trimesh_add_pure_colored_texture(mesh, color=np.array([255, 255, 255]), resolution=5):
+    mesh = mesh.copy()
+    mesh.visual = trimesh.visual.ColorVisuals(mesh, vertex_colors=np.append(color, 255).astype(np.uint8))
+    return mesh
+
+
+def make_mesh_tensors(mesh, device="cuda", max_tex_size=None):
+    return None
+
+
+def set_logging_format(level=None):
+    pass
+
+
+def set_seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
@@ -0,0 +1,157 @@
+import os
+import time
+import pickle
+import argparse
+import numpy as np
+import zmq
+
+from frame_protocol import unpack_frame, decode_packet
+from result_protocol import pack_result
+from roi_stream import roi_from_points
+from shm_ring import FrameRing, ring_name, notify_endpoint, is_notification
+from scheduler import SessionScheduler
+from telemetry import telemetry
+
+# CPU-Ersatz für mt_fp_live.py mit demselben Wire-Protokoll (Befehle, Frames, Ergebnisse),
+# um Proxy, Worker-Pool und Scheduler ohne GPU/FoundationPose zu testen.
+# Frames werden echt dekodiert, das Tracking wird durch eine feste Rechenzeit ersetzt.
+# Beispiel: python stub_worker.py --port 7666 --track-ms 30
+
+TRACK_MS = float(os.environ.get("MTFPL_STUB_TRACK_MS", "20"))
+SHM_TRANSPORT = os.environ.get("MTFPL_SHM", "0") == "1"
+
+
+class StubRunner:
+    def __init__(self, track_time):
+        self.track_time = track_time
+        self.mesh_loaded = False
+        self.filename = None
+        self.texture = None
+        self.mask_rect = None
+        self.K = None
+
+    def process_frame(self, rgb, depth):
+        time.sleep(self.track_time)
+        x, y, w, h = self.mask_rect or (0, 0, rgb.shape[1], rgb.shape[0])
+        box = [[x, y], [x, y + h], [x + w, y], [x + w, y + h]] * 2
+        return box, np.eye(4)
+
+
+def handle_command(sessions, msg, track_time):
+    cmd = msg.get("cmd")
+    session = msg.get("session", 0)
+
+    if cmd == "INIT":
+        runner = sessions.setdefault(session, StubRunner(track_time))
+        runner.mask_rect = msg["mask_rect"]
+        runner.K = msg.get("K")
+        runner.filename = msg["filename"]
+        runner.mesh_loaded = True
+        return "OK"
+
+    runner = sessions.get(session)
+    if runner is None:
+        return "ERROR: NO SESSION"
+    if cmd == "STOP":
+        sessions.pop(session, None)
+        return "OK"
+    if cmd == "SET_TEXTURE":
+        runner.texture = msg.get("name")
+        return "OK"
+    if cmd == "SET_PREDICTION":
+        # Kein Bewegungsmodell im Stub
+        return "OK"
+    return "UNKNOWN"
+
+
+def main(port_base, track_time):
+    context = zmq.Context()
+    cmd_socket = context.socket(zmq.ROUTER)
+    cmd_socket.bind(f"tcp://0.0.0.0:{port_base}")
+    vid_in = context.socket(zmq.PULL)
+    vid_in.setsockopt(zmq.RCVHWM, 8)
+    vid_in.bind(f"tcp://0.0.0.0:{port_base + 1}")
+    ring = None
+    if SHM_TRANSPORT:
+        ring = FrameRing.create(ring_name(port_base + 1))
+        vid_in.bind(notify_endpoint(port_base + 1))
+    vid_out = context.socket(zmq.PUB)
+    vid_out.bind(f"tcp://0.0.0.0:{port_base + 2}")
+
+    poller = zmq.Poller()
+    poller.register(cmd_socket, zmq.POLLIN)
+    poller.register(vid_in, zmq.POLLIN)
+
+    sessions = {}
+    scheduler = SessionScheduler()
+    # Session -> (Paket, Ankunftszeit), Latest-wins
+    latest = {}
+    counts = {"received": 0, "tracked": 0, "dropped": 0}
+    print(f"[STUB] Worker auf Port {port_base} (Tracking {track_time * 1000:.0f} ms)")
+
+    while True:
+        socks = dict(poller.poll(0 if latest else 1000))
+
+        if cmd_socket in socks:
+            frames = cmd_socket.recv_multipart()
+            msg = pickle.loads(frames[-1])
+            if msg.get("cmd") == "STATS":
+                stats = telemetry.snapshot()
+                stats["frames"] = dict(counts, sessions=len(sessions))
+                stats["queue_depth"] = len(latest)
+                reply = pickle.dumps(stats)
+            elif msg.get("cmd") == "PREDICT":
+                reply = pickle.dumps({"status": "ERROR"})
+            else:
+                reply = handle_command(sessions, msg, track_time).encode()
+            cmd_socket.send_multipart(frames[:-1] + [reply])
+
+        if vid_in in socks:
+            while True:
+                try:
+                    parts = vid_in.recv_multipart(flags=zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                counts["received"] += 1
+                token = None
+                if ring is not None and is_notification(parts):
+                    entry = ring.read(parts[1])
+                    if entry is None:
+                        counts["dropped"] += 1
+                        continue
+                    parts, token = entry
+                packet = unpack_frame(parts)
+                packet["shm"] = token
+                session = packet["session"]
+                if session in latest or session not in sessions:
+                    counts["dropped"] += 1
+                if session in sessions:
+                    latest[session] = (packet, time.perf_counter())
+
+        session = scheduler.next({sid: t for sid, (_, t) in latest.items()})
+        if session is None:
+            continue
+        packet, t_arrival = latest.pop(session)
+        if session not in sessions:
+            continue
+        frame = decode_packet(packet)
+        if frame is None or (packet["shm"] is not None and not ring.valid(packet["shm"])):
+            continue
+        box, pose = sessions[session].process_frame(*frame)
+        H, W = packet["roi"][2:] if packet.get("roi") else frame[0].shape[:2]
+        counts["tracked"] += 1
+        now = time.time()
+        vid_out.send_multipart(pack_result(
+            session=session, frame_id=packet.get("frame_id", 0), capture_ts=packet.get("timestamp", 0.0),
+            server_recv=now - (time.perf_counter() - t_arrival), server_tracked=now, server_send=now,
+            pose=pose, box_points=box, roi=roi_from_points(box, W, H),
+        ))
+        telemetry.record("server_total", time.perf_counter() - t_arrival)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=6666, help="Basis-Port (Befehle), +1 Video, +2 Ergebnisse")
+    parser.add_argument("--track-ms", type=float, default=TRACK_MS)
+    args = parser.parse_args()
+    main(args.port, args.track_ms / 1000.0)
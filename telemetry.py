@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Laufzeit-Telemetrie: rollierende Latenz-Fenster pro Stage + Zähler.
+# Aufnehmen ist O(1) (deque.append), Perzentile werden erst bei Abfrage berechnet.
+# Zusätzlich summierte CPU-Zeit pro Stage (time.thread_time), z.B. für bench_e2e.py.
+
+ENABLED = os.environ.get("MTFPL_TELEMETRY", "1") == "1"
+WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Telemetry:
+    def __init__(self, window=WINDOW, enabled=ENABLED):
+        self.enabled = enabled
+        self.window = window
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.cpu = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.samples[stage].append(seconds)
+            self.totals[stage] += 1
+
+    def record_cpu(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.cpu[stage] += seconds
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        with self.lock:
+            windows = {k: sorted(v) for k, v in self.samples.items()}
+            totals = dict(self.totals)
+            counters = dict(self.counters)
+            cpu = dict(self.cpu)
+
+        stages = {}
+        for stage, values in windows.items():
+            if not values:
+                continue
+            entry = {"count": totals[stage], "mean_ms": 1000.0 * sum(values) / len(values)}
+            for q in QUANTILES:
+                idx = min(len(values) - 1, int(q * len(values)))
+                entry[f"p{int(q * 100)}_ms"] = 1000.0 * values[idx]
+            stages[stage] = entry
+        return {"stages": stages, "counters": counters, "cpu_s": cpu}
+
+    def prometheus(self, extra_counters=None):
+        snap = self.snapshot()
+        lines = ["# TYPE mtfpl_stage_seconds summary"]
+        for stage, entry in sorted(snap["stages"].items()):
+            for q in QUANTILES:
+                value = entry[f"p{int(q * 100)}_ms"] / 1000.0
+                lines.append(f'mtfpl_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'mtfpl_stage_seconds_count{{stage="{stage}"}} {entry["count"]}')
+
+        counters = dict(snap["counters"])
+        counters.update(extra_counters or {})
+        lines.append("# TYPE mtfpl_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'mtfpl_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry()
+
+
+def serve_prometheus(port, extra_counters=None):
+    """Startet einen /metrics-Endpunkt im Prometheus-Textformat (Daemon-Thread)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = telemetry.prometheus(extra_counters() if extra_counters else None).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[TELEMETRY] Prometheus-Endpunkt: http://0.0.0.0:{port}/metrics")
+    return server
+
+
+class Timer:
+    """Kleiner Helfer: t = Timer(); ...; t.lap("decode")  (Wand- und CPU-Zeit des Threads)"""
+
+    __slots__ = ("t", "cpu")
+
+    def __init__(self):
+        self.t = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        cpu = time.thread_time()
+        telemetry.record(stage, now - self.t)
+        telemetry.record_cpu(stage, cpu - self.cpu)
+        self.t = now
+        self.cpu = cpu
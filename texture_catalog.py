@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import time
+import base64
+import shutil
+import hashlib
+import threading
+import cv2
+
+# Vorberechneter Textur-Katalog für GET_TEXTURES.
+# Pro Material: Name, Kategorie, Pfad der Color-Map, Thumbnail (JPEG-Bytes), mtime/size.
+# Der Index wird als JSON neben den Texturen abgelegt und bei Änderungen inkrementell
+# aktualisiert: nur neue oder geänderte Color-Maps werden neu gelesen.
+# Zusätzlich werden verkleinerte Varianten (Mip-Stufen) mit ETag für GET_TEXTURE_FULL erzeugt.
+# Kategorien kommen aus dem Manifest von download_textures.py, sonst aus dem Namen.
+
+CATALOG_FILE = ".catalog.json"
+MANIFEST_FILE = ".manifest.json"
+MANIFEST_VERSION = 1
+MIP_DIR = ".mips"
+THUMB_SIZE = 64
+REFRESH_INTERVAL = 5.0
+# Stufe -> maximale Kantenlänge ("full" = Originaldatei)
+LEVELS = {"1K": 1024, "512": 512, "256": 256}
+
+
+def find_color_map(sub_dir):
+    files = sorted(os.listdir(sub_dir))
+    for f in files:
+        if "Color" in f and f.endswith(('.jpg', '.png')):
+            return os.path.join(sub_dir, f)
+    for f in files:
+        if f.endswith(('.jpg', '.png')):
+            return os.path.join(sub_dir, f)
+    return None
+
+
+def category_from_name(name):
+    # ambientCG-IDs: "Metal032", "WoodFloor051" -> "Metal", "WoodFloor"
+    match = re.match(r"[A-Za-z]+", name)
+    return match.group(0) if match else "Other"
+
+
+def load_manifest(texture_dir):
+    """Download-Manifest ({"version", "assets": {Asset-ID: Eintrag}}), leer wenn nicht vorhanden/unlesbar."""
+    try:
+        with open(os.path.join(texture_dir, MANIFEST_FILE), "r") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION and isinstance(data.get("assets"), dict):
+            return data
+        print(f"[CATALOG] Manifest-Version {data.get('version')} nicht unterstützt")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[CATALOG] Manifest unlesbar: {e}")
+    return {"version": MANIFEST_VERSION, "assets": {}}
+
+
+def file_etag(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_assets(image_file, mip_dir):
+    """Erzeugt Thumbnail und Mip-Varianten einer Color-Map (ein Decoding für alles)."""
+    img = cv2.imread(image_file)
+    thumb = cv2.resize(img, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', thumb, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+
+    st = os.stat(image_file)
+    variants = {"full": {"path": image_file, "etag": file_etag(image_file), "size": st.st_size}}
+
+    os.makedirs(mip_dir, exist_ok=True)
+    ext = os.path.splitext(image_file)[1]
+    h, w = img.shape[:2]
+    for level, edge in LEVELS.items():
+        scale = edge / max(h, w)
+        if scale >= 1.0:
+            # Original ist schon klein genug
+            variants[level] = variants["full"]
+            continue
+        mip = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        path = os.path.join(mip_dir, f"{level}{ext}")
+        cv2.imwrite(path, mip)
+        variants[level] = {"path": path, "etag": file_etag(path), "size": os.path.getsize(path)}
+
+    return buffer.tobytes(), variants
+
+
+class TextureCatalog:
+    def __init__(self, texture_dir, categories=None):
+        self.texture_dir = texture_dir
+        self.index_path = os.path.join(texture_dir, CATALOG_FILE)
+        self.mip_root = os.path.join(texture_dir, MIP_DIR)
+        # Optionale Zuordnung Name -> Kategorie, ohne Angabe aus dem Download-Manifest
+        self.fixed_categories = categories is not None
+        self.categories = categories or {}
+        self.manifest_path = os.path.join(texture_dir, MANIFEST_FILE)
+        self.manifest_mtime = None
+        self.entries = {}
+        # Sortierte, unveränderliche Liste -> Abfragen ohne Lock
+        self.sorted_entries = []
+        self.refresh_lock = threading.Lock()
+        self.load_index()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            for e in data.get("entries", []):
+                e["thumbnail"] = base64.b64decode(e["thumbnail"])
+                self.entries[e["name"]] = e
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[CATALOG] Index unlesbar, wird neu aufgebaut: {e}")
+            self.entries = {}
+        self.publish()
+
+    def save_index(self):
+        data = {"entries": [dict(e, thumbnail=base64.b64encode(e["thumbnail"]).decode()) for e in self.sorted_entries]}
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"[CATALOG] Index konnte nicht gespeichert werden: {e}")
+
+    def publish(self):
+        self.sorted_entries = sorted(self.entries.values(), key=lambda e: (e["category"], e["name"]))
+
+    def load_categories(self):
+        """Liest die Kategorien neu, wenn sich das Manifest geändert hat. Gibt True zurück, wenn neu gelesen."""
+        if self.fixed_categories:
+            return False
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self.manifest_mtime:
+            return False
+        self.manifest_mtime = mtime
+        assets = load_manifest(self.texture_dir)["assets"]
+        self.categories = {name: a["category"] for name, a in assets.items() if a.get("category")}
+        return True
+
+    def refresh(self):
+        """Gleicht den Index mit dem Dateisystem ab. Gibt True zurück, wenn sich etwas geändert hat."""
+        if not os.path.exists(self.texture_dir):
+            return False
+
+        with self.refresh_lock:
+            changed = False
+            if self.load_categories():
+                for name, entry in self.entries.items():
+                    category = self.categories.get(name) or category_from_name(name)
+                    if entry["category"] != category:
+                        entry["category"] = category
+                        changed = True
+            seen = set()
+            for item in os.scandir(self.texture_dir):
+                # MIP_DIR, Download-Archive usw.
+                if not item.is_dir() or item.name.startswith("."):
+                    continue
+                name = item.name
+                seen.add(name)
+                try:
+                    color_map = find_color_map(item.path)
+                    if not color_map:
+                        seen.discard(name)
+                        continue
+                    st = os.stat(color_map)
+                    old = self.entries.get(name)
+                    if (old and "variants" in old and old["path"] == color_map
+                            and old["mtime"] == st.st_mtime and old["size"] == st.st_size):
+                        continue
+
+                    thumbnail, variants = make_assets(color_map, os.path.join(self.mip_root, name))
+                    self.entries[name] = {
+                        "name": name,
+                        "category": self.categories.get(name) or category_from_name(name),
+                        "path": color_map,
+                        "mtime": st.st_mtime,
+                        "size": st.st_size,
+                        "thumbnail": thumbnail,
+                        "variants": variants,
+                    }
+                    changed = True
+                except Exception as e:
+                    print(f"[CATALOG] Fehler bei {name}: {e}")
+
+            for name in list(self.entries):
+                if name not in seen:
+                    del self.entries[name]
+                    shutil.rmtree(os.path.join(self.mip_root, name), ignore_errors=True)
+                    changed = True
+
+            if changed:
+                self.publish()
+                self.save_index()
+            return changed
+
+    def watch(self, interval=REFRESH_INTERVAL):
+        # Polling statt inotify, ein stat pro Material ist billig
+        def loop():
+            while True:
+                try:
+                    if self.refresh():
+                        print(f"[CATALOG] Index aktualisiert ({len(self.sorted_entries)} Texturen)")
+                except Exception as e:
+                    print(f"[CATALOG] Refresh-Fehler: {e}")
+                time.sleep(interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def variant(self, name, level="full"):
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        return entry.get("variants", {}).get(level)
+
+    def query(self, offset=0, limit=None, category=None, search=None):
+        entries = self.sorted_entries
+        if category:
+            entries = [e for e in entries if e["category"] == category]
+        if search:
+            needle = search.lower()
+            entries = [e for e in entries if needle in e["name"].lower()]
+        total = len(entries)
+        end = None if limit is None else offset + limit
+        page = [{"name": e["name"], "category": e["category"], "thumbnail": e["thumbnail"]} for e in entries[offset:end]]
+        return page, total
+
+    def category_names(self):
+        return sorted({e["category"] for e in self.sorted_entries})
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+
+# Latenz-Budget für das Tracking und Erkennung von Tracking-Verlust.
+# Reines numpy, damit Regler und Konfidenz auch ohne GPU getestet werden können.
+
+TARGET_FRAME_MS = float(os.environ.get("MTFPL_TARGET_FRAME_MS", "33"))
+MIN_TRACK_ITER = 1
+MAX_TRACK_ITER = int(os.environ.get("MTFPL_MAX_TRACK_ITER", "4"))
+REGISTER_ITER = int(os.environ.get("MTFPL_REGISTER_ITER", "5"))
+# Anteil des Budgets, der verplant wird (Rest = Sicherheitsabstand für Ausreißer)
+HEADROOM = 0.85
+# Tiefen-Toleranz (m) und Mindestanteil passender Modellpunkte, darunter gilt ein Frame als schlecht
+DEPTH_TOLERANCE = 0.01
+MIN_INLIER_RATIO = float(os.environ.get("MTFPL_MIN_INLIER_RATIO", "0.15"))
+# So viele schlechte Frames in Folge -> Tracking verloren, neu registrieren
+LOST_PATIENCE = 5
+MODEL_SAMPLES = 256
+
+
+class IterationBudget:
+    """Wählt die Refinement-Iterationen pro Frame aus Zielzeit und gemessenen Kosten.
+
+    Modell: t = overhead + n * cost, geschätzt per gleitender linearer Regression über (n, t).
+    Solange nur eine Iterationszahl beobachtet wurde, zählt die ganze Zeit als Iterationskosten.
+    """
+
+    def __init__(self, target=TARGET_FRAME_MS / 1000.0, min_iter=MIN_TRACK_ITER, max_iter=MAX_TRACK_ITER, alpha=0.1):
+        self.target = target
+        self.min_iter = min_iter
+        self.max_iter = max_iter
+        self.alpha = alpha
+        # Gleitende Mittel von n, t, n^2, n*t
+        self.moments = None
+
+    def observe(self, iterations, seconds):
+        sample = np.array([iterations, seconds, iterations * iterations, iterations * seconds], dtype=np.float64)
+        if self.moments is None:
+            self.moments = sample
+        else:
+            self.moments += self.alpha * (sample - self.moments)
+
+    def model(self):
+        """(overhead, cost) in Sekunden oder None ohne Messungen."""
+        if self.moments is None:
+            return None
+        n, t, nn, nt = self.moments
+        var = nn - n * n
+        if var > 1e-3:
+            cost = (nt - n * t) / var
+            overhead = t - cost * n
+            if cost > 0 and overhead >= 0:
+                return overhead, cost
+        return 0.0, t / max(n, 1e-6)
+
+    def iterations(self):
+        model = self.model()
+        if model is None:
+            return self.min_iter
+        overhead, cost = model
+        # Ohne Varianz in n ist overhead = 0 und cost überschätzt -> konservativ, n steigt erst mit besseren Daten
+        n = int((self.target * HEADROOM - overhead) / max(cost, 1e-6))
+        return max(self.min_iter, min(self.max_iter, n))
+
+
+def sample_model_points(vertices, n=MODEL_SAMPLES):
+    vertices = np.asarray(vertices, dtype=np.float32)
+    if len(vertices) <= n:
+        return vertices
+    idx = np.random.default_rng(0).choice(len(vertices), n, replace=False)
+    return vertices[idx]
+
+
+def depth_inlier_ratio(pose, K, model_pts, depth, tolerance=DEPTH_TOLERANCE):
+    """Anteil der sichtbaren Modellpunkte, deren Tiefe zur gemessenen Tiefe passt.
+
+    Punkte hinter der gemessenen Oberfläche (Selbstverdeckung) zählen nicht mit,
+    Punkte davor (Objekt schwebt vor der Szene) schon.
+    """
+    pts = model_pts @ pose[:3, :3].T + pose[:3, 3]
+    z = pts[:, 2]
+    front = z > 1e-3
+    if not front.any():
+        return 0.0
+    pts, z = pts[front], z[front]
+    uv = pts @ np.asarray(K, dtype=np.float32).T
+    u = (uv[:, 0] / z).astype(np.int32)
+    v = (uv[:, 1] / z).astype(np.int32)
+    H, W = depth.shape[:2]
+    inside = (u >= 0) & (u < W) & (v >= 0) & (v < H)
+    if not inside.any():
+        return 0.0
+    observed = depth[v[inside], u[inside]]
+    z = z[inside]
+    valid = observed > 0.1
+    if not valid.any():
+        return 0.0
+    diff = z[valid] - observed[valid]
+    visible = diff < tolerance
+    if not visible.any():
+        return 0.0
+    return float(np.count_nonzero(np.abs(diff[visible]) < tolerance)) / float(np.count_nonzero(visible))
+
+
+def rect_from_points(points_2d, width, height):
+    """Bounding-Rechteck [x, y, w, h] projizierter Punkte, auf das Bild beschnitten (oder None)."""
+    pts = np.asarray(points_2d)
+    x0, y0 = np.clip(pts.min(axis=0), 0, [width - 1, height - 1])
+    x1, y1 = np.clip(pts.max(axis=0), 0, [width - 1, height - 1])
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]
+
+
+class TrackingMonitor:
+    """Erkennt Tracking-Verlust an mehreren schlechten Frames in Folge."""
+
+    def __init__(self, min_ratio=MIN_INLIER_RATIO, patience=LOST_PATIENCE):
+        self.min_ratio = min_ratio
+        self.patience = patience
+        self.bad_frames = 0
+
+    def reset(self):
+        self.bad_frames = 0
+
+    def update(self, ratio):
+        """Gibt (gut, verloren) für den aktuellen Frame zurück."""
+        if ratio >= self.min_ratio:
+            self.bad_frames = 0
+            return True, False
+        self.bad_frames += 1
+        return False, self.bad_frames >= self.patience
@@ -0,0 +1,188 @@
+import os
+import time
+import threading
+
+# Verteilung der Sessions auf mehrere Runner-Prozesse (mt_fp_live.py oder stub_worker.py).
+# Jeder Worker belegt drei aufeinanderfolgende Ports: Befehle, Video-Eingang, Ergebnisse
+# (wie 6666/6667/6668 beim einzelnen Runner).
+#   MTFPL_WORKERS="127.0.0.1:6666,127.0.0.1:7666,gpu2:6666"
+# Der Pool selbst hat keine Sockets, er entscheidet nur über Platzierung und Gesundheit;
+# die Sockets gehören den Threads im Proxy.
+# Neue Sessions bekommen nur Worker, die laut Heartbeat bereit sind (Netze geladen, startup.py);
+# solange noch Worker starten, hält der Proxy neue Sessions zurück (hold_placement).
+
+WORKERS = os.environ.get("MTFPL_WORKERS", "127.0.0.1:6666")
+HEARTBEAT_INTERVAL = 2.0
+HEARTBEAT_TIMEOUT = 6.0
+# Heartbeat-Intervall, solange ein Worker noch startet (Bereitschaft schnell bemerken)
+STARTUP_POLL_INTERVAL = 0.25
+# Latenz, die bei der Platzierung so viel zählt wie eine zusätzliche Session
+LATENCY_UNIT = 0.05
+
+
+def parse_workers(spec=WORKERS):
+    workers = []
+    for i, item in enumerate(s.strip() for s in spec.split(",")):
+        if not item:
+            continue
+        host, _, port = item.rpartition(":")
+        workers.append(Worker(i, host or "127.0.0.1", int(port)))
+    return workers
+
+
+class Worker:
+    def __init__(self, worker_id, host, port_cmd):
+        self.worker_id = worker_id
+        self.host = host
+        self.port_cmd = port_cmd
+        self.port_vid_in = port_cmd + 1
+        self.port_vid_out = port_cmd + 2
+        self.sessions = set()
+
+        # Bis zum ersten ausbleibenden Heartbeat gilt der Worker als gesund
+        self.alive = True
+        self.last_seen = time.time()
+        self.last_ping = 0.0
+        self.queue_depth = 0
+        self.latency = 0.0
+        # Bis zur ersten Heartbeat-Antwort unbekannt -> nicht bereit
+        self.ready = False
+        self.startup = None
+
+    def endpoint(self, port):
+        return f"tcp://{self.host}:{port}"
+
+    def load(self):
+        return len(self.sessions) + self.queue_depth + self.latency / LATENCY_UNIT
+
+    def __repr__(self):
+        return f"Worker({self.worker_id}, {self.host}:{self.port_cmd})"
+
+
+class WorkerPool:
+    """Sticky-Zuordnung Session -> Worker mit lastabhängiger Platzierung und Heartbeats."""
+
+    def __init__(self, workers, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        if not workers:
+            raise ValueError("Mindestens ein Worker nötig")
+        self.workers = workers
+        self.heartbeat_timeout = heartbeat_timeout
+        self.owners = {}
+        # Befehle, mit denen eine Session auf einem anderen Worker wiederhergestellt wird (INIT, SET_TEXTURE, ...)
+        self.replay = {}
+        self.lock = threading.Lock()
+
+    def owner(self, session):
+        """Worker der Session oder None. Wird vom Video-Forwarder pro Frame aufgerufen."""
+        worker = self.owners.get(session)
+        return worker if worker is not None and worker.alive else None
+
+    def starting(self):
+        """True, solange ein erreichbarer Worker noch lädt (Befehle lohnt es sich zurückzuhalten)."""
+        return any(w.alive and not w.ready and (w.startup or {}).get("status") != "FAILED" for w in self.workers)
+
+    def any_ready(self):
+        return any(w.alive and w.ready for w in self.workers)
+
+    def accepting(self):
+        """True, wenn neue Sessions sofort platziert werden: ein Worker bereit und keiner mehr am Starten."""
+        return self.any_ready() and not self.starting()
+
+    def hold_placement(self, session):
+        """True, wenn eine neue Session noch warten soll.
+
+        Solange Worker starten, landeten sonst alle früh ankommenden Sessions auf dem ersten bereiten
+        Worker und blieben dort (Platzierung ist sticky).
+        """
+        with self.lock:
+            worker = self.owners.get(session)
+            if worker is not None and worker.alive:
+                return False
+        return self.starting()
+
+    def default(self):
+        """Worker für Befehle ohne zugeordnete Session (z.B. STATS)."""
+        with self.lock:
+            alive = [w for w in self.workers if w.alive]
+            return min(alive, key=Worker.load) if alive else None
+
+    def assign(self, session):
+        with self.lock:
+            worker = self.owners.get(session)
+            if worker is not None and worker.alive:
+                return worker
+            alive = [w for w in self.workers if w.alive and w.ready]
+            if not alive:
+                return None
+            worker = min(alive, key=Worker.load)
+            worker.sessions.add(session)
+            self.owners[session] = worker
+            print(f"[POOL] Session {session} -> {worker}")
+            return worker
+
+    def release(self, session):
+        with self.lock:
+            worker = self.owners.pop(session, None)
+            if worker is not None:
+                worker.sessions.discard(session)
+            self.replay.pop(session, None)
+
+    def remember(self, session, payload):
+        with self.lock:
+            if payload["cmd"] == "INIT":
+                self.replay[session] = [payload]
+            elif session in self.replay:
+                # Pro Befehlstyp nur der letzte Stand
+                self.replay[session] = [p for p in self.replay[session] if p["cmd"] != payload["cmd"]] + [payload]
+
+    def update(self, worker, stats):
+        """Verarbeitet eine Heartbeat-Antwort (STATS des Workers)."""
+        worker.last_seen = time.time()
+        worker.queue_depth = stats.get("queue_depth", 0)
+        total = stats.get("stages", {}).get("server_total")
+        worker.latency = total["p50_ms"] / 1000.0 if total else 0.0
+        if not worker.alive:
+            print(f"[POOL] {worker} wieder erreichbar")
+            worker.alive = True
+        # Worker ohne Start-Info (stub_worker.py, ältere Runner) gelten als bereit
+        worker.startup = stats.get("startup")
+        ready = worker.startup.get("ready", False) if worker.startup else True
+        if ready and not worker.ready:
+            boot = (worker.startup or {}).get("since_boot_s", {}).get("ready")
+            print(f"[POOL] {worker} bereit" + (f" ({boot:.1f} s nach Start)" if boot is not None else ""))
+        worker.ready = ready
+
+    def check(self, now=None):
+        """Markiert Worker ohne Heartbeat als tot und platziert ihre Sessions neu.
+
+        Gibt [(session, neuer Worker, Replay-Befehle)] zurück, die der Proxy an die neuen Worker schickt.
+        """
+        now = now or time.time()
+        orphans = []
+        with self.lock:
+            for worker in self.workers:
+                if worker.alive and now - worker.last_seen > self.heartbeat_timeout:
+                    print(f"[POOL] {worker} antwortet nicht, Sessions werden neu verteilt")
+                    worker.alive = False
+                    orphans.extend(worker.sessions)
+                    worker.sessions = set()
+        moved = []
+        for session in sorted(orphans):
+            with self.lock:
+                self.owners.pop(session, None)
+            worker = self.assign(session)
+            if worker is not None:
+                moved.append((session, worker, list(self.replay.get(session, []))))
+        return moved
+
+    def stats(self):
+        return [{
+            "worker": w.worker_id,
+            "endpoint": f"{w.host}:{w.port_cmd}",
+            "alive": w.alive,
+            "ready": w.ready,
+            "stage": (w.startup or {}).get("stage"),
+            "sessions": sorted(w.sessions),
+            "queue_depth": w.queue_depth,
+            "latency_ms": 1000.0 * w.latency,
+        } for w in self.workers]